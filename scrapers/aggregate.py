@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Pre-aggregated area summaries, chart buckets and map cells for the dashboard
+
+With no filters set, the dashboard's charts and map show every listing. It used
+to bucket and cluster thousands of raw points on each load to draw them. This
+does that once, after enrich.py, and writes data/aggregates.json:
+
+  areas   per-area count, mean/median days, price and price-per-m2 quantiles, tier
+  charts  the price/days histograms and top areas by demand, bucketed like script.js
+  cells   listing positions grouped per map zoom level: for zoom z, one row per
+          map tile of zoom z + CELL_SHIFT (64px squares on screen) with the count,
+          centroid, hot/warm/cool split and median price of the listings in it
+
+The dashboard draws the cells instead of individual markers until you zoom in
+past MAX_CELL_ZOOM or set a filter.
+"""
+
+import json
+import math
+import argparse
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent.parent
+DASHBOARD_JSON = str(SCRIPT_DIR / "data/dashboard.json")
+OUTPUT_JSON = str(SCRIPT_DIR / "data/aggregates.json")
+
+# Same buckets as initCharts() in script.js
+PRICE_BUCKETS = (0, 300, 400, 500, 600, 700, 800, 1000, 1500, 2000, 10000)  # thousands
+DAYS_BUCKETS = (0, 7, 30, 60, 90, 180, 365, 9999)
+TOP_AREAS = 8
+MIN_AREA_DAYS = 3
+
+# Cells are tiles this many zoom levels below the map's, i.e. 256px / 4 = 64px across
+CELL_SHIFT = 2
+MIN_CELL_ZOOM = 8
+MAX_CELL_ZOOM = 14
+
+PPS_QUANTILES = (0.10, 0.25, 0.50, 0.75, 0.90)
+CELL_FIELDS = ('lat', 'lng', 'count', 'hot', 'warm', 'cool', 'medianPrice')
+
+
+def js_round(x):
+    """Math.round - halves go up"""
+    return math.floor(x + 0.5)
+
+
+def median(sorted_values):
+    """The upper median, like the dashboard's sorted[floor(n / 2)]"""
+    return sorted_values[len(sorted_values) // 2] if sorted_values else None
+
+
+def quantile(sorted_values, q):
+    """Linear-interpolated quantile of an already sorted list"""
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def bucket_counts(values, buckets):
+    """How many values fall in each [buckets[i], buckets[i + 1]) - anything past the last edge is left out"""
+    counts = [0] * (len(buckets) - 1)
+    for value in values:
+        for i in range(len(counts)):
+            if buckets[i] <= value < buckets[i + 1]:
+                counts[i] += 1
+                break
+    return counts
+
+
+def area_summaries(listings, areas):
+    """Per-area summaries; areas are enrich.py's stats (for the tier)"""
+    grouped = {}
+    for d in listings:
+        grouped.setdefault(d['area'], []).append(d)
+
+    summaries = {}
+    for area, members in grouped.items():
+        days = sorted(d['daysNum'] for d in members if d['daysNum'] > 0)
+        pps = sorted(d['pricePerSqm'] for d in members if d['pricePerSqm'] > 0)
+        prices = sorted(d['priceNum'] for d in members)
+        types = {}
+        for d in members:
+            types[d['property_type']] = types.get(d['property_type'], 0) + 1
+        summaries[area] = {
+            'count': len(members),
+            'meanDays': round(sum(days) / len(days), 1) if days else None,
+            'medianDays': median(days),
+            'medianPrice': median(prices),
+            'minPrice': prices[0],
+            'maxPrice': prices[-1],
+            'ppsQuantiles': [round(quantile(pps, q)) for q in PPS_QUANTILES] if pps else None,
+            'tier': areas.get(area, {}).get('tier'),
+            'types': dict(sorted(types.items(), key=lambda t: -t[1])),
+        }
+    return summaries
+
+
+def area_demand(listings, median_days):
+    """Top areas by demand, as the dashboard's area chart computes it for all listings"""
+    days = {}
+    for d in listings:
+        days.setdefault(d['area'], [])
+        if d['daysNum'] > 0:
+            days[d['area']].append(d['daysNum'])
+    ranked = []
+    for area, values in days.items():
+        if len(values) >= MIN_AREA_DAYS:
+            avg_days = sum(values) / len(values)
+            ranked.append({'area': area,
+                           'demand': js_round(max(0, min(100, 100 - avg_days / median_days * 50)))})
+    ranked.sort(key=lambda a: -a['demand'])
+    return ranked[:TOP_AREAS]
+
+
+def charts(listings):
+    days = sorted(d['daysNum'] for d in listings if d['daysNum'] > 0)
+    return {
+        'price': bucket_counts((d['priceNum'] / 1000 for d in listings), PRICE_BUCKETS),
+        'days': bucket_counts((d['daysNum'] for d in listings), DAYS_BUCKETS),
+        'areaDemand': area_demand(listings, median(days) or 60),
+    }
+
+
+def level(d):
+    """hot/warm/cool - enrich.py's listings have it inside desirability, dashboard.json's rows flat"""
+    return d['level'] if 'level' in d else d['desirability']['level']
+
+
+def tile(lat, lng, zoom):
+    """Web Mercator (slippy map) tile x, y containing a point"""
+    n = 2 ** zoom
+    lat_rad = math.radians(lat)
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return x, y
+
+
+def cells(listings, zooms=range(MIN_CELL_ZOOM, MAX_CELL_ZOOM + 1)):
+    """{zoom: [row per occupied cell]} with rows laid out as CELL_FIELDS"""
+    points = [d for d in listings if d['lat'] and d['lng']]
+    index = {}
+    for zoom in zooms:
+        grouped = {}
+        for d in points:
+            grouped.setdefault(tile(d['lat'], d['lng'], zoom + CELL_SHIFT), []).append(d)
+        rows = []
+        for key in sorted(grouped):
+            members = grouped[key]
+            levels = [level(d) for d in members]
+            rows.append([
+                round(sum(d['lat'] for d in members) / len(members), 5),
+                round(sum(d['lng'] for d in members) / len(members), 5),
+                len(members),
+                levels.count('hot'), levels.count('warm'), levels.count('cool'),
+                median(sorted(d['priceNum'] for d in members)),
+            ])
+        index[str(zoom)] = rows
+    return index
+
+
+def bounds(listings):
+    points = [(d['lat'], d['lng']) for d in listings if d['lat'] and d['lng']]
+    if not points:
+        return None
+    lats, lngs = zip(*points)
+    return [[min(lats), min(lngs)], [max(lats), max(lngs)]]
+
+
+def aggregate(dataset):
+    """Aggregates for a dashboard dataset - listings as dicts with the dashboard's fields"""
+    listings = dataset['listings']
+    return {
+        'generated_at': dataset['generated_at'],
+        'listings': len(listings),
+        'areas': area_summaries(listings, dataset['areas']),
+        'charts': charts(listings),
+        'bounds': bounds(listings),
+        'cellShift': CELL_SHIFT,
+        'cellFields': list(CELL_FIELDS),
+        'cells': cells(listings),
+    }
+
+
+def from_table(table):
+    """dashboard.json's field list + row arrays back to one dict per listing"""
+    fields = table['fields']
+    return [dict(zip(fields, row)) for row in table['rows']]
+
+
+def write_aggregates(aggregates, path=OUTPUT_JSON):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(aggregates, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-aggregate dashboard.json for the dashboard's charts and map")
+    parser.add_argument('--input', default=DASHBOARD_JSON)
+    parser.add_argument('--output', default=OUTPUT_JSON)
+    args = parser.parse_args()
+
+    with open(args.input, encoding='utf-8') as f:
+        dataset = json.load(f)
+    dataset['listings'] = from_table(dataset['listings'])
+
+    aggregates = aggregate(dataset)
+    write_aggregates(aggregates, args.output)
+    print(f"✓ Aggregated {aggregates['listings']} listings into {len(aggregates['areas'])} areas and "
+          f"{sum(len(rows) for rows in aggregates['cells'].values())} map cells -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Saved-search alerts, checked against each run's new and re-priced listings
+
+Buyer profiles live in scrapers/saved_searches.json, one object per search:
+
+    {"name": "starter-d15", "areas": ["Dublin 15", "Castleknock"], "max_price": 450000,
+     "min_beds": 3, "ber": "C", "badges": ["ftb"]}
+
+  min_/max_ price, beds, size   inclusive ranges
+  areas                        any of these areas (as enrich.py/geo.py resolve them)
+  types                        property type containing any of these ("Semi", "Detached")
+  sources                      daft / myhome
+  ber                          this rating or better
+  badges                       all of these dashboard badges: ftb (Starter home),
+                               negotiate (Negotiable), gem (Below market)
+  preferred                    true for the preferred areas only
+
+Rather than filtering the whole market once per search, the searches are compiled
+into an index - by area, and by price through an interval index over the searches'
+price ranges - and only the listings this run added or re-priced (the scrapers'
+*_changes.json) are looked up in it. A run costs about one lookup per changed
+listing however many searches there are.
+
+Run after enrich.py, which supplies the area stats the badges are worked out
+against. Writes data/alerts/<search>.json for every search with matches, plus
+data/alerts/index.json with the match count of each search.
+"""
+
+import json
+import time
+import argparse
+from bisect import bisect_right
+from pathlib import Path
+from datetime import datetime
+
+from enrich import normalise, badges, OUTPUT_JSON as DASHBOARD_JSON
+from geo import GeoResolver
+
+SCRIPT_DIR = Path(__file__).parent.parent
+SEARCHES_JSON = str(Path(__file__).parent / "saved_searches.json")
+CHANGES = {
+    'daft': str(SCRIPT_DIR / "data/daft_changes.json"),
+    'myhome': str(SCRIPT_DIR / "data/myhome_changes.json"),
+}
+ALERTS_DIR = SCRIPT_DIR / "data/alerts"
+
+RANGES = {'price': 'priceNum', 'beds': 'bedsNum', 'size': 'sizeNum'}
+LIST_FIELDS = ('areas', 'types', 'sources', 'badges')
+KNOWN_KEYS = {'name', 'ber', 'preferred', *LIST_FIELDS,
+              *(f"{bound}_{name}" for name in RANGES for bound in ('min', 'max'))}
+BADGES = ('ftb', 'negotiate', 'gem')
+BER_ORDER = 'ABCDEFG'
+# Fields of a listing that go into a report
+REPORT_FIELDS = ('source', 'listing_id', 'url', 'address', 'price', 'priceNum', 'beds', 'size_sqm',
+                 'property_type', 'ber', 'area')
+
+
+def compile_search(spec):
+    """A saved search checked and with its criteria in the form matches() uses"""
+    unknown = set(spec) - KNOWN_KEYS
+    if unknown or not spec.get('name'):
+        raise ValueError(f"saved search {spec.get('name', '?')!r}: "
+                         + (f"unknown criteria {', '.join(sorted(unknown))}" if unknown else "needs a name"))
+    search = {'name': spec['name']}
+    for name in RANGES:
+        search[name] = (spec.get(f"min_{name}"), spec.get(f"max_{name}"))
+    for field in LIST_FIELDS:
+        search[field] = tuple(spec.get(field) or ())
+    if set(search['badges']) - set(BADGES):
+        raise ValueError(f"saved search {spec['name']!r}: badges are {', '.join(BADGES)}")
+    search['areas'] = tuple(a.lower() for a in search['areas'])
+    ber = (spec.get('ber') or '')[:1].upper()
+    if ber and ber not in BER_ORDER:
+        raise ValueError(f"saved search {spec['name']!r}: ber must be a rating A-G")
+    search['ber'] = BER_ORDER[:BER_ORDER.index(ber) + 1] if ber else None
+    search['preferred'] = bool(spec.get('preferred'))
+    return search
+
+
+def matches(search, d):
+    """Does a listing (enrich.py's dashboard form, with badges) meet every criterion?"""
+    for name, field in RANGES.items():
+        low, high = search[name]
+        if (low is not None and d[field] < low) or (high is not None and d[field] > high):
+            return False
+    if search['areas'] and d['area'].lower() not in search['areas']:
+        return False
+    if search['types'] and not any(t in d['property_type'] for t in search['types']):
+        return False
+    if search['sources'] and d['source'] not in search['sources']:
+        return False
+    if search['ber'] and not (d['ber'] and d['ber'][0] in search['ber']):
+        return False
+    if search['preferred'] and not d['inPreferredArea']:
+        return False
+    return all(b in d['badges'] for b in search['badges'])
+
+
+class SearchIndex:
+    """Saved searches indexed by area and price, so a listing is only checked against likely matches
+
+    Price ranges go into an interval index: the price axis is cut at every search's
+    bounds, and each piece holds the searches whose range covers it.
+    """
+
+    def __init__(self, searches):
+        self.searches = searches
+        self.by_area, self.any_area = {}, set()
+        for i, search in enumerate(searches):
+            if search['areas']:
+                for area in search['areas']:
+                    self.by_area.setdefault(area, set()).add(i)
+            else:
+                self.any_area.add(i)
+
+        bounded = [i for i, s in enumerate(searches) if s['price'] != (None, None)]
+        self.any_price = set(range(len(searches))) - set(bounded)
+        # Piece k covers prices from cuts[k - 1] (inclusive) up to cuts[k] (exclusive); bounds
+        # are inclusive, so an upper bound cuts just after itself
+        cuts = set()
+        for i in bounded:
+            low, high = searches[i]['price']
+            if low is not None:
+                cuts.add(low)
+            if high is not None:
+                cuts.add(high + 1)
+        self.cuts = sorted(cuts)
+        self.pieces = [set() for _ in range(len(self.cuts) + 1)]
+        for i in bounded:
+            low, high = searches[i]['price']
+            first = 0 if low is None else bisect_right(self.cuts, low)
+            last = len(self.cuts) if high is None else bisect_right(self.cuts, high)
+            for k in range(first, last + 1):
+                self.pieces[k].add(i)
+
+    def candidates(self, d):
+        by_area = self.by_area.get(d['area'].lower(), set()) | self.any_area
+        by_price = self.pieces[bisect_right(self.cuts, d['priceNum'])] | self.any_price
+        return by_area & by_price
+
+    def match(self, d):
+        """Names of the saved searches a listing matches"""
+        return [self.searches[i]['name'] for i in sorted(self.candidates(d)) if matches(self.searches[i], d)]
+
+
+def load_searches(path=SEARCHES_JSON):
+    with open(path, encoding='utf-8') as f:
+        specs = json.load(f)['searches']
+    searches = [compile_search(spec) for spec in specs]
+    names = [s['name'] for s in searches]
+    if len(set(names)) != len(names):
+        raise ValueError("saved search names must be unique - they name the report files")
+    return searches
+
+
+def changed_listings(changes_files=CHANGES):
+    """(source, change, old price, listing dict) for every new or re-priced listing of the last runs"""
+    for source, path in changes_files.items():
+        if not Path(path).exists():
+            continue
+        with open(path, encoding='utf-8') as f:
+            changes = json.load(f)
+        for listing in changes.get('new', []):
+            yield source, 'new', None, listing
+        for change in changes.get('price_changed', []):
+            yield source, 'price_changed', change['old_price'], change['listing']
+
+
+def dashboard_areas(path=DASHBOARD_JSON):
+    """enrich.py's area stats - the badges compare a listing with its area"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['areas']
+    except (OSError, ValueError, KeyError):
+        print(f"⚠ No area stats in {path} - run enrich.py first; 'gem' matches need them")
+        return {}
+
+
+def match_changes(index, changed, areas, geo=None):
+    """{search name: [report rows]} for the changed listings"""
+    reports = {}
+    for source, change, old_price, listing in changed:
+        d = normalise(listing, source)
+        if d['priceNum'] <= 0:
+            continue
+        if geo is not None:
+            d['area'], d['lat'], d['lng'], d['located'] = geo.resolve(d['address'], d['lat'], d['lng'])
+        d['badges'] = badges(d, areas.get(d['area'], {}))
+        names = index.match(d)
+        if not names:
+            continue
+        row = {'change': change, **{f: d[f] for f in REPORT_FIELDS}, 'badges': d['badges']}
+        if old_price is not None:
+            row['oldPrice'] = old_price
+        for name in names:
+            reports.setdefault(name, []).append(row)
+    return reports
+
+
+def write_reports(searches, reports, checked, alerts_dir=ALERTS_DIR):
+    """One file per search with matches; reports of searches without any this time are removed"""
+    alerts_dir = Path(alerts_dir)
+    alerts_dir.mkdir(parents=True, exist_ok=True)
+    generated_at = datetime.now().isoformat()
+    for path in alerts_dir.glob('*.json'):
+        if path.stem != 'index' and path.stem not in reports:
+            path.unlink()
+    for search in searches:
+        if search['name'] in reports:
+            with open(alerts_dir / f"{search['name']}.json", 'w', encoding='utf-8') as f:
+                json.dump({'search': search['name'], 'generated_at': generated_at,
+                           'matches': reports[search['name']]}, f, indent=2, ensure_ascii=False)
+    with open(alerts_dir / 'index.json', 'w', encoding='utf-8') as f:
+        json.dump({'generated_at': generated_at, 'checked': checked,
+                   'searches': {s['name']: len(reports.get(s['name'], [])) for s in searches}},
+                  f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match the last runs' new and re-priced listings to saved searches")
+    parser.add_argument('--searches', default=SEARCHES_JSON)
+    args = parser.parse_args()
+
+    start = time.time()
+    searches = load_searches(args.searches)
+    index = SearchIndex(searches)
+    changed = list(changed_listings())
+    reports = match_changes(index, changed, dashboard_areas(), GeoResolver())
+    write_reports(searches, reports, len(changed))
+    print(f"✓ Alerts: {len(changed)} new/re-priced listings against {len(searches)} saved searches, "
+          f"{sum(len(rows) for rows in reports.values())} matches for {len(reports)} searches "
+          f"({time.time() - start:.2f}s) -> {ALERTS_DIR}")
+
+
+if __name__ == '__main__':
+    main()
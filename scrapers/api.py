@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Local query API over the enriched listings
+
+The dashboard and our own scripts otherwise download whole CSVs (or all of
+dashboard.json) and filter every listing on every change. This loads
+data/dashboard.json once, indexes it, and answers filter/sort queries with just
+the rows asked for:
+
+  - price, beds, size, price-per-m2, days and score ranges: sorted value arrays + bisect
+  - area, property type, BER, source and level: inverted indexes
+  - map bounds: a grid of GRID_DEGREES cells
+
+Answers are cached by query (LRU) until dashboard.json changes on disk, when the
+indexes are rebuilt.
+
+    python scrapers/api.py [--port 8765]
+
+    GET /listings?max_price=500000&min_beds=3&area=Lucan&area=Dublin 8&ber=C
+                 &bbox=53.25,-6.45,53.40,-6.10&sort=-score&page=1&per_page=50
+    GET /areas
+    GET /health
+
+/listings parameters:
+  min_/max_ price, beds, size, pps, days, score   inclusive ranges (unknown size/pps never match)
+  area, source, level    exact, repeat for any of several
+  type                   property type containing this, like the dashboard's filter
+  ber                    this rating or better (C = A1..C3)
+  preferred=1            only the preferred areas
+  q                      address or area containing this, case-insensitive
+  bbox                   south,west,north,east
+  sort                   a range field or date_listed, '-' for descending (default -score)
+  page, per_page         1-based page, up to MAX_PER_PAGE rows
+  fields                 comma-separated fields to return (default all)
+"""
+
+import os
+import json
+import math
+import argparse
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+from aggregate import from_table
+
+SCRIPT_DIR = Path(__file__).parent.parent
+DASHBOARD_JSON = str(SCRIPT_DIR / "data/dashboard.json")
+DEFAULT_PORT = 8765
+
+RANGE_FIELDS = {'price': 'priceNum', 'beds': 'bedsNum', 'size': 'sizeNum', 'pps': 'pricePerSqm',
+                'days': 'daysNum', 'score': 'score'}
+# 0 means "not known" for these, so they're left out of their range index
+UNKNOWN_WHEN_ZERO = ('sizeNum', 'pricePerSqm')
+EXACT_FIELDS = {'area': 'area', 'source': 'source', 'level': 'level'}
+SORT_FIELDS = tuple(RANGE_FIELDS) + ('date_listed',)
+DEFAULT_SORT = '-score'
+BER_ORDER = 'ABCDEFG'
+
+GRID_DEGREES = 0.01  # ~1.1km north-south, ~0.7km east-west at Dublin's latitude
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 500
+CACHE_SIZE = 256
+
+
+class QueryError(ValueError):
+    """A malformed query parameter - answered with 400"""
+
+
+class ListingIndex:
+    """The enriched listings with range, inverted and grid indexes over them"""
+
+    def __init__(self, dataset):
+        self.generated_at = dataset.get('generated_at')
+        self.areas = dataset.get('areas', {})
+        self.listings = dataset['listings']
+        self.all_ids = frozenset(range(len(self.listings)))
+
+        self.ranges = {}
+        for field in RANGE_FIELDS.values():
+            pairs = sorted((d[field], i) for i, d in enumerate(self.listings)
+                           if d.get(field) is not None and not (field in UNKNOWN_WHEN_ZERO and d[field] <= 0))
+            self.ranges[field] = ([v for v, _ in pairs], [i for _, i in pairs])
+
+        self.inverted = {field: {} for field in EXACT_FIELDS.values()}
+        self.types, self.bers, self.preferred = {}, {}, set()
+        self.grid = {}
+        for i, d in enumerate(self.listings):
+            for field, index in self.inverted.items():
+                index.setdefault(d.get(field), set()).add(i)
+            self.types.setdefault(d.get('property_type') or '', set()).add(i)
+            if d.get('ber'):
+                self.bers.setdefault(d['ber'][0], set()).add(i)
+            if d.get('inPreferredArea'):
+                self.preferred.add(i)
+            if d.get('lat') and d.get('lng'):
+                self.grid.setdefault(grid_cell(d['lat'], d['lng']), []).append(i)
+
+        # Rank of every listing per sort field, so a result set sorts without comparing values
+        self.ranks = {}
+        for name in SORT_FIELDS:
+            field = RANGE_FIELDS.get(name, name)
+            order = sorted(range(len(self.listings)), key=lambda i: sort_value(self.listings[i].get(field)))
+            rank = [0] * len(order)
+            for position, i in enumerate(order):
+                rank[i] = position
+            self.ranks[name] = rank
+
+    @classmethod
+    def load(cls, path=DASHBOARD_JSON):
+        with open(path, encoding='utf-8') as f:
+            dataset = json.load(f)
+        dataset['listings'] = from_table(dataset['listings'])
+        return cls(dataset)
+
+    def in_range(self, field, low, high):
+        values, ids = self.ranges[field]
+        start = 0 if low is None else bisect_left(values, low)
+        end = len(values) if high is None else bisect_right(values, high)
+        return set(ids[start:end])
+
+    def in_bbox(self, south, west, north, east):
+        low_row, low_col = grid_cell(south, west)
+        high_row, high_col = grid_cell(north, east)
+        if (high_row - low_row + 1) * (high_col - low_col + 1) > len(self.grid):
+            cells = [c for c in self.grid if low_row <= c[0] <= high_row and low_col <= c[1] <= high_col]
+        else:
+            cells = [(r, c) for r in range(low_row, high_row + 1) for c in range(low_col, high_col + 1)]
+        found = set()
+        for cell in cells:
+            for i in self.grid.get(cell, ()):
+                d = self.listings[i]
+                if south <= d['lat'] <= north and west <= d['lng'] <= east:
+                    found.add(i)
+        return found
+
+    def matching(self, params):
+        """Ids of the listings matching every filter in params (a parse_qs dict)"""
+        constraints = []
+        for name, field in RANGE_FIELDS.items():
+            low, high = number(params, 'min_' + name), number(params, 'max_' + name)
+            if low is not None or high is not None:
+                constraints.append(self.in_range(field, low, high))
+        for name, field in EXACT_FIELDS.items():
+            if name in params:
+                index = self.inverted[field]
+                constraints.append(set().union(*(index.get(v, ()) for v in params[name])))
+        if 'type' in params:
+            wanted = params['type'][-1]
+            constraints.append(set().union(*(ids for t, ids in self.types.items() if wanted in t)))
+        if 'ber' in params:
+            letter = params['ber'][-1][:1].upper()
+            if not letter or letter not in BER_ORDER:
+                raise QueryError(f"ber must be a rating A-G, not {params['ber'][-1]!r}")
+            constraints.append(set().union(*(self.bers.get(b, ()) for b in BER_ORDER[:BER_ORDER.index(letter) + 1])))
+        if params.get('preferred', [''])[-1] in ('1', 'true'):
+            constraints.append(self.preferred)
+        if 'bbox' in params:
+            constraints.append(self.in_bbox(*bbox(params['bbox'][-1])))
+
+        # Intersect smallest first; with no filters everything matches
+        constraints.sort(key=len)
+        ids = set(constraints[0]) if constraints else set(self.all_ids)
+        for other in constraints[1:]:
+            ids &= other
+
+        q = params.get('q', [''])[-1].strip().lower()
+        if q:
+            ids = {i for i in ids
+                   if q in self.listings[i]['address'].lower() or q in self.listings[i]['area'].lower()}
+        return ids
+
+    def query(self, params):
+        """One page of matching listings, sorted - params as parse_qs gives them"""
+        ids = self.matching(params)
+
+        sort = params.get('sort', [DEFAULT_SORT])[-1]
+        name = sort.lstrip('-')
+        if name not in self.ranks:
+            raise QueryError(f"can't sort by {name!r} - one of {', '.join(SORT_FIELDS)}")
+        ordered = sorted(ids, key=self.ranks[name].__getitem__, reverse=sort.startswith('-'))
+
+        page = max(1, int(number(params, 'page') or 1))
+        per_page = int(number(params, 'per_page') or DEFAULT_PER_PAGE)
+        if not 1 <= per_page <= MAX_PER_PAGE:
+            raise QueryError(f"per_page must be 1-{MAX_PER_PAGE}")
+        fields = [f for f in params['fields'][-1].split(',') if f] if 'fields' in params else None
+
+        rows = [self.listings[i] for i in ordered[(page - 1) * per_page:page * per_page]]
+        if fields:
+            rows = [{f: d.get(f) for f in fields} for d in rows]
+        return {
+            'generated_at': self.generated_at,
+            'total': len(ordered),
+            'page': page,
+            'per_page': per_page,
+            'pages': math.ceil(len(ordered) / per_page),
+            'listings': rows,
+        }
+
+
+def grid_cell(lat, lng):
+    return math.floor(lat / GRID_DEGREES), math.floor(lng / GRID_DEGREES)
+
+
+def sort_value(value):
+    """Missing values sort first ascending (last descending) without comparing None to numbers"""
+    return (True, value) if value not in (None, '') else (False, 0)
+
+
+def number(params, name):
+    if name not in params or params[name][-1] == '':
+        return None
+    try:
+        return float(params[name][-1])
+    except ValueError:
+        raise QueryError(f"{name} must be a number, not {params[name][-1]!r}") from None
+
+
+def bbox(text):
+    try:
+        south, west, north, east = (float(v) for v in text.split(','))
+    except ValueError:
+        raise QueryError("bbox must be south,west,north,east") from None
+    return south, west, north, east
+
+
+class QueryService:
+    """The index for a dashboard.json, rebuilt when the file changes, and the response cache"""
+
+    def __init__(self, path=DASHBOARD_JSON, cache_size=CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.index = None
+        self.hits = self.misses = 0
+        self.refresh()
+
+    def refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self.mtime:
+            index = ListingIndex.load(self.path)
+            with self.lock:
+                self.index, self.mtime = index, mtime
+                self.cache.clear()
+
+    def answer(self, path, query):
+        """(status, body bytes) for a request path and raw query string"""
+        self.refresh()
+        params = parse_qs(query)
+        key = (path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return self.cache[key]
+            self.misses += 1
+            index = self.index
+
+        if path == '/listings':
+            try:
+                status, payload = 200, index.query(params)
+            except QueryError as e:
+                status, payload = 400, {'error': str(e)}
+        elif path == '/areas':
+            status, payload = 200, {'generated_at': index.generated_at, 'areas': index.areas}
+        elif path == '/health':
+            return 200, json.dumps({'listings': len(index.listings), 'generated_at': index.generated_at,
+                                    'cache_hits': self.hits, 'cache_misses': self.misses}).encode()
+        else:
+            return 404, json.dumps({'error': f"no such endpoint {path}"}).encode()
+
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        with self.lock:
+            self.cache[key] = (status, body)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return status, body
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            status, body = service.answer(url.path.rstrip('/') or '/', url.query)
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            # The dashboard is served from another origin (GitHub Pages, or npx serve locally)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def make_server(service, host='127.0.0.1', port=DEFAULT_PORT):
+    return ThreadingHTTPServer((host, port), make_handler(service))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve indexed queries over data/dashboard.json")
+    parser.add_argument('--data', default=DASHBOARD_JSON)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    service = QueryService(args.data)
+    server = make_server(service, args.host, args.port)
+    print(f"✓ Serving {len(service.index.listings)} listings on http://{args.host}:{args.port}/listings")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Append-only checkpoint journal so an interrupted scrape can resume
+
+One JSON line per completed results page (price band, page number, page count
+and its listings). Each record is a single write + fsync, and a torn last line
+from a crash is dropped on load, so the journal is always valid up to the
+last finished page. Cost per page is constant instead of re-dumping everything.
+Only which pages are done is kept in memory; a resumed run streams the listings
+back out of the file with replay().
+"""
+
+import os
+import json
+from datetime import datetime, timedelta
+
+from schema import as_dict, from_dict
+
+# Don't resume from a journal left over from some long-dead run
+MAX_AGE_HOURS = 24
+
+
+class CheckpointJournal:
+    """Completed pages of the current run, persisted as JSONL"""
+
+    def __init__(self, path, resume=False, max_age_hours=MAX_AGE_HOURS):
+        self.path = path
+        self.pages = {}  # (band, page) -> total_pages
+        self.counts = {}  # band -> total results, from its first page
+        self.splits = set()  # bands that turned out too big and were split
+        self.started_at = None
+
+        if resume and os.path.exists(path):
+            self._load(max_age_hours)
+
+        if self.started_at is None:
+            # Fresh run - start a new journal
+            self.started_at = datetime.now().isoformat()
+            self.pages = {}
+            self.counts = {}
+            self.splits = set()
+            with open(path, 'w', encoding='utf-8') as f:
+                self._write(f, {'started_at': self.started_at})
+        elif self.pages:
+            print(f"✓ Resuming run from {self.started_at}: {len(self.pages)} pages already done")
+
+    def _records(self):
+        """(record, bytes up to and including it) for every complete line of the journal"""
+        good_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    return  # torn write from a crash - everything after it is garbage
+                if not line.endswith(b'\n'):
+                    return
+                good_bytes += len(line)
+                yield record, good_bytes
+
+    def _load(self, max_age_hours):
+        good_bytes = 0
+        for record, good_bytes in self._records():
+            if 'started_at' in record:
+                self.started_at = record['started_at']
+            elif 'split' in record:
+                self.splits.add(record['split'])
+            else:
+                self.pages[(record['band'], record['page'])] = record['total_pages']
+                if record.get('total_count') is not None:
+                    self.counts[record['band']] = record['total_count']
+
+        if self.started_at is None:
+            return
+        if datetime.now() - datetime.fromisoformat(self.started_at) > timedelta(hours=max_age_hours):
+            print(f"⚠ Checkpoint from {self.started_at} is too old - starting fresh")
+            self.started_at = None
+            return
+
+        # Drop any torn tail so new records start on a clean line
+        with open(self.path, 'r+b') as f:
+            f.truncate(good_bytes)
+
+    def _write(self, f, record):
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+    def done(self, band, page):
+        return (band, page) in self.pages
+
+    def replay(self):
+        """Completed pages from the file, one at a time: (band, page, total_pages, listings)"""
+        if not self.pages:
+            return
+        for record, _ in self._records():
+            if 'listings' in record:
+                yield (record['band'], record['page'], record['total_pages'],
+                       [from_dict(l) for l in record['listings']])
+
+    def record(self, band, page, total_pages, listings, total_count=None):
+        """Persist one completed page of Listing records"""
+        self.pages[(band, page)] = total_pages
+        record = {'band': band, 'page': page, 'total_pages': total_pages,
+                  'listings': [as_dict(l) for l in listings]}
+        if total_count is not None:
+            self.counts[band] = total_count
+            record['total_count'] = total_count
+        with open(self.path, 'a', encoding='utf-8') as f:
+            self._write(f, record)
+
+    def record_split(self, band):
+        """Persist that a band was over the result cap and got split"""
+        self.splits.add(band)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            self._write(f, {'split': band})
+
+    def finish(self):
+        """Run completed and outputs written - the journal isn't needed any more"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Compact columnar export of the scraped listings
+
+The CSV and indented JSON store every value as text and repeat every key for
+every listing. This writes the same listings column by column with the types
+fixed at write time: prices, beds and days as the smallest int that fits,
+coordinates and sizes as float32, dates as day numbers, and repetitive text
+(prices as displayed, agents, property types, BER) dictionary-encoded.
+Optionally gzip or brotli compressed on top.
+
+File layout (all little-endian):
+    b'LCOL'  uint32 header length  header JSON  column buffers (4-byte aligned)
+
+The header lists each column's name, type, byte offset and length, plus the
+dictionary for 'dict' columns. A browser can map every numeric column straight
+onto a typed array (Int32Array, Float32Array, ...) with no parsing at all -
+which is what the dashboard does (decodeColumnar in script.js) when there's no
+precomputed dashboard data.
+"""
+
+import sys
+import json
+import gzip
+import math
+import argparse
+from array import array
+from datetime import date
+
+from schema import to_int, to_float, to_bool
+
+MAGIC = b'LCOL'
+# 2: 'price' is kept as displayed next to 'price_num', rather than folded into it
+VERSION = 2
+
+# Column type per listing field. Anything not listed is kept as a plain string.
+COLUMN_TYPES = {
+    'listing_id': 'int',
+    'source': 'dict',
+    'price': 'dict',
+    'price_num': 'int',
+    'beds': 'int',
+    'baths': 'int',
+    'size_sqm': 'float32',
+    'property_type': 'dict',
+    'ber': 'dict',
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'date_listed': 'date',
+    'days_on_market': 'int',
+    'agent': 'dict',
+    'agent_branch': 'dict',
+    'is_new': 'bool',
+    'is_sale_agreed': 'bool',
+}
+
+# Smallest signed type that fits - the type's minimum is the null marker
+INT_TYPES = (('int8', 'b', -2 ** 7), ('int16', 'h', -2 ** 15), ('int32', 'i', -2 ** 31))
+CODE_TYPES = (('uint8', 'B', 2 ** 8), ('uint16', 'H', 2 ** 16), ('uint32', 'I', 2 ** 32))
+EPOCH = date(1970, 1, 1)
+
+COMPRESSION = {
+    'gzip': '.gz',
+    'brotli': '.br',
+}
+
+
+def to_day(value):
+    """ISO date -> days since 1970-01-01"""
+    try:
+        return (date.fromisoformat(str(value)[:10]) - EPOCH).days
+    except ValueError:
+        return None
+
+
+def little_endian(arr):
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr.tobytes()
+
+
+# Placeholder for a missing int while a column is being built, before its width is known
+BUILD_NULL = -2 ** 63
+
+
+class ColumnBuilder:
+    """One column, filled a listing at a time into compact typed storage
+
+    Nothing per-listing is kept beyond the column's own values, so a columnar file
+    can be built while the listings stream past.
+    """
+
+    def __init__(self, name, kind, rows_before=0):
+        self.name = name
+        self.kind = kind
+        if kind in ('int', 'date'):
+            self.values = array('q')
+        elif kind == 'float32':
+            self.values = array('f')
+        elif kind == 'bool':
+            self.values = bytearray()
+        elif kind == 'dict':
+            self.dictionary = {}
+            self.values = array('I')  # code 0 is null, so dictionary[i] is stored as code i + 1
+        else:
+            self.blob, self.values = bytearray(), array('I')  # uint32 end offsets into one UTF-8 blob
+        for _ in range(rows_before):
+            self.append(None)
+
+    def append(self, value):
+        kind = self.kind
+        if kind == 'int':
+            number = to_int(value)
+            if number is None and value not in (None, ''):
+                # Something that isn't a number at all ("Studio") - keep the column as text
+                self._as_text()
+                return self.append(value)
+            self.values.append(BUILD_NULL if number is None else number)
+        elif kind == 'date':
+            day = to_day(value) if value not in (None, '') else None
+            self.values.append(BUILD_NULL if day is None else day)
+        elif kind == 'float32':
+            number = to_float(value)
+            self.values.append(math.nan if number is None else number)
+        elif kind == 'bool':
+            self.values.append(1 if to_bool(value) else 0)
+        elif kind == 'dict':
+            if value in (None, ''):
+                self.values.append(0)
+            else:
+                self.values.append(self.dictionary.setdefault(str(value), len(self.dictionary)) + 1)
+        else:
+            # A null is an empty string
+            if value not in (None, ''):
+                self.blob += str(value).encode('utf-8')
+            self.values.append(len(self.blob))
+
+    def _as_text(self):
+        numbers = self.values
+        self.kind = 'str'
+        self.blob, self.values = bytearray(), array('I')
+        for v in numbers:
+            self.append(None if v == BUILD_NULL else v)
+
+    def finish(self):
+        """-> (column header, [buffers])"""
+        kind = self.kind
+        if kind in ('int', 'date'):
+            present = [v for v in self.values if v != BUILD_NULL]
+            lo, hi = (min(present), max(present)) if present else (0, 0)
+            for type_name, code, null in INT_TYPES:
+                if lo > null and hi < -null:
+                    break
+            else:
+                raise ValueError(f"{self.name}: {lo}..{hi} doesn't fit in int32")
+            data = array(code, (null if v == BUILD_NULL else v for v in self.values))
+            return {'type': kind, 'storage': type_name, 'null': null}, [little_endian(data)]
+
+        if kind == 'float32':
+            return {'type': 'float32', 'null': 'NaN'}, [little_endian(array('f', self.values))]
+
+        if kind == 'bool':
+            return {'type': 'bool', 'storage': 'uint8'}, [bytes(self.values)]
+
+        if kind == 'dict':
+            for type_name, code, limit in CODE_TYPES:
+                if len(self.dictionary) < limit:
+                    break
+            return ({'type': 'dict', 'storage': type_name, 'dictionary': list(self.dictionary)},
+                    [little_endian(array(code, self.values))])
+
+        return {'type': 'str', 'storage': 'uint32'}, [little_endian(array('I', self.values)), bytes(self.blob)]
+
+
+class ColumnarEncoder:
+    """Builds the columnar file from listings added one (or one page) at a time"""
+
+    def __init__(self):
+        self.columns = {}  # field -> ColumnBuilder, in order of first appearance
+        self.rows = 0
+
+    def add(self, listing):
+        """Add one listing dict, as written to the JSON output"""
+        for field in listing:
+            if field not in self.columns:
+                self.columns[field] = ColumnBuilder(field, COLUMN_TYPES.get(field, 'str'), self.rows)
+        for name, column in self.columns.items():
+            column.append(listing.get(name))
+        self.rows += 1
+
+    def finish(self, scraped_at=None):
+        columns, buffers, offset = [], [], 0
+        for name, column in self.columns.items():
+            header, column_buffers = column.finish()
+            header['name'] = name
+            header['buffers'] = []
+            for buf in column_buffers:
+                header['buffers'].append([offset, len(buf)])
+                buffers.append(buf)
+                padding = -len(buf) % 4
+                buffers.append(b'\0' * padding)
+                offset += len(buf) + padding
+            columns.append(header)
+
+        header = json.dumps({'version': VERSION, 'scraped_at': scraped_at, 'rows': self.rows,
+                             'columns': columns}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        # Pad the header so the column buffers start 4-byte aligned
+        header += b' ' * (-(len(MAGIC) + 4 + len(header)) % 4)
+        return b''.join([MAGIC, len(header).to_bytes(4, 'little'), header, *buffers])
+
+
+def encode(listings, scraped_at=None):
+    """Listings (dicts, as written to the JSON output - any iterable) -> columnar bytes"""
+    encoder = ColumnarEncoder()
+    for listing in listings:
+        encoder.add(listing)
+    return encoder.finish(scraped_at)
+
+
+def compress(data, method):
+    if method == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if method == 'brotli':
+        try:
+            import brotli
+        except ImportError:
+            raise RuntimeError("brotli compression needs the 'brotli' package (pip install brotli)")
+        return brotli.compress(data)
+    raise ValueError(f"unknown compression: {method}")
+
+
+def write_columnar(listings, path, scraped_at=None, compression=None):
+    """Write the columnar file (plus .gz/.br suffix if compressed) and return its path"""
+    data = encode(listings, scraped_at)
+    if compression:
+        data = compress(data, compression)
+        path += COMPRESSION[compression]
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def decode(data):
+    """Columnar bytes -> (header, list of listing dicts). Mostly for checks and tests."""
+    if data[:2] == b'\x1f\x8b':
+        data = gzip.decompress(data)
+    if data[:4] != MAGIC:
+        raise ValueError("not a columnar listings file")
+    header_len = int.from_bytes(data[4:8], 'little')
+    header = json.loads(data[8:8 + header_len])
+    body = memoryview(data)[8 + header_len:]
+
+    def buffer(column, i):
+        start, length = column['buffers'][i]
+        return body[start:start + length]
+
+    def typed(code, raw):
+        arr = array(code)
+        arr.frombytes(raw)
+        if sys.byteorder == 'big':
+            arr.byteswap()
+        return arr
+
+    int_codes = {name: code for name, code, _ in INT_TYPES}
+    dict_codes = {name: code for name, code, _ in CODE_TYPES}
+    columns = {}
+    for column in header['columns']:
+        kind = column['type']
+        if kind in ('int', 'date'):
+            values = [None if v == column['null'] else v
+                      for v in typed(int_codes[column['storage']], buffer(column, 0))]
+            if kind == 'date':
+                values = [None if v is None else date.fromordinal(EPOCH.toordinal() + v).isoformat()
+                          for v in values]
+        elif kind == 'float32':
+            values = [None if math.isnan(v) else v for v in typed('f', buffer(column, 0))]
+        elif kind == 'bool':
+            values = [bool(v) for v in buffer(column, 0)]
+        elif kind == 'dict':
+            dictionary = [None] + column['dictionary']
+            values = [dictionary[c] for c in typed(dict_codes[column['storage']], buffer(column, 0))]
+        else:
+            ends, blob = typed('I', buffer(column, 0)), bytes(buffer(column, 1))
+            values, start = [], 0
+            for end in ends:
+                values.append(blob[start:end].decode('utf-8'))
+                start = end
+        columns[column['name']] = values
+
+    names = list(columns)
+    listings = [dict(zip(names, row)) for row in zip(*columns.values())]
+    return header, listings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a scraper JSON output to the columnar format")
+    parser.add_argument('json_file', help="e.g. data/daft_listings.json")
+    parser.add_argument('--compress', choices=list(COMPRESSION))
+    args = parser.parse_args()
+
+    with open(args.json_file, encoding='utf-8') as f:
+        data = json.load(f)
+    path = args.json_file.rsplit('.', 1)[0] + '.col'
+    path = write_columnar(data['listings'], path, data.get('scraped_at'), args.compress)
+    print(f"✓ Columnar: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,12 +5,11 @@ Run this locally on your machine
 """
 
 import json
-import csv
 import time
-import os
 import random
+import asyncio
+import argparse
 from pathlib import Path
-from datetime import datetime
 
 # Rotate user agents to avoid detection
 USER_AGENTS = [
@@ -28,100 +27,135 @@ USER_AGENTS = [
 # Use your Chrome profile for cookies
 CHROME_USER_DATA = str(Path.home() / "Library/Application Support/Google/Chrome")
 
-from playwright.sync_api import sync_playwright
+from fetch import HttpBackend, BrowserChallengeSolver, values_at_keys, lean_navigation, goto_script
+from store import ListingStore, RunRecorder
+from checkpoint import CheckpointJournal
+from pacing import get_pacer
+from metrics import start_run, get_metrics
+from columnar import COMPRESSION
+from outputs import ListingWriter, ShardedWriter, SHARD_BY
+from media import MediaTable
+from validate import Validator
+from details import DetailEnricher
+from schema import InvalidListing, parse_daft
+from planner import BandPlanner, MAX_PAGES
+from jobs import JOBS_JSON, load_jobs, source_job, shards, with_query
 
 BASE_URL = "https://www.daft.ie"
 SCRIPT_DIR = Path(__file__).parent.parent
 OUTPUT_CSV = str(SCRIPT_DIR / "data/daft_listings.csv")
 OUTPUT_JSON = str(SCRIPT_DIR / "data/daft_listings.json")
+OUTPUT_COLUMNAR = str(SCRIPT_DIR / "data/daft_listings.col")
+SHARDS_DIR = str(SCRIPT_DIR / "data/shards")
+MANIFEST_JSON = str(SCRIPT_DIR / "data/daft_manifest.json")
+MEDIA_JSON = str(SCRIPT_DIR / "data/daft_media.json")
+QUARANTINE_JSON = str(SCRIPT_DIR / "data/daft_quarantine.json")
 TIMESTAMP_FILE = str(SCRIPT_DIR / "data/daft_scrape_timestamp.txt")
-
-# Split by price ranges to bypass 1000 result limit
-SEARCH_URLS = [
-    ("under_300k", "https://www.daft.ie/property-for-sale/dublin/houses?salePrice_to=300000"),
-    ("300k_500k", "https://www.daft.ie/property-for-sale/dublin/houses?salePrice_from=300000&salePrice_to=500000"),
-    ("500k_700k", "https://www.daft.ie/property-for-sale/dublin/houses?salePrice_from=500000&salePrice_to=700000"),
-    ("700k_1m", "https://www.daft.ie/property-for-sale/dublin/houses?salePrice_from=700000&salePrice_to=1000000"),
-    ("over_1m", "https://www.daft.ie/property-for-sale/dublin/houses?salePrice_from=1000000"),
+CHANGES_JSON = str(SCRIPT_DIR / "data/daft_changes.json")
+CHECKPOINT_FILE = str(SCRIPT_DIR / "data/daft_checkpoint.jsonl")
+# One cached price partition per search (jobs.py shard)
+BANDS_FILE = str(SCRIPT_DIR / "data/daft_price_bands-{search}.json")
+
+# Split by price ranges to bypass 1000 result limit. This is only the starting point -
+# the planner bisects any band that's over the cap and caches the partition it ends up with.
+# jobs.json can set its own.
+PRICE_BANDS = [
+    (None, 300000),
+    (300000, 500000),
+    (500000, 700000),
+    (700000, 1000000),
+    (1000000, None),
 ]
 
-# For faster scraping - batch multiple pages
+# Incremental runs sort newest first and stop once a page has nothing new
+NEWEST_FIRST = {'sort': 'publishDateDesc'}
+
+# Lean navigation: Daft's own hosts, and how to spot its error page without serialising the DOM
+SITE_DOMAINS = ('daft.ie',)
+ERROR_PAGE_CHECK = "marker => !!document.body && document.body.innerText.toLowerCase().includes(marker)"
+
+# Number of browser tabs fetching pages at the same time (across all price ranges).
+# The request rate itself is set by the shared pacer (pacing.py), not the number of tabs.
 CONCURRENT_PAGES = 5
 
+def decode_next_data(text):
+    """Decode only pageProps.listings and pageProps.paging out of the __NEXT_DATA__ text
+
+    The rest of the blob (filters, ads, translations...) is never built. Falls back to
+    decoding everything if the two keys can't be found where they're expected - which
+    is also how a page with no results is read.
+    """
+    found = {}
+    for key, value in values_at_keys(text, 'listings|paging'):
+        # An empty list proves nothing - some other "listings": [] in the blob would pass
+        if key == 'listings' and isinstance(value, list) and value and all(
+                isinstance(item, dict) and 'listing' in item for item in value):
+            found.setdefault('listings', value)
+        elif key == 'paging' and isinstance(value, dict) and 'totalResults' in value:
+            found.setdefault('paging', value)
+        if len(found) == 2:
+            return {'props': {'pageProps': found}}
+    return json.loads(text)
+
+
+def parse_next_data(data):
+    """Parse listings and paging info out of a decoded __NEXT_DATA__ blob"""
+    props = data.get('props', {}).get('pageProps', {})
+
+    # Get paging info for total count
+    paging = props.get('paging', {})
+    total_count = paging.get('totalResults', 0)
+    total_pages = paging.get('totalPages', 1)
+
+    # Listings are directly in pageProps
+    listings_data = props.get('listings', [])
+
+    listings = []
+    for item in listings_data:
+        try:
+            listings.append(parse_daft(item, BASE_URL))
+        except InvalidListing as e:
+            print(f"  Skipping listing: {e}")
 
-def extract_listings_from_page(page):
-    """Extract listings from __NEXT_DATA__ JSON"""
-    try:
-        script = page.query_selector('script#__NEXT_DATA__')
-        if not script:
-            return [], 0
+    return listings, total_count, total_pages
 
-        data = json.loads(script.inner_text())
-        props = data.get('props', {}).get('pageProps', {})
 
-        # Get paging info for total count
-        paging = props.get('paging', {})
-        total_count = paging.get('totalResults', 0)
-        total_pages = paging.get('totalPages', 1)
+def decode_detail_page(text):
+    """Decode only pageProps.listing out of a listing page's __NEXT_DATA__ text"""
+    for key, value in values_at_keys(text, 'listing'):
+        if isinstance(value, dict) and 'id' in value and 'seoFriendlyPath' in value:
+            return {'props': {'pageProps': {'listing': value}}}
+    return json.loads(text)
 
-        # Listings are directly in pageProps
-        listings_data = props.get('listings', [])
 
-        listings = []
-        for item in listings_data:
-            listing = item.get('listing', {})
-            coords = listing.get('point', {}).get('coordinates', [0, 0])
+def parse_detail_page(data, listing):
+    """The listing on its own page (see details.py), or None if it isn't there"""
+    item = data.get('props', {}).get('pageProps', {}).get('listing')
+    if not isinstance(item, dict) or str(item.get('id')) != listing.listing_id:
+        return None
+    return parse_daft({'listing': item}, BASE_URL)
 
-            # Get more details
-            media = listing.get('media', {})
-            images = media.get('images', [])
-            image_url = images[0].get('size720x480', '') if images else ''
 
-            # Get seller info
-            seller = listing.get('seller', {})
+async def extract_listings_from_page(page, stats=None):
+    """Extract listings from __NEXT_DATA__ JSON
 
-            # Convert publish date from milliseconds timestamp to readable date
-            publish_ts = listing.get('publishDate', 0)
-            if publish_ts:
-                try:
-                    listed_dt = datetime.fromtimestamp(publish_ts / 1000)
-                    publish_date = listed_dt.strftime('%Y-%m-%d')
-                    days_on_market = (datetime.now() - listed_dt).days
-                except:
-                    publish_date = ''
-                    days_on_market = ''
-            else:
-                publish_date = ''
-                days_on_market = ''
-
-            # Get floor area
-            floor_area = listing.get('floorArea', {})
-            size_sqm = floor_area.get('value', '') if isinstance(floor_area, dict) else ''
-
-            # Get BER
-            ber_info = listing.get('ber', {})
-            ber = ber_info.get('rating', '') if isinstance(ber_info, dict) else ''
-
-            listings.append({
-                'listing_id': str(listing.get('id', '')),
-                'url': BASE_URL + listing.get('seoFriendlyPath', ''),
-                'address': listing.get('title', ''),
-                'price': listing.get('price', ''),
-                'beds': listing.get('numBedrooms', ''),
-                'baths': listing.get('numBathrooms', ''),
-                'size_sqm': str(size_sqm),
-                'property_type': listing.get('propertyType', ''),
-                'ber': ber,
-                'latitude': str(coords[1]) if coords and len(coords) > 1 else '',
-                'longitude': str(coords[0]) if coords and len(coords) > 0 else '',
-                'date_listed': publish_date,
-                'days_on_market': str(days_on_market) if days_on_market != '' else '',
-                'image_url': image_url,
-                'agent': seller.get('name', ''),
-                'agent_branch': seller.get('branch', ''),
-            })
-
-        return listings, total_count, total_pages
+    Pass a dict as stats to get the payload size and the read/decode/parse times back.
+    """
+    try:
+        start = time.perf_counter()
+        script = await page.query_selector('script#__NEXT_DATA__')
+        if not script:
+            return [], 0, 1
+
+        text = await script.inner_text()
+        read = time.perf_counter()
+        data = decode_next_data(text)
+        decoded = time.perf_counter()
+        result = parse_next_data(data)
+        if stats is not None:
+            stats.update(bytes=len(text.encode('utf-8')), read_script=read - start, decode=decoded - read,
+                         parse=time.perf_counter() - decoded)
+        return result
 
     except Exception as e:
         print(f"  Error extracting: {e}")
@@ -130,174 +164,528 @@ def extract_listings_from_page(page):
         return [], 0, 1
 
 
-def main():
-    print("=" * 60)
-    print("Daft.ie Dublin Houses Scraper")
-    print("=" * 60)
+class BrowserFetcher:
+    """Loads pages in a Playwright tab and reads __NEXT_DATA__ out of the DOM
 
-    all_listings = []
-    start_time = time.time()
-    scrape_timestamp = datetime.now().isoformat()
+    With lean=True (see lean_navigation) it returns as soon as the script is attached
+    and only looks at the rest of the page when the script doesn't turn up.
+    """
 
-    with sync_playwright() as p:
-        print("\nLaunching Chrome with your profile...")
+    def __init__(self, page, lean=False):
+        self.page = page
+        self.lean = lean
 
-        # Try to use your Chrome profile (has cookies)
-        user_agent = random.choice(USER_AGENTS)
-        print(f"  Using UA: {user_agent[:50]}...")
+    async def fetch(self, url, band_name, first_page=False):
+        if self.lean:
+            return await self.fetch_lean(url, band_name, first_page)
+        page = self.page
+        metrics = get_metrics('daft')
+        with metrics.span('goto', band_name):
+            await page.goto(url, wait_until='domcontentloaded', timeout=30000 if first_page else 20000)
 
-        try:
-            context = p.chromium.launch_persistent_context(
-                user_data_dir=CHROME_USER_DATA + "/Default",
-                channel='chrome',  # Use installed Chrome
-                headless=True,    # Visible - helps with Cloudflare
-                user_agent=user_agent,
-                args=['--disable-blink-features=AutomationControlled'],
-            )
-            print("✓ Using your Chrome profile")
-        except:
-            # Fallback to fresh browser
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(user_agent=user_agent)
-            print("⚠ Using fresh browser (might get Cloudflare'd)")
-
-        page = context.pages[0] if context.pages else context.new_page()
-
-        # Loop through price ranges to bypass Daft's 1000 result limit
-        for range_name, search_url in SEARCH_URLS:
-            print(f"\n{'='*50}")
-            print(f"Scraping: {range_name}")
-            print(f"{'='*50}")
-
-            # First page
-            page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
-            page.wait_for_selector('script#__NEXT_DATA__', state='attached', timeout=10000)
+        if first_page:
+            with metrics.span('wait_for_selector', band_name):
+                await page.wait_for_selector('script#__NEXT_DATA__', state='attached', timeout=10000)
 
             # Check for Cloudflare
-            content = page.content()
-            if 'challenge' in content.lower() or 'checking your browser' in content.lower():
-                print("\n⚠ Cloudflare challenge detected!")
+            with metrics.span('page_check', band_name):
+                content = (await page.content()).lower()
+            if 'challenge' in content or 'checking your browser' in content:
+                print(f"\n⚠ Cloudflare challenge detected on {band_name}!")
                 print("  Please solve it in the browser window...")
-                page.wait_for_url("**/property-for-sale/**", timeout=120000)
+                with metrics.span('challenge', band_name):
+                    await page.wait_for_url("**/property-for-sale/**", timeout=120000)
                 print("✓ Challenge solved!")
+        else:
+            # Check for error page
+            with metrics.span('page_check', band_name):
+                content = (await page.content()).lower()
+            if 'something went wrong' in content:
+                raise Exception("Rate limited - got error page")
+
+            with metrics.span('wait_for_selector', band_name):
+                await page.wait_for_selector('script#__NEXT_DATA__', state='attached', timeout=10000)
+
+        stats = {}
+        result = await extract_listings_from_page(page, stats)
+        metrics.fetched(band_name, stats)
+        return result
+
+    async def fetch_lean(self, url, band_name, first_page=False):
+        page = self.page
+        metrics = get_metrics('daft')
+        timeout = 30000 if first_page else 20000
+        try:
+            with metrics.span('goto', band_name):
+                await goto_script(page, url, 'script#__NEXT_DATA__', timeout)
+        except Exception:
+            # No data - find out whether it's the error page or a challenge
+            with metrics.span('page_check', band_name):
+                content = (await page.content()).lower()
+            if 'something went wrong' in content:
+                raise Exception("Rate limited - got error page")
+            if not ('challenge' in content or 'checking your browser' in content):
+                raise
+            print(f"\n⚠ Cloudflare challenge detected on {band_name}!")
+            with metrics.span('challenge', band_name):
+                await page.wait_for_selector('script#__NEXT_DATA__', state='attached', timeout=120000)
+            print("✓ Challenge solved!")
+
+        if not first_page:
+            # Daft's error page is a Next.js page too, so it has a __NEXT_DATA__ of its own
+            with metrics.span('page_check', band_name):
+                error = await page.evaluate(ERROR_PAGE_CHECK, 'something went wrong')
+            if error:
+                raise Exception("Rate limited - got error page")
+
+        stats = {}
+        result = await extract_listings_from_page(page, stats)
+        metrics.fetched(band_name, stats)
+        return result
+
+
+class HttpFetcher:
+    """Fetches the raw HTML over plain HTTP and parses __NEXT_DATA__ without a browser"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def fetch(self, url, band_name, first_page=False):
+        markers = () if first_page else (b'something went wrong',)
+        stats = {}
+        try:
+            data = await asyncio.to_thread(self.backend.fetch_json, url, '__NEXT_DATA__', markers, stats,
+                                           decode_next_data)
+            start = time.perf_counter()
+            result = parse_next_data(data)
+            stats['parse'] = time.perf_counter() - start
+        finally:
+            get_metrics('daft').fetched(band_name, stats)
+        return result
+
+
+async def scrape_first_page(fetcher, band, pacer):
+    """Load page 1 of a price band and return its listings, result count and page count"""
+    with get_metrics('daft').span('pacer_wait', band.name):
+        await pacer.wait_async()
+    return await fetcher.fetch(band.url, band.name, first_page=True)
+
+
+async def scrape_page(fetcher, band_name, url, pacer):
+    """Fetch one results page, raising if Daft served the rate-limit error page"""
+    with get_metrics('daft').span('pacer_wait', band_name):
+        await pacer.wait_async()
+    listings, *_ = await fetcher.fetch(url, band_name)
+    return listings
+
+
+def unchanged_page(listings, store):
+    """Incremental runs: True if every listing on the page is already in the store as it is now"""
+    return store is not None and bool(listings) and all(store.is_unchanged('daft', l) for l in listings)
+
+
+def next_pages(band_name, page_num, total_pages, unchanged, store=None):
+    """Pages to queue once a page is done - first pages queue up the rest of their band
+
+    With a store (incremental mode) each page only queues the next one, and a band stops
+    as soon as a page comes back with nothing new or changed since the last run.
+    """
+    if store is None:
+        return range(2, total_pages + 1) if page_num == 1 else []
+    if unchanged:
+        print(f"  {band_name}: page {page_num} unchanged since last run - stopping")
+        return []
+    return [page_num + 1] if page_num < total_pages else []
+
+
+def first_page_done(band, total_count, total_pages, planner, journal):
+    """Split a band that's over the result cap, otherwise return how many pages to scrape"""
+    if planner.needs_split(total_count, total_pages):
+        sub_bands = planner.split(band)
+        if sub_bands:
+            print(f"  {band.name}: {total_count} listings is over the cap - splitting into "
+                  f"{', '.join(b.name for b in sub_bands)}")
+            journal.record_split(band.name)
+            return sub_bands, 0
+        print(f"  ⚠ {band.name}: {total_count} listings but band can't be narrowed - some will be missed")
+
+    planner.record(band, total_count)
+    total_pages = min(total_pages, MAX_PAGES)
+    print(f"✓ {band.name}: {total_count} listings, scraping up to {total_pages} pages")
+    return [], total_pages
+
+
+async def worker(fetcher, queue, done_pages, pacer, planners, stats, journal, store=None):
+    """Pull (band, page) jobs off the shared queue until every band of every search is done
+
+    Each finished page's listings are handed on through done_pages straight away.
+    planners has each search's BandPlanner.
+    """
+    metrics = get_metrics('daft')
+    while True:
+        band, page_num, total_pages = await queue.get()
+        try:
+            for attempt in range(3):  # Retry up to 3 times
+                try:
+                    if page_num == 1:
+                        listings, total_count, total_pages = await scrape_first_page(fetcher, band, pacer)
+                        sub_bands, total_pages = first_page_done(band, total_count, total_pages,
+                                                                 planners[band.search], journal)
+                        pacer.success()
+                        if sub_bands:
+                            for sub_band in sub_bands:
+                                queue.put_nowait((store_url(sub_band, store), 1, '?'))
+                            break
+                        with metrics.span('journal_write'):
+                            journal.record(band.name, 1, total_pages, listings, total_count)
+                    else:
+                        listings = await scrape_page(fetcher, band.name, with_query(band.url, page=page_num), pacer)
+                        with metrics.span('journal_write'):
+                            journal.record(band.name, page_num, total_pages, listings)
+                        pacer.success()
+
+                    unchanged = unchanged_page(listings, store)
+                    for next_page in next_pages(band.name, page_num, total_pages, unchanged, store):
+                        queue.put_nowait((band, next_page, total_pages))
+
+                    done_pages.put_nowait(listings)
+                    metrics.page(band.name, len(listings))
+                    stats['listings'] += len(listings)
+                    stats['pages'] += 1
+
+                    elapsed = time.time() - stats['start_time']
+                    rate = stats['listings'] / elapsed * 60
+                    print(f"  {band.name} page {page_num}/{total_pages}: {len(listings)} listings "
+                          f"(total: {stats['listings']}, {rate:.0f}/min)")
+
+                    break  # Success, move to next page
+
+                except Exception as e:
+                    # Slows every tab down, not just this one
+                    wait_time = pacer.failure(e)
+                    metrics.retry(band.name, failed=attempt == 2)
+                    metrics.record('backoff', wait_time)
+                    if attempt < 2:
+                        print(f"  {band.name} page {page_num}: Retry {attempt + 1}/3 "
+                              f"(all tabs waiting {wait_time:.0f}s, now {pacer.rate:.0f}/min)...")
+                    else:
+                        print(f"  {band.name} page {page_num}: Failed after 3 attempts - {e}")
+        finally:
+            queue.task_done()
+
+
+def store_url(band, store):
+    """Incremental runs ask for newest first"""
+    return band._replace(url=with_query(band.url, **NEWEST_FIRST)) if store is not None else band
+
+
+def queue_band(band, queue, replayed, planner, journal, store):
+    """Queue a band's first page, or - when resuming - whatever it still has left to do
+
+    replayed has (total_pages, unchanged) for each (band, page) already in the journal.
+    """
+    if band.name in journal.splits:
+        for sub_band in planner.split(band):
+            queue_band(sub_band, queue, replayed, planner, journal, store)
+        return
+
+    band = store_url(band, store)
+    if not journal.done(band.name, 1):
+        queue.put_nowait((band, 1, '?'))
+        return
+
+    planner.record(band, journal.counts.get(band.name, 0))
+    for (name, page_num), (total_pages, unchanged) in sorted(replayed.items()):
+        if name != band.name:
+            continue
+        for next_page in next_pages(band.name, page_num, total_pages, unchanged, store):
+            if not journal.done(band.name, next_page):
+                queue.put_nowait((band, next_page, total_pages))
+
+
+async def run_workers(fetchers, searches, price_bands, start_time, journal, store=None):
+    """Scrape every price band of every search with a bounded pool of fetchers sharing one pacer
+
+    An async generator of pages of listings, in the order they finish.
+    """
+    # Every price band of every search starts with its first page; those queue up the
+    # remaining pages (or split the band if it's over the cap), so all bands are fetched
+    # at once and a free fetcher takes whatever page is next, whichever search it's from.
+    # Pages already in the checkpoint journal are replayed from it instead of refetched.
+    replayed = {}
+    stats = {'listings': 0, 'pages': 0, 'start_time': start_time}
+    for band_name, page_num, total_pages, listings in journal.replay():
+        replayed[(band_name, page_num)] = (total_pages, unchanged_page(listings, store))
+        stats['listings'] += len(listings)
+        stats['pages'] += 1
+        yield listings
+
+    planners = {search.name: BandPlanner(search.url, price_bands, BANDS_FILE.format(search=search.name), search.name)
+                for search in searches}
+    queue = asyncio.Queue()
+    for planner in planners.values():
+        for band in planner.bands:
+            queue_band(band, queue, replayed, planner, journal, store)
+
+    pacer = get_pacer('daft')
+    print(f"\nScraping {sum(len(p.bands) for p in planners.values())} price bands of {len(planners)} searches "
+          f"with {len(fetchers)} workers (starting at {pacer.rate:.0f} requests/min)...")
+
+    done_pages = asyncio.Queue()
+    workers = [asyncio.create_task(worker(f, queue, done_pages, pacer, planners, stats, journal, store))
+               for f in fetchers]
+
+    async def all_done():
+        # Workers hand a page on before marking its job done, so this always comes last
+        await queue.join()
+        done_pages.put_nowait(None)
+
+    waiter = asyncio.create_task(all_done())
+    try:
+        while (listings := await done_pages.get()) is not None:
+            yield listings
+    finally:
+        for task in workers + [waiter]:
+            task.cancel()
+        await asyncio.gather(*workers, waiter, return_exceptions=True)
+
+    print(f"  Pacing: {pacer.summary()}")
+    for planner in planners.values():
+        planner.save()
+
+
+async def scrape_in_context(context, concurrency, searches, price_bands, start_time, journal, store=None,
+                            lean=False):
+    """Open a pool of tabs in a browser context and scrape every band with them
+
+    The tabs are shared by every price band, so the context's cache stays warm
+    across bands. lean=True turns on lean navigation for the whole context.
+    """
+    if lean:
+        metrics = get_metrics('daft')
+        await lean_navigation(context, SITE_DOMAINS, lambda request: metrics.count('blocked_requests'))
+    pages = list(context.pages[:concurrency])
+    while len(pages) < concurrency:
+        pages.append(await context.new_page())
 
-            listings, total_count, total_pages = extract_listings_from_page(page)
-            all_listings.extend(listings)
-
-            # Cap at 49 pages (Daft breaks at 50)
-            total_pages = min(total_pages, 49)
-            print(f"✓ Found {total_count} listings, scraping up to {total_pages} pages")
-            print(f"  Page 1/{total_pages}: {len(listings)} listings")
-
-            # Scrape remaining pages
-            consecutive_errors = 0
-            for page_num in range(2, total_pages + 1):
-                url = f"{search_url}&page={page_num}"
-
-                for attempt in range(3):  # Retry up to 3 times
-                    try:
-                        if consecutive_errors > 0:
-                            time.sleep(5)  # Slow down after errors
-
-                        page.goto(url, wait_until='domcontentloaded', timeout=20000)
-
-                        # Check for error page
-                        if 'something went wrong' in page.content().lower():
-                            raise Exception("Rate limited - got error page")
-
-                        page.wait_for_selector('script#__NEXT_DATA__', state='attached', timeout=10000)
-                        listings, *_ = extract_listings_from_page(page)
-                        all_listings.extend(listings)
-
-                        elapsed = time.time() - start_time
-                        rate = len(all_listings) / elapsed * 60
-                        print(f"  Page {page_num}/{total_pages}: {len(listings)} listings "
-                              f"(total: {len(all_listings)}, {rate:.0f}/min)")
-
-                        consecutive_errors = 0
-
-                        # Random human-like delay
-                        delay = random.uniform(0.8, 2.0) + (page_num / 150)
-                        time.sleep(delay)
-
-                        # Save progress every 10 pages
-                        if page_num % 10 == 0:
-                            with open(OUTPUT_JSON + '.partial', 'w') as f:
-                                json.dump(all_listings, f)
-
-                        break  # Success, move to next page
-
-                    except Exception as e:
-                        consecutive_errors += 1
-                        if attempt < 2:
-                            wait_time = 10 * (attempt + 1)  # 10s, 20s
-                            print(f"  Page {page_num}: Retry {attempt + 1}/3 (waiting {wait_time}s)...")
-                            time.sleep(wait_time)
-                        else:
-                            print(f"  Page {page_num}: Failed after 3 attempts - {e}")
-
-                # If too many consecutive errors, take a long break
-                if consecutive_errors >= 3:
-                    print("  ⚠ Rate limited - waiting 30s...")
-                    time.sleep(30)
-                    consecutive_errors = 0
-
-            # Summary for this price range
-            print(f"  ✓ {range_name} complete - total so far: {len(all_listings)}")
-            time.sleep(2)  # Brief pause between ranges
-
-        context.close()
-
-    # Remove duplicates
-    seen = set()
-    unique_listings = []
-    for l in all_listings:
-        if l['listing_id'] not in seen:
-            seen.add(l['listing_id'])
-            unique_listings.append(l)
-
-    elapsed = time.time() - start_time
-    print(f"\n{'=' * 60}")
-    print(f"✓ Scraped {len(unique_listings)} unique listings in {elapsed:.1f}s")
+    try:
+        fetchers = [BrowserFetcher(page, lean) for page in pages]
+        async for listings in run_workers(fetchers, searches, price_bands, start_time, journal, store):
+            yield listings
+    finally:
+        await context.close()
 
-    # Save outputs
-    if unique_listings:
-        fieldnames = list(unique_listings[0].keys())
 
-        with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(unique_listings)
-        print(f"✓ CSV: {OUTPUT_CSV}")
+async def scrape_all(concurrency, searches, price_bands, journal, backend='browser', store=None, browser=None,
+                     lean=False):
+    """Scrape every price band of every search (jobs.py shards), through browser tabs or plain HTTP
+
+    An async generator of pages of listings, in the order they finish. Pass a running
+    Playwright browser to share it with other scrapers (see run_all.py); otherwise
+    Chrome is launched here with your profile.
+    """
+    start_time = time.time()
+    user_agent = random.choice(USER_AGENTS)
+    print(f"  Using UA: {user_agent[:50]}...")
+
+    if backend == 'http':
+        print("\nUsing HTTP backend (browser only for challenges)")
+        http_backend = HttpBackend(user_agent, challenge_solver=BrowserChallengeSolver('script#__NEXT_DATA__'))
+        try:
+            async for listings in run_workers([HttpFetcher(http_backend) for _ in range(concurrency)],
+                                              searches, price_bands, start_time, journal, store):
+                yield listings
+        finally:
+            http_backend.close()
+        print(f"  Downloaded {http_backend.bytes_read / 1e6:.1f} MB")
+    elif browser is not None:
+        print("\nUsing shared browser")
+        context = await browser.new_context(user_agent=user_agent)
+        async for listings in scrape_in_context(context, concurrency, searches, price_bands, start_time,
+                                                journal, store, lean):
+            yield listings
+    else:
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as p:
+            print("\nLaunching Chrome with your profile...")
+
+            # Try to use your Chrome profile (has cookies)
+            try:
+                context = await p.chromium.launch_persistent_context(
+                    user_data_dir=CHROME_USER_DATA + "/Default",
+                    channel='chrome',  # Use installed Chrome
+                    headless=True,    # Visible - helps with Cloudflare
+                    user_agent=user_agent,
+                    args=['--disable-blink-features=AutomationControlled'],
+                )
+                print("✓ Using your Chrome profile")
+            except:
+                # Fallback to fresh browser
+                browser = await p.chromium.launch(headless=True)
+                context = await browser.new_context(user_agent=user_agent)
+                print("⚠ Using fresh browser (might get Cloudflare'd)")
+
+            async for listings in scrape_in_context(context, concurrency, searches, price_bands, start_time,
+                                                journal, store, lean):
+                yield listings
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Daft.ie Dublin Houses Scraper")
+    parser.add_argument('--concurrency', type=int,
+                        help=f"pages fetched at once (default: the job spec's, or {CONCURRENT_PAGES})")
+    parser.add_argument('--jobs', default=JOBS_JSON,
+                        help="job spec with the regions and property types to search (see jobs.py)")
+    parser.add_argument('--backend', choices=['browser', 'http'], default='browser',
+                        help="browser: full Chromium navigation, http: plain HTTP + embedded JSON")
+    parser.add_argument('--incremental', action='store_true',
+                        help="newest first, stop at listings unchanged since the last run")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run from its checkpoint journal")
+    parser.add_argument('--compress', choices=list(COMPRESSION),
+                        help="compress the columnar output (.col.gz / .col.br)")
+    parser.add_argument('--lean', action='store_true',
+                        help="browser backend: skip images/fonts/CSS/third parties, read the data as soon as it's there")
+    parser.add_argument('--details', action='store_true',
+                        help="fetch the page of each listing with blank fields and fill them in (cached)")
+    parser.add_argument('--shard-by', choices=SHARD_BY,
+                        help="also write content-hashed CSV shards by area or price band, with a manifest")
+    parser.add_argument('--compact-images', action='store_true',
+                        help="write image URLs as a template reference plus key (see media.py)")
+    parser.add_argument('--allow-drop', action='store_true',
+                        help="write the outputs even if a full run found far fewer listings than the last")
+    return parser
+
+
+def open_writer(args, scrape_timestamp):
+    shards = None
+    if args.shard_by:
+        shards = ShardedWriter(SHARDS_DIR, MANIFEST_JSON, 'daft', args.shard_by, scrape_timestamp)
+    media = MediaTable(MEDIA_JSON) if args.compact_images else None
+    return ListingWriter(OUTPUT_CSV, OUTPUT_JSON, OUTPUT_COLUMNAR, scrape_timestamp, args.compress, shards, media)
+
+
+async def run(args, browser=None):
+    """Scrape, update the store and write the outputs - returns a summary of the run"""
+    print("=" * 60)
+    print("Daft.ie Dublin Houses Scraper")
+    print("=" * 60)
 
-        with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-            output_data = {
-                'scraped_at': scrape_timestamp,
-                'listings': unique_listings
-            }
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
+    start_time = time.time()
+    jobs = load_jobs(args.jobs)
+    job = source_job(jobs, 'daft')
+    searches = shards(jobs, 'daft')
+    price_bands = [tuple(band) for band in job.get('price_bands', PRICE_BANDS)]
+    concurrency = max(1, args.concurrency or job.get('concurrency', CONCURRENT_PAGES))
+    print(f"Searching {', '.join(s.name for s in searches)}")
+
+    metrics = start_run('daft')
+    journal = CheckpointJournal(CHECKPOINT_FILE, resume=args.resume)
+    scrape_timestamp = journal.started_at
+
+    store = ListingStore()
+    recorder = RunRecorder(store, 'daft', scrape_timestamp, not args.incremental, CHANGES_JSON)
+    changes = {}
+    scraped = 0
+    writer = None
+    details = None
+    validator = Validator('daft', QUARANTINE_JSON)
+    if args.details:
+        details = DetailEnricher('daft', '__NEXT_DATA__', parse_detail_page, random.choice(USER_AGENTS),
+                                 decode_detail_page)
+    try:
+        incremental_store = store if args.incremental else None
+        if not args.incremental:
+            # Full runs stream each page straight into the outputs
+            writer = open_writer(args, scrape_timestamp)
+
+        async for listings in scrape_all(concurrency, searches, price_bands, journal, args.backend,
+                                         incremental_store, browser, args.lean):
+            if details is not None:
+                with metrics.span('details'):
+                    listings = await details.fill(listings)
+            # Bad rows go to the quarantine file instead of the store and outputs
+            with metrics.span('validate'):
+                listings = validator.check(listings)
+            # Staging drops listings already seen on an earlier page
+            with metrics.span('stage'):
+                listings = recorder.add(listings)
+            scraped += len(listings)
+            if writer is not None:
+                with metrics.span('write_outputs'):
+                    writer.write(listings)
+
+        elapsed = time.time() - start_time
+        print(f"\n{'=' * 60}")
+        print(f"✓ Scraped {scraped} unique listings in {elapsed:.1f}s")
+        # Stops here, before the store or outputs are touched, if the run came up far short
+        validator.finish(store.active_count('daft'), not args.incremental, args.allow_drop)
+
+        # Record this run in the store and write what changed since the last one
+        if scraped:
+            with metrics.span('store_update'):
+                changes = recorder.finish()
+            if args.incremental:
+                # Only saw the newest pages - the full outputs come from the store
+                writer = open_writer(args, scrape_timestamp)
+                with metrics.span('write_outputs'):
+                    writer.write(store.active_listings('daft'))
+        elif writer is not None:
+            writer.abort()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        store.close()
+        if details is not None:
+            details.close()
+            print(f"  Details: {details.summary()}")
+
+    # Save outputs
+    if scraped:
+        with metrics.span('finish_outputs'):
+            path = writer.close()
+        print(f"✓ CSV: {OUTPUT_CSV}")
         print(f"✓ JSON: {OUTPUT_JSON}")
+        print(f"✓ Columnar: {path}")
+        if args.shard_by:
+            print(f"✓ Shards: {len(writer.shards.shards)} by {args.shard_by} -> {MANIFEST_JSON}")
 
         # Save timestamp
         with open(TIMESTAMP_FILE, 'w', encoding='utf-8') as f:
             f.write(scrape_timestamp)
         print(f"✓ Timestamp: {TIMESTAMP_FILE}")
 
-        # Clean up partial file
-        partial_file = OUTPUT_JSON + '.partial'
-        if os.path.exists(partial_file):
-            os.remove(partial_file)
+        # Outputs are written - the checkpoint isn't needed any more
+        journal.finish()
 
         # Quick stats
-        prices = [int(l['price'].replace('€', '').replace(',', ''))
-                  for l in unique_listings if l['price'] and l['price'].replace('€', '').replace(',', '').isdigit()]
+        prices = writer.price_stats()
         if prices:
             print(f"\n📊 Price Stats:")
-            print(f"   Min: €{min(prices):,}")
-            print(f"   Max: €{max(prices):,}")
-            print(f"   Avg: €{sum(prices)//len(prices):,}")
+            print(f"   Min: €{prices[0]:,}")
+            print(f"   Max: €{prices[1]:,}")
+            print(f"   Avg: €{prices[2]:,}")
+
+    written = writer.count if scraped else 0
+    metrics_path = metrics.write({'backend': args.backend, 'incremental': args.incremental,
+                                  'unique_listings': written, 'pacer': get_pacer('daft').metrics()})
+    print(f"✓ Metrics: {metrics_path}")
 
     print("\nDone!")
+    return {
+        'source': 'daft',
+        'listings': written,
+        'elapsed': round(time.time() - start_time, 1),
+        'changes': {k: len(v) for k, v in changes.items()},
+        'metrics': metrics_path,
+    }
+
+
+def main():
+    asyncio.run(run(build_parser().parse_args()))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Cross-source duplicate matching
+
+The same house is often on both Daft and MyHome. Within a source the listing ID
+is enough, across sources we have to match on what the listing says: position,
+address and Eircode, with price/size/beds as a sanity check.
+
+Comparing every Daft listing with every MyHome one is O(n*m), so candidates
+come from indexes instead: a lat/lng grid (~100m cells, a listing only looks in
+its own and the 8 neighbouring cells), plus Eircode and house-number+street
+keys for listings with no usable coordinates. Each listing sees a handful of
+candidates, so matching stays close to linear as more counties are added.
+"""
+
+import re
+import json
+import argparse
+from pathlib import Path
+
+from schema import as_dict, from_dict, InvalidListing
+
+SCRIPT_DIR = Path(__file__).parent.parent
+SOURCES = {
+    'daft': str(SCRIPT_DIR / "data/daft_listings.json"),
+    'myhome': str(SCRIPT_DIR / "data/myhome_listings.json"),
+}
+LINKS_JSON = str(SCRIPT_DIR / "data/cross_source_duplicates.json")
+
+# ~110m north-south; longitude degrees are ~60% as long this far north
+CELL_LAT = 0.001
+CELL_LNG = 0.0017
+
+# How far two listings of the same house can disagree
+PRICE_TOLERANCE = 0.05
+SIZE_TOLERANCE = 0.10
+# Pins for the same house are usually within a few metres, but agents aren't always careful
+MAX_DISTANCE_CELLS = 1
+MIN_ADDRESS_SIMILARITY = 0.5
+
+# Routing key (letter + 2 digits, or D6W) + 4-character unique identifier
+EIRCODE = re.compile(r'\b([AC-FHKNPRTV-Y]\d{2}|D6W)\s?([0-9AC-FHKNPRTV-Y]{4})\b', re.IGNORECASE)
+ABBREVIATIONS = {
+    # "St" is Saint before a name and Street after one - fold all three together
+    'saint': 'st', 'street': 'st',
+    'rd': 'road', 'ave': 'avenue', 'av': 'avenue', 'pk': 'park',
+    'dr': 'drive', 'cres': 'crescent', 'ct': 'court', 'gdns': 'gardens', 'sq': 'square',
+    'tce': 'terrace', 'hts': 'heights', 'grv': 'grove', 'lwr': 'lower', 'upr': 'upper',
+    'apt': 'apartment', 'no': '',
+}
+# Tokens every Dublin address shares - they say nothing about which house it is
+STOP_TOKENS = {'co', 'county', 'dublin', 'wicklow', 'kildare', 'meath', 'the', 'of', 'and', 'ireland'}
+
+
+def eircode(address):
+    m = EIRCODE.search(address or '')
+    return (m.group(1) + m.group(2)).upper() if m else None
+
+
+def address_tokens(address):
+    """Lower-case, Eircode and punctuation stripped, abbreviations expanded"""
+    text = EIRCODE.sub(' ', (address or '').lower())
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", re.sub(r"['’`]", '', text)):
+        token = ABBREVIATIONS.get(token, token)
+        if token and token not in STOP_TOKENS:
+            tokens.append(token)
+    return tokens
+
+
+def street_key(tokens):
+    """House number + first word of the street, e.g. ('42', 'brackenwood')"""
+    for i, token in enumerate(tokens[:-1]):
+        if token[0].isdigit():
+            return token, tokens[i + 1]
+    return None
+
+
+def similarity(a, b):
+    """Jaccard similarity of two token sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def within(a, b, tolerance):
+    """True if either value is missing or they're within tolerance of each other"""
+    if not a or not b:
+        return True
+    return abs(a - b) <= tolerance * max(a, b)
+
+
+class Candidate:
+    """What the matcher needs from a listing, computed once"""
+
+    __slots__ = ('listing', 'tokens', 'token_set', 'eircode', 'street', 'cell')
+
+    def __init__(self, listing):
+        self.listing = listing
+        self.tokens = address_tokens(listing.address)
+        self.token_set = frozenset(self.tokens)
+        self.eircode = eircode(listing.address)
+        self.street = street_key(self.tokens)
+        if listing.latitude is not None and listing.longitude is not None:
+            self.cell = (int(listing.latitude // CELL_LAT), int(listing.longitude // CELL_LNG))
+        else:
+            self.cell = None
+
+
+class DuplicateIndex:
+    """Grid, Eircode and street indexes over one side of the match"""
+
+    def __init__(self, candidates):
+        self.grid = {}
+        self.eircodes = {}
+        self.streets = {}
+        for c in candidates:
+            if c.cell is not None:
+                self.grid.setdefault(c.cell, []).append(c)
+            if c.eircode:
+                self.eircodes.setdefault(c.eircode, []).append(c)
+            if c.street:
+                self.streets.setdefault(c.street, []).append(c)
+
+    def nearby(self, c):
+        found = {}
+        if c.cell is not None:
+            lat, lng = c.cell
+            for dlat in range(-MAX_DISTANCE_CELLS, MAX_DISTANCE_CELLS + 1):
+                for dlng in range(-MAX_DISTANCE_CELLS, MAX_DISTANCE_CELLS + 1):
+                    for other in self.grid.get((lat + dlat, lng + dlng), ()):
+                        found[id(other)] = other
+        for other in self.eircodes.get(c.eircode, ()) if c.eircode else ():
+            found[id(other)] = other
+        for other in self.streets.get(c.street, ()) if c.street else ():
+            found[id(other)] = other
+        return found.values()
+
+
+def match_score(a, b):
+    """0 if a and b can't be the same house, else higher = more certain"""
+    la, lb = a.listing, b.listing
+    if not within(la.price_num, lb.price_num, PRICE_TOLERANCE):
+        return 0
+    if not within(la.size_sqm, lb.size_sqm, SIZE_TOLERANCE):
+        return 0
+    if la.beds and lb.beds and la.beds != lb.beds:
+        return 0
+
+    # House/apartment numbers have to agree - "Apt 5" and "Apt 6" in one block are neighbours
+    numbers_a = {t for t in a.tokens if t[0].isdigit()}
+    numbers_b = {t for t in b.tokens if t[0].isdigit()}
+    if numbers_a and numbers_b and numbers_a != numbers_b:
+        return 0
+
+    if a.eircode and b.eircode:
+        # Eircodes are per-building - a mismatch rules it out, a match settles it
+        return 2.0 if a.eircode == b.eircode else 0
+
+    score = similarity(a.token_set, b.token_set)
+    if a.street and a.street == b.street:
+        score += 0.5
+    return score if score >= MIN_ADDRESS_SIMILARITY else 0
+
+
+def find_duplicates(listings):
+    """Pairs (i, j) of indexes into listings that are the same house on different sources
+
+    Each listing is matched at most once, best score first.
+    """
+    candidates = [Candidate(l) for l in listings]
+    by_source = {}
+    for i, c in enumerate(candidates):
+        by_source.setdefault(c.listing.source, []).append(i)
+
+    position = {id(c): i for i, c in enumerate(candidates)}
+    scored = []
+    sources = sorted(by_source)
+    for n, source in enumerate(sources):
+        for other_source in sources[n + 1:]:
+            index = DuplicateIndex(candidates[j] for j in by_source[other_source])
+            for i in by_source[source]:
+                for other in index.nearby(candidates[i]):
+                    score = match_score(candidates[i], other)
+                    if score:
+                        scored.append((score, i, position[id(other)]))
+
+    matched, pairs = set(), []
+    for score, i, j in sorted(scored, reverse=True):
+        if i not in matched and j not in matched:
+            matched.update((i, j))
+            pairs.append((i, j))
+    return pairs
+
+
+def completeness(listing):
+    return sum(1 for v in listing if v not in (None, '', False))
+
+
+def merge(a, b):
+    """One canonical listing: the more complete record, gaps filled from the other"""
+    primary, other = (a, b) if completeness(a) >= completeness(b) else (b, a)
+    filled = {field: value if value not in (None, '') else getattr(other, field)
+              for field, value in as_dict(primary).items()}
+    return primary._replace(**filled)
+
+
+def dedupe(listings):
+    """Listings with cross-source duplicates merged -> (listings, links)"""
+    pairs = find_duplicates(listings)
+    merged, dropped, links = {}, set(), []
+    for i, j in pairs:
+        canonical = merge(listings[i], listings[j])
+        keep, drop = (i, j) if canonical.source == listings[i].source else (j, i)
+        merged[keep] = canonical
+        dropped.add(drop)
+        links.append({
+            'source': listings[keep].source, 'listing_id': listings[keep].listing_id, 'url': listings[keep].url,
+            'duplicate_source': listings[drop].source, 'duplicate_id': listings[drop].listing_id,
+            'duplicate_url': listings[drop].url,
+        })
+    result = [merged.get(i, l) for i, l in enumerate(listings) if i not in dropped]
+    return result, links
+
+
+def load_listings(path, source):
+    with open(path, encoding='utf-8') as f:
+        rows = json.load(f)['listings']
+    listings = []
+    for row in rows:
+        try:
+            listings.append(from_dict(row, source))
+        except InvalidListing as e:
+            print(f"  Skipping {source} listing: {e}")
+    return listings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find listings that are on more than one site")
+    parser.add_argument('--output', default=LINKS_JSON)
+    args = parser.parse_args()
+
+    listings = []
+    for source, path in SOURCES.items():
+        if Path(path).exists():
+            listings.extend(load_listings(path, source))
+
+    unique, links = dedupe(listings)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'duplicates': links}, f, indent=2, ensure_ascii=False)
+    print(f"✓ {len(links)} listings are on more than one site: {len(listings)} -> {len(unique)} "
+          f"-> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Detail-page enrichment for listings the search results left incomplete
+
+The search payloads often leave fields blank - MyHome has no listing date or
+position for many houses, Daft no floor area or BER - and the dashboard then
+falls back to its default value/BER scores. With --details, every listing
+missing one of GAP_FIELDS has its own page fetched (plain HTTP, a few at a
+time, paced with the source's pacer) and the blanks filled in from it. Nothing
+the search result did say is ever overwritten.
+
+What a listing's page gave us is cached in data/detail_cache.db, keyed by
+source, listing ID and a hash of the search-result record. A listing is only
+fetched again once its search entry changes or the cache entry is older than
+CACHE_TTL_DAYS. Pages that had nothing to add are cached too, so a house with
+no BER isn't asked about again tomorrow.
+"""
+
+import json
+import sqlite3
+import asyncio
+from pathlib import Path
+from datetime import date, datetime, timedelta
+
+from fetch import HttpBackend, BrowserChallengeSolver
+from pacing import get_pacer
+from metrics import get_metrics
+from schema import FIELDS, InvalidListing, as_dict, from_dict
+from store import VOLATILE_FIELDS, listing_hash
+
+CACHE_FILE = str(Path(__file__).parent.parent / "data/detail_cache.db")
+
+# A listing missing any of these gets its page fetched
+GAP_FIELDS = ('size_sqm', 'ber', 'latitude', 'date_listed')
+
+# Cached pages are refetched after this long even if the search entry hasn't changed
+CACHE_TTL_DAYS = 30
+
+# Listing pages fetched at once - the pacer still sets the overall rate
+DETAIL_CONCURRENCY = 4
+
+# Never taken from a listing's page
+KEY_FIELDS = ('listing_id', 'source', 'url')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detail_cache (
+    source TEXT NOT NULL,
+    listing_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    PRIMARY KEY (source, listing_id)
+);
+"""
+
+
+def blank(value):
+    return value is None or value == ''
+
+
+def needs_details(listing):
+    return any(blank(getattr(listing, field)) for field in GAP_FIELDS)
+
+
+def gaps_filled(listing, detail):
+    """The fields a listing's page has that its search entry left blank"""
+    if detail is None:
+        return {}
+    return {field: getattr(detail, field) for field in FIELDS
+            if field not in KEY_FIELDS and field not in VOLATILE_FIELDS
+            and blank(getattr(listing, field)) and not blank(getattr(detail, field))}
+
+
+def apply_details(listing, fields):
+    """listing with its blanks filled from fields - days on market is worked out again from the date"""
+    filled = {k: v for k, v in fields.items() if blank(getattr(listing, k))}
+    if not filled:
+        return listing
+    if 'date_listed' in filled:
+        filled['days_on_market'] = (date.today() - date.fromisoformat(filled['date_listed'])).days
+    return from_dict({**as_dict(listing), **filled})
+
+
+class DetailCache:
+    """What each listing's page added, keyed by (source, listing_id) and the search entry's hash"""
+
+    def __init__(self, path=CACHE_FILE, ttl_days=CACHE_TTL_DAYS):
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.executescript(SCHEMA)
+        self.ttl_days = ttl_days
+
+    def close(self):
+        self.db.close()
+
+    def cutoff(self):
+        return (datetime.now() - timedelta(days=self.ttl_days)).isoformat()
+
+    def get(self, source, listing, content_hash):
+        """The cached fields, or None if the page was never fetched, has changed since or expired"""
+        row = self.db.execute(
+            "SELECT fields FROM detail_cache WHERE source = ? AND listing_id = ? AND content_hash = ? "
+            "AND fetched_at >= ?", (source, listing.listing_id, content_hash, self.cutoff())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, source, listing, content_hash, fields):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO detail_cache VALUES (?, ?, ?, ?, ?)",
+                (source, listing.listing_id, content_hash, datetime.now().isoformat(),
+                 json.dumps(fields, ensure_ascii=False)))
+
+    def evict(self):
+        """Drop expired entries - returns how many went"""
+        with self.db:
+            return self.db.execute("DELETE FROM detail_cache WHERE fetched_at < ?", (self.cutoff(),)).rowcount
+
+
+class DetailEnricher:
+    """Fills in listings' blank fields from their own pages, through the cache
+
+    decode(text) turns the page's embedded script into data, parse(data, listing)
+    finds the listing in it and returns a Listing (or None if it isn't there).
+    """
+
+    def __init__(self, source, script_id, parse, user_agent, decode=json.loads,
+                 concurrency=DETAIL_CONCURRENCY, cache=None):
+        self.source = source
+        self.script_id = script_id
+        self.parse = parse
+        self.decode = decode
+        self.backend = HttpBackend(user_agent, challenge_solver=BrowserChallengeSolver(f'script#{script_id}'))
+        self.cache = cache or DetailCache()
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.pacer = get_pacer(source)
+        self.metrics = get_metrics(source)
+        self.evicted = self.cache.evict()
+
+        self.cached = 0
+        self.fetched = 0
+        self.filled = 0
+        self.failed = 0
+
+    def close(self):
+        self.backend.close()
+        self.cache.close()
+
+    async def fill(self, listings):
+        """One page of listings with their gaps filled in, in the same order"""
+        listings = list(listings)
+        todo = [i for i, l in enumerate(listings) if needs_details(l)]
+        results = await asyncio.gather(*(self._fill(listings[i]) for i in todo))
+        for i, listing in zip(todo, results):
+            if listing is not listings[i]:
+                self.filled += 1
+            listings[i] = listing
+        return listings
+
+    async def _fill(self, listing):
+        content_hash = listing_hash(as_dict(listing))
+        fields = self.cache.get(self.source, listing, content_hash)
+        if fields is not None:
+            self.cached += 1
+        else:
+            async with self.semaphore:
+                fields = await self._fetch(listing)
+            if fields is None:
+                return listing
+            self.cache.put(self.source, listing, content_hash, fields)
+        return apply_details(listing, fields)
+
+    async def _fetch(self, listing):
+        """The fields the listing's page adds, or None if it couldn't be fetched"""
+        if self.pacer.should_give_up():
+            return None
+        with self.metrics.span('pacer_wait', 'details'):
+            await self.pacer.wait_async()
+        stats = {}
+        try:
+            data = await asyncio.to_thread(self.backend.fetch_json, listing.url, self.script_id, (), stats,
+                                           self.decode)
+            try:
+                detail = self.parse(data, listing)
+            except InvalidListing:
+                detail = None
+        except Exception as e:
+            self.pacer.failure(e)
+            self.metrics.retry('details', failed=True)
+            self.failed += 1
+            print(f"  Details for {listing.listing_id} failed: {e}")
+            return None
+        finally:
+            self.metrics.fetched('details', stats)
+
+        self.pacer.success()
+        self.metrics.page('details', 1)
+        self.fetched += 1
+        return gaps_filled(listing, detail)
+
+    def summary(self):
+        return (f"{self.fetched} pages fetched, {self.cached} from cache, {self.filled} listings filled in, "
+                f"{self.failed} failed, {self.evicted} expired cache entries dropped")
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Precompute the dashboard's scores and area stats once, at scrape time
+
+The dashboard used to parse both CSVs, rebuild the area stats and score every
+listing on each page load - with a linear percentile scan per listing, so it got
+quadratically slower as the market grew. This does the same work once over the
+scraped CSVs (sorted arrays + bisect for the percentiles) and writes one compact
+JSON file the dashboard can use as-is.
+
+The scoring mirrors script.js exactly (including its JS rounding). Unlike the
+in-browser fallback, houses listed on both sites are merged first (dedupe.py),
+so they don't count twice in the area stats, medians and percentiles.
+
+The same rows are also written split by area, into content-hashed files in
+data/shards/ listed in data/dashboard_manifest.json with the area stats. The
+dashboard loads the manifest, then only the shards its filters can match, and
+fetches the others when a filter needs them.
+"""
+
+import os
+import csv
+import json
+import math
+import re
+import time
+import hashlib
+from bisect import bisect_left
+from pathlib import Path
+from datetime import datetime
+
+from schema import InvalidListing, as_dict, from_dict
+from dedupe import dedupe, LINKS_JSON
+from aggregate import aggregate, write_aggregates, OUTPUT_JSON as AGGREGATES_JSON
+from geo import GeoResolver, fallback_area
+from thumbs import listing_thumbs
+from outputs import slug, HASH_LENGTH
+
+SCRIPT_DIR = Path(__file__).parent.parent
+SOURCES = {
+    'daft': str(SCRIPT_DIR / "data/daft_listings.csv"),
+    'myhome': str(SCRIPT_DIR / "data/myhome_listings.csv"),
+}
+OUTPUT_JSON = str(SCRIPT_DIR / "data/dashboard.json")
+SHARDS_DIR = SCRIPT_DIR / "data/shards"
+MANIFEST_JSON = str(SCRIPT_DIR / "data/dashboard_manifest.json")
+# Areas with fewer listings share a shard of up to SHARD_TARGET, so the dashboard
+# isn't fetching a hundred files of one or two houses
+MIN_SHARD_LISTINGS = 30
+SHARD_TARGET = 300
+
+# Raw CSV columns the dashboard still reads - everything else is derived here
+DASHBOARD_FIELDS = ('listing_id', 'url', 'address', 'price', 'beds', 'size_sqm',
+                    'property_type', 'ber', 'date_listed')
+
+BER_COSTS = {'A': 800, 'B': 1200, 'C': 1600, 'D': 2000, 'E': 2500, 'F': 3000, 'G': 3500}
+AVG_HEATING = 2000
+BER_SCORES = {'A': 100, 'B': 80, 'C': 60, 'D': 40, 'E': 25, 'F': 15, 'G': 10}
+# Checked in order with a substring match, so "End of Terrace" scores as Terrace
+TYPE_SCORES = (('Detached', 100), ('Semi-D', 85), ('Semi', 85), ('Bungalow', 80),
+               ('Terrace', 70), ('End', 75))
+WEIGHTS = {'demand': 0.40, 'value': 0.25, 'ber': 0.20, 'type': 0.15}
+
+# Column order of the listings table in the output file
+DERIVED_FIELDS = ('source', 'priceNum', 'bedsNum', 'sizeNum', 'daysNum', 'lat', 'lng', 'pricePerSqm',
+                  'area', 'heatingCost', 'heatingSaving', 'inPreferredArea', 'ppsPercentile', 'located', 'thumb')
+SCORE_FIELDS = ('score', 'level', 'parts', 'badges')
+
+# Preferred areas (South Dublin / North Wicklow coast)
+PREFERRED_AREAS = (
+    'dun laoghaire', 'dunlaoghaire', 'dún laoghaire',
+    'greystones', 'bray', 'blackrock', 'shankill',
+    'sallynoggin', 'dalkey', 'killiney', 'glasthule',
+    'monkstown', 'sandycove', 'glenageary', 'cabinteely',
+    'foxrock', 'cornelscourt', 'loughlinstown', 'ballybrack',
+    'kilmacud', 'stillorgan', 'mount merrion', 'booterstown',
+    'rathmichael', 'carrickmines',
+)
+
+LEADING_INT = re.compile(r'\s*([+-]?\d+)')
+LEADING_FLOAT = re.compile(r'\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)')
+
+
+def js_int(value):
+    """parseInt(value) || 0"""
+    m = LEADING_INT.match('' if value is None else str(value))
+    return int(m.group(1)) if m else 0
+
+
+def js_float(value):
+    """parseFloat(value) || 0"""
+    m = LEADING_FLOAT.match('' if value is None else str(value))
+    return float(m.group(1)) if m else 0
+
+
+def js_round(x):
+    """Math.round - halves go up, unlike Python's round()"""
+    return math.floor(x + 0.5)
+
+
+def is_preferred_area(address):
+    lower = address.lower()
+    return any(area in lower for area in PREFERRED_AREAS)
+
+
+def normalise(row, source):
+    """One CSV row -> the listing fields the dashboard works with"""
+    d = {field: '' if row.get(field) is None else str(row[field]).strip() for field in DASHBOARD_FIELDS}
+    d['source'] = source
+    d['priceNum'] = js_int(row.get('price_num')) or js_int(re.sub(r'[^0-9]', '', d['price']))
+    d['bedsNum'] = js_int(row.get('beds'))
+    d['sizeNum'] = js_float(row.get('size_sqm'))
+    d['daysNum'] = js_int(row.get('days_on_market'))
+
+    lat, lng = js_float(row.get('latitude')), js_float(row.get('longitude'))
+    # MyHome often has 0/empty Location coordinates but a BrochureMap position
+    if source == 'myhome' and lat == 0 and lng == 0:
+        lat, lng = js_float(row.get('brochure_latitude')), js_float(row.get('brochure_longitude'))
+    d['lat'], d['lng'] = lat, lng
+
+    d['pricePerSqm'] = js_round(d['priceNum'] / d['sizeNum']) if d['sizeNum'] > 0 else 0
+    d['area'] = fallback_area(d['address'])
+    d['located'] = 'exact' if lat and lng else ''
+    d['heatingCost'] = BER_COSTS.get(d['ber'][0], 2200) if d['ber'] else 2200
+    d['heatingSaving'] = AVG_HEATING - d['heatingCost']
+    d['inPreferredArea'] = is_preferred_area(d['address'])
+    d['thumb'] = ''
+    return d
+
+
+def percentile(value, sorted_values):
+    """Share of values at or above this one, as 0-100 (higher = cheaper per m2)"""
+    if not value or not sorted_values:
+        return 50
+    below = bisect_left(sorted_values, value)
+    return js_round((1 - below / len(sorted_values)) * 100)
+
+
+def build_area_stats(listings):
+    """Per-area aggregates plus the market-wide median days on market"""
+    days = sorted(d['daysNum'] for d in listings if d['daysNum'] > 0)
+    median_days = (days[len(days) // 2] if days else 0) or 60
+
+    prices = sorted(d['priceNum'] for d in listings)
+    p25 = prices[int(len(prices) * 0.25)]
+    p75 = prices[int(len(prices) * 0.75)]
+
+    grouped = {}
+    for d in listings:
+        grouped.setdefault(d['area'], []).append(d)
+
+    areas = {}
+    for area, members in grouped.items():
+        area_days = [d['daysNum'] for d in members if d['daysNum'] > 0]
+        area_pps = [d['pricePerSqm'] for d in members if d['pricePerSqm'] > 0]
+        area_prices = [d['priceNum'] for d in members]
+        avg_days = sum(area_days) / len(area_days) if area_days else median_days
+        avg_price = sum(area_prices) / len(area_prices)
+        areas[area] = {
+            'count': len(members),
+            'daysCount': len(area_days),
+            'avgDays': avg_days,
+            'avgPPS': sum(area_pps) / len(area_pps) if area_pps else 0,
+            'avgPrice': avg_price,
+            'minPrice': min(area_prices),
+            'maxPrice': max(area_prices),
+            'demandScore': max(0, min(100, 100 - avg_days / median_days * 50)),
+            'tier': 'affordable' if avg_price < p25 else 'premium' if avg_price > p75 else 'midrange',
+        }
+    return areas, median_days
+
+
+def desirability(d, area):
+    """0-100 score from area demand, value for the area, BER and property type"""
+    parts = {'demand': area.get('demandScore') or 50, 'value': 50, 'type': 60}
+
+    if d['pricePerSqm'] > 0 and area.get('avgPPS', 0) > 0:
+        r = d['pricePerSqm'] / area['avgPPS']
+        parts['value'] = 100 if r < 0.8 else 75 if r < 0.95 else 50 if r < 1.1 else 25
+
+    parts['ber'] = BER_SCORES.get(d['ber'][0], 30) if d['ber'] else 30
+
+    for name, points in TYPE_SCORES:
+        if d['property_type'] and name in d['property_type']:
+            parts['type'] = points
+            break
+
+    score = sum(parts[k] * w for k, w in WEIGHTS.items())
+    level = 'hot' if score >= 70 else 'warm' if score >= 50 else 'cool'
+    parts['demand'] = js_round(parts['demand'])
+    return {'score': js_round(score), 'level': level, 'parts': parts}
+
+
+def badges(d, area):
+    found = []
+    # Under 500k, 3+ bed, good BER, decent size - ideal starter home
+    if (d['priceNum'] <= 500000 and d['bedsNum'] >= 3 and d['ber'] and d['ber'][0] in 'ABC'
+            and d['sizeNum'] >= 80):
+        found.append('ftb')
+    # Been on market a while - room to negotiate
+    if d['daysNum'] >= 90:
+        found.append('negotiate')
+    # Large property, priced well below area average
+    if (d['sizeNum'] >= 100 and area.get('avgPPS') and d['pricePerSqm'] < area['avgPPS'] * 0.85
+            and area.get('tier') != 'premium'):
+        found.append('gem')
+    return found
+
+
+def enrich(rows_by_source, geo=None, thumbs=None):
+    """Merge cross-source duplicates, then normalise, score and aggregate every listing
+
+    With a GeoResolver, areas and missing positions come from the gazetteer (geo.py)
+    rather than the second-to-last address part. thumbs maps "source/listing_id" to
+    the listing's cached thumbnail (thumbs.py). Returns the dashboard dataset and the duplicate links.
+    """
+    records = []
+    for source, rows in rows_by_source.items():
+        for row in rows:
+            try:
+                records.append(from_dict(row, source))
+            except InvalidListing as e:
+                print(f"  Skipping {source} listing: {e}")
+    # The same house on both sites would otherwise count twice in every area stat
+    records, links = dedupe(records)
+
+    listings = [d for d in (normalise(as_dict(l), l.source) for l in records) if d['priceNum'] > 0]
+    if not listings:
+        raise ValueError("no priced listings to enrich")
+    if geo is not None:
+        for d in listings:
+            d['area'], d['lat'], d['lng'], d['located'] = geo.resolve(d['address'], d['lat'], d['lng'])
+    if thumbs:
+        for d in listings:
+            d['thumb'] = thumbs.get(f"{d['source']}/{d['listing_id']}", '')
+
+    areas, median_days = build_area_stats(listings)
+    all_pps = sorted(d['pricePerSqm'] for d in listings if d['pricePerSqm'] > 0)
+
+    for d in listings:
+        area = areas[d['area']]
+        d['desirability'] = desirability(d, area)
+        d['badges'] = badges(d, area)
+        d['ppsPercentile'] = percentile(d['pricePerSqm'], all_pps)
+
+    for stats in areas.values():
+        for key in ('avgDays', 'avgPPS', 'avgPrice', 'demandScore'):
+            stats[key] = round(stats[key], 2)
+
+    dataset = {
+        'generated_at': datetime.now().isoformat(),
+        'medianDays': median_days,
+        'duplicates': len(links),
+        'areas': areas,
+        'listings': listings,
+    }
+    return dataset, links
+
+
+def to_table(listings):
+    """Listings as one field list plus row arrays - no key names repeated per listing"""
+    rows = []
+    for d in listings:
+        des = d['desirability']
+        rows.append([d[f] for f in DASHBOARD_FIELDS + DERIVED_FIELDS]
+                    + [des['score'], des['level'], [des['parts'][k] for k in WEIGHTS], d['badges']])
+    return {'fields': list(DASHBOARD_FIELDS + DERIVED_FIELDS + SCORE_FIELDS), 'rows': rows}
+
+
+def write_dataset(dataset, path=OUTPUT_JSON):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({**dataset, 'listings': to_table(dataset['listings'])}, f,
+                  ensure_ascii=False, separators=(',', ':'))
+
+
+def shard_groups(by_area):
+    """The areas of each shard - big areas alone, small ones pooled, preferred and others apart"""
+    groups, pools = [], {}
+    for area in sorted(by_area):
+        size = len(by_area[area])
+        if size >= MIN_SHARD_LISTINGS:
+            groups.append([area])
+            continue
+        preferred = any(d['inPreferredArea'] for d, _ in by_area[area])
+        pool = pools.get(preferred)
+        if pool is None or sum(len(by_area[a]) for a in pool) + size > SHARD_TARGET:
+            pool = pools[preferred] = []
+            groups.append(pool)
+        pool.append(area)
+    return groups
+
+
+def write_shards(dataset, shards_dir=SHARDS_DIR, manifest_path=MANIFEST_JSON):
+    """The dataset's rows in content-hashed files by area, and the manifest listing them
+
+    Each manifest entry says which areas and sources the shard holds, whether any
+    of its listings is in a preferred area and its lowest price, so the dashboard
+    can tell from its filters which shards it needs.
+    """
+    shards_dir = Path(shards_dir)
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    table = to_table(dataset['listings'])
+    by_area = {}
+    for d, row in zip(dataset['listings'], table['rows']):
+        by_area.setdefault(d['area'], []).append((d, row))
+
+    entries, slugs = [], set()
+    for areas in shard_groups(by_area):
+        group = sorted((pair for area in areas for pair in by_area[area]),
+                       key=lambda pair: (pair[0]['source'], pair[0]['listing_id']))
+        text = json.dumps([row for _, row in group], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        name = slug(areas[0])
+        while name in slugs:
+            name += '-'
+        slugs.add(name)
+        name = f"dashboard-{name}.{hashlib.sha1(text).hexdigest()[:HASH_LENGTH]}.json"
+        path = shards_dir / name
+        if not path.exists():
+            with open(path.with_suffix('.tmp'), 'wb') as f:
+                f.write(text)
+            path.with_suffix('.tmp').replace(path)
+        listings = [d for d, _ in group]
+        entries.append({'key': areas[0], 'areas': areas, 'file': f"shards/{name}", 'count': len(listings),
+                        'sources': sorted({d['source'] for d in listings}),
+                        'preferred': any(d['inPreferredArea'] for d in listings),
+                        'min_price': min(d['priceNum'] for d in listings)})
+
+    keep = {Path(e['file']).name for e in entries}
+    for path in shards_dir.glob('dashboard-*.json'):
+        if path.name not in keep:
+            path.unlink()
+
+    manifest = {key: value for key, value in dataset.items() if key != 'listings'}
+    manifest.update(fields=table['fields'], shards=entries)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def main():
+    start = time.time()
+    rows_by_source = {}
+    for source, path in SOURCES.items():
+        if Path(path).exists():
+            rows_by_source[source] = read_csv(path)
+        else:
+            print(f"⚠ No {source} listings at {path} - skipping")
+
+    geo = GeoResolver()
+    dataset, links = enrich(rows_by_source, geo, listing_thumbs())
+    geo.save()
+    write_dataset(dataset)
+    manifest = write_shards(dataset)
+    with open(LINKS_JSON, 'w', encoding='utf-8') as f:
+        json.dump({'duplicates': links}, f, indent=2, ensure_ascii=False)
+
+    print(f"✓ Enriched {len(dataset['listings'])} listings in {len(dataset['areas'])} areas, "
+          f"{len(links)} cross-source duplicates merged "
+          f"({time.time() - start:.1f}s) -> {OUTPUT_JSON}, {len(manifest['shards'])} area shards")
+    approx = sum(1 for d in dataset['listings'] if d['located'] == 'approx')
+    print(f"✓ Areas resolved: {geo.hits}/{len(dataset['listings'])} from the geo cache, "
+          f"{approx} listings placed at their area's centre")
+
+    # Charts and map cells for the unfiltered view, so the dashboard doesn't bucket every point on load
+    aggregates = aggregate(dataset)
+    write_aggregates(aggregates)
+    print(f"✓ Aggregated {len(aggregates['areas'])} areas and "
+          f"{sum(len(rows) for rows in aggregates['cells'].values())} map cells -> {AGGREGATES_JSON}")
+
+
+if __name__ == '__main__':
+    main()
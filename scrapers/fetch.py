@@ -0,0 +1,322 @@
+"""
+Lightweight HTTP fetch backend for the scrapers
+
+Both sites ship their search results as one JSON blob in an inline script tag
+(__NEXT_DATA__ on Daft, ng-state on MyHome), so a full Chromium navigation is
+overkill. This fetches the raw HTML over pooled keep-alive connections, scans
+the stream for the script tag and decodes only that. The browser is only used
+to get past a Cloudflare-style challenge, after which its cookies are reused.
+"""
+
+import re
+import json
+import time
+import zlib
+import threading
+import http.client
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit, urljoin
+
+CHUNK_SIZE = 64 * 1024
+
+# Text that shows up on bot-check interstitials instead of the real page
+CHALLENGE_MARKERS = [b'challenge-platform', b'cf-chl', b'checking your browser', b'just a moment...']
+
+# Lean browser navigation (lean_navigation) aborts these outright, first-party or not
+BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font', 'stylesheet')
+# Third-party hosts a bot check needs to load
+CHALLENGE_HOSTS = ('challenges.cloudflare.com',)
+
+
+def values_at_keys(text, key_pattern):
+    """(key, value) for every "key": value in a JSON text whose key matches key_pattern
+
+    Only the matching values are decoded - the rest of the document is never turned
+    into Python objects. Matches come in document order, nested ones included.
+    """
+    if isinstance(text, bytes):
+        text = text.decode('utf-8')
+    decoder = json.JSONDecoder()
+    for m in re.finditer(r'"(' + key_pattern + r')"\s*:\s*', text):
+        try:
+            value, _ = decoder.raw_decode(text, m.end())
+        except ValueError:
+            continue
+        yield json.loads(f'"{m.group(1)}"'), value
+
+
+class FetchError(Exception):
+    """Page came back but didn't contain what we wanted"""
+
+
+class ChallengeError(FetchError):
+    """Got a bot-check page instead of the real one"""
+
+
+class ScriptScanner:
+    """Incrementally scans HTML chunks for <script id="..."> and keeps only its body"""
+
+    def __init__(self, script_id, error_markers=()):
+        self.open_re = re.compile(
+            rb'<script\b[^>]*?\bid\s*=\s*["\']?' + re.escape(script_id.encode()) + rb'(?=["\'\s>])[^>]*>',
+            re.I)
+        self.error_markers = [m.lower() for m in error_markers]
+        self.buf = b''
+        self.in_script = False
+        self.search_from = 0
+        self.text = None
+        self.error = None
+        self.head = b''  # first chunk, kept to sniff for challenge pages
+        self.bytes_read = 0  # on the wire, set by the backend
+
+    def feed(self, chunk):
+        """Feed the next chunk of HTML; returns True once the script body is complete"""
+        if not self.head:
+            self.head = chunk[:CHUNK_SIZE]
+        if self.error_markers and not self.in_script:
+            lower = (self.buf[-64:] + chunk).lower()
+            for marker in self.error_markers:
+                if marker in lower:
+                    self.error = marker.decode()
+
+        self.buf += chunk
+        if not self.in_script:
+            m = self.open_re.search(self.buf)
+            if not m:
+                # Only keep what could be the start of a tag split across chunks
+                cut = self.buf.rfind(b'<')
+                self.buf = self.buf[cut:] if cut != -1 else b''
+                return False
+            self.buf = self.buf[m.end():]
+            self.in_script = True
+            self.search_from = 0
+
+        end = self.buf.find(b'</script', self.search_from)
+        if end == -1:
+            self.search_from = max(0, len(self.buf) - 8)
+            return False
+        self.text = self.buf[:end]
+        self.buf = b''
+        return True
+
+
+class HttpBackend:
+    """Keep-alive connection pool with cookie reuse that returns the decoded script JSON"""
+
+    def __init__(self, user_agent, timeout=20, challenge_solver=None, max_redirects=5):
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.challenge_solver = challenge_solver
+        self.max_redirects = max_redirects
+        self.idle = {}      # (scheme, host) -> [connection]
+        self.cookies = {}   # host -> {name: value}
+        self.lock = threading.Lock()
+        self.solve_lock = threading.Lock()
+        self.bytes_read = 0
+
+    def _connection(self, scheme, host, fresh=False):
+        with self.lock:
+            pool = self.idle.get((scheme, host))
+            if pool and not fresh:
+                return pool.pop(), True
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return cls(host, timeout=self.timeout), False
+
+    def _release(self, scheme, host, conn):
+        with self.lock:
+            self.idle.setdefault((scheme, host), []).append(conn)
+
+    def _finish(self, parts, conn, response):
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(parts.scheme, parts.netloc, conn)
+
+    def set_cookies(self, cookies):
+        """Load cookies as returned by Playwright's context.cookies()"""
+        with self.lock:
+            for c in cookies:
+                self.cookies.setdefault(c['domain'].lstrip('.'), {})[c['name']] = c['value']
+
+    def _cookie_header(self, host):
+        jar = {}
+        with self.lock:
+            for domain, values in self.cookies.items():
+                if host == domain or host.endswith('.' + domain):
+                    jar.update(values)
+        return '; '.join(f"{k}={v}" for k, v in jar.items())
+
+    def _store_cookies(self, host, response):
+        for header in response.msg.get_all('Set-Cookie') or []:
+            parsed = SimpleCookie()
+            try:
+                parsed.load(header)
+            except Exception:
+                continue
+            with self.lock:
+                for name, morsel in parsed.items():
+                    domain = (morsel['domain'] or host).lstrip('.')
+                    self.cookies.setdefault(domain, {})[name] = morsel.value
+
+    def _request(self, url):
+        """GET with one retry on a dead keep-alive connection; returns (conn, response)"""
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        headers = {
+            'User-Agent': self.user_agent,
+            'Accept': 'text/html,application/xhtml+xml',
+            'Accept-Language': 'en-IE,en;q=0.9',
+            'Accept-Encoding': 'gzip',
+            'Connection': 'keep-alive',
+        }
+        cookie = self._cookie_header(parts.hostname)
+        if cookie:
+            headers['Cookie'] = cookie
+
+        for attempt in range(2):
+            conn, reused = self._connection(parts.scheme, parts.netloc, fresh=attempt > 0)
+            try:
+                conn.request('GET', path, headers=headers)
+                return conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if not reused:
+                    raise
+
+    def _scan(self, url, script_id, error_markers):
+        for _ in range(self.max_redirects + 1):
+            parts = urlsplit(url)
+            conn, response = self._request(url)
+            try:
+                self._store_cookies(parts.hostname, response)
+
+                if response.status in (301, 302, 303, 307, 308):
+                    response.read()
+                    self._finish(parts, conn, response)
+                    url = urljoin(url, response.getheader('Location', ''))
+                    continue
+
+                gzipped = response.getheader('Content-Encoding', '') == 'gzip'
+                inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+                scanner = ScriptScanner(script_id, error_markers)
+                done = False
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    scanner.bytes_read += len(chunk)
+                    self.bytes_read += len(chunk)
+                    if not done:
+                        done = scanner.feed(inflate.decompress(chunk) if inflate else chunk)
+                    # Keep draining after the tag so the connection can be reused
+            except BaseException:
+                # Half-read - it can't go back in the pool, and mustn't be left open either
+                conn.close()
+                raise
+
+            self._finish(parts, conn, response)
+            return response.status, scanner
+
+        raise FetchError(f"Too many redirects for {url}")
+
+    def fetch_json(self, url, script_id, error_markers=(), stats=None, decode=json.loads):
+        """Fetch a page and return the decoded JSON from <script id=script_id>
+
+        Pass a dict as stats to get the bytes read and the fetch/decode times back, and
+        a decode function to pull out just the part of the script that's needed.
+        """
+        for attempt in range(2):
+            start = time.perf_counter()
+            status, scanner = self._scan(url, script_id, error_markers)
+            if stats is not None:
+                stats['bytes'] = stats.get('bytes', 0) + scanner.bytes_read
+                stats['fetch'] = stats.get('fetch', 0) + time.perf_counter() - start
+            if scanner.error:
+                raise FetchError(f"Got error page ({scanner.error}) - HTTP {status}")
+            if scanner.text is not None and status == 200:
+                start = time.perf_counter()
+                data = decode(scanner.text)
+                if stats is not None:
+                    stats['decode'] = time.perf_counter() - start
+                return data
+
+            head = scanner.head.lower()
+            challenged = status in (403, 429, 503) or any(m in head for m in CHALLENGE_MARKERS)
+            if not challenged:
+                raise FetchError(f"No <script id={script_id}> in page - HTTP {status}")
+            if attempt or not self.challenge_solver:
+                raise ChallengeError(f"Bot challenge on {url} - HTTP {status}")
+
+            # One thread solves it in the browser; the others reuse its cookies
+            with self.solve_lock:
+                self.set_cookies(self.challenge_solver(url, self.user_agent))
+
+    def close(self):
+        with self.lock:
+            for pool in self.idle.values():
+                for conn in pool:
+                    conn.close()
+            self.idle = {}
+
+
+async def lean_navigation(context, domains, on_block=None):
+    """Route every request of a Playwright context through a filter that drops what we never read
+
+    Images, media, fonts and stylesheets are aborted, and so is anything not on one
+    of the site's own domains (ads, analytics, tag managers) apart from the challenge
+    hosts. The site's own scripts still load - the context keeps them in its cache,
+    so after the first page they cost nothing. on_block(request) is called for each
+    request dropped.
+    """
+    async def route(route):
+        request = route.request
+        host = urlsplit(request.url).hostname or ''
+        own = any(host == d or host.endswith('.' + d) for d in domains)
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or not (own or host in CHALLENGE_HOSTS):
+            if on_block is not None:
+                on_block(request)
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route('**/*', route)
+
+
+async def goto_script(page, url, selector, timeout):
+    """Navigate and return as soon as selector is in the DOM
+
+    Doesn't wait for the load event or the network to go quiet - the inline script
+    is all we read, and it's there long before either.
+    """
+    await page.goto(url, wait_until='commit', timeout=timeout)
+    await page.wait_for_selector(selector, state='attached', timeout=timeout)
+
+
+class BrowserChallengeSolver:
+    """Opens the page in Chromium, waits for the real content and hands back its cookies"""
+
+    def __init__(self, script_selector, headless=True, timeout=120000):
+        self.script_selector = script_selector
+        self.headless = headless
+        self.timeout = timeout
+
+    def __call__(self, url, user_agent):
+        from playwright.sync_api import sync_playwright
+
+        print(f"  ⚠ Challenge on {url} - solving in browser...")
+        with sync_playwright() as p:
+            browser = p.chromium.launch(
+                headless=self.headless,
+                args=['--disable-blink-features=AutomationControlled'],
+            )
+            # Same UA as the HTTP client, otherwise the clearance cookie is rejected
+            context = browser.new_context(user_agent=user_agent)
+            page = context.new_page()
+            page.goto(url, wait_until='domcontentloaded', timeout=30000)
+            page.wait_for_selector(self.script_selector, state='attached', timeout=self.timeout)
+            cookies = context.cookies()
+            browser.close()
+        print("  ✓ Challenge solved - reusing browser cookies over HTTP")
+        return cookies
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Area and position for every listing, resolved once and cached
+
+The dashboard used to take a listing's area from the second-to-last part of its
+address. That gives "Co. Dublin" for "..., Stillorgan, Co Dublin, A94XN59" and
+"W" for "..., Dublin 6W". Listings with no coordinates were simply left off the
+map. This resolves both against a bundled offline gazetteer
+(scrapers/gazetteer.json), in this order:
+
+  1. a known locality named in the address - a token trie over the gazetteer's
+     names, scanning the address parts from the end, so "Clontarf Road" on the
+     street line doesn't count as Clontarf;
+  2. the postal district ("Dublin 14") or the Eircode routing key (K78 -> Lucan);
+  3. the listing's own coordinates, by point-in-polygon against the localities'
+     outlines - the smallest outline containing the point wins;
+  4. the old second-to-last-part rule, skipping street lines and counties.
+
+Listings with no usable coordinates get the centre of their locality, or of their
+Eircode routing key, and are marked as approximate.
+
+Results are cached in data/geo_cache.json by a hash of the address and
+coordinates, so after the first run each listing is one dict lookup. The cache
+is dropped whenever the gazetteer or the rules (RULES_VERSION) change.
+
+The gazetteer is built from our own scraped listings - names that come up often
+enough as an address part, with their listings' median position and outline
+(convex hull, outliers trimmed):
+
+    python scrapers/geo.py --build
+"""
+
+import re
+import json
+import hashlib
+import argparse
+import unicodedata
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent.parent
+GAZETTEER_JSON = str(Path(__file__).parent / "gazetteer.json")
+CACHE_JSON = str(SCRIPT_DIR / "data/geo_cache.json")
+
+# Gazetteer build: a name needs this many listings to become a locality
+MIN_LISTINGS = 5
+# ...and this many with coordinates to get an outline; the farthest share is trimmed first
+MIN_OUTLINE_POINTS = 5
+OUTLINE_TRIM = 0.10
+# A routing key is named after a locality if that many of its listings are in it
+ROUTING_KEY_SHARE = 0.6
+
+# Address parts that name no place in particular
+NOT_LOCALITIES = {'co dublin', 'county dublin', 'dublin', 'ireland', 'co wicklow', 'co kildare', 'co meath'}
+# A locality name followed by one of these is a street, e.g. "Clontarf Road"
+STREET_WORDS = {
+    'road', 'rd', 'street', 'st', 'avenue', 'ave', 'park', 'drive', 'lane', 'court', 'grove', 'close',
+    'crescent', 'gardens', 'green', 'square', 'terrace', 'way', 'view', 'place', 'hill', 'heights',
+    'lawn', 'lawns', 'rise', 'walk', 'wood', 'woods', 'manor', 'village', 'upper', 'lower', 'cottages',
+}
+# Bump when resolve() can give a different answer for the same gazetteer - drops the cache
+# 2: the last-resort rule skips street lines and counties
+RULES_VERSION = 2
+
+DISTRICT = re.compile(r'\bdublin\s*(\d{1,2})\s*(w)?\b')
+EIRCODE = re.compile(r'\b([AC-FHKNPRTV-Y]\d{2}|D6W)\s?[0-9AC-FHKNPRTV-Y]{4}\b', re.IGNORECASE)
+DUBLIN_DISTRICT = re.compile(r'\bDublin \d+W?\b', re.IGNORECASE)
+
+
+def normalise(text):
+    """Lower case, accents and punctuation dropped: "Dún Laoghaire" -> "dun laoghaire" """
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode().lower()
+    return ' '.join(re.findall(r"[a-z0-9]+", text.replace("'", '')))
+
+
+def district_name(number, west=''):
+    return f"Dublin {int(number)}{'W' if west else ''}"
+
+
+def routing_key_district(key):
+    """D04 -> "Dublin 4", D6W -> "Dublin 6W"; None for keys outside the city districts"""
+    if key == 'D6W':
+        return 'Dublin 6W'
+    if key[0] == 'D' and key[1:].isdigit():
+        return district_name(key[1:])
+    return None
+
+
+def could_be_locality(part):
+    """An address part that might name a place - not a county, Eircode, district or street line"""
+    key = normalise(part)
+    return bool(key) and key not in NOT_LOCALITIES and not EIRCODE.fullmatch(part) \
+        and not DISTRICT.search(key) and not any(c.isdigit() for c in key) and key.split()[-1] not in STREET_WORDS
+
+
+def fallback_area(address):
+    """The old rule (script.js's extractArea): the second-to-last part, district dropped
+
+    Except that a part that's a street address ("230 Drumnigh Manor") or a county is
+    passed over for the one before it, and it's 'Dublin' if none will do.
+    """
+    parts = [p.strip() for p in address.split(',')]
+    for part in reversed(parts[:-1]):
+        area = DUBLIN_DISTRICT.sub('', part).strip()
+        if not area and part:
+            return part  # just the district, "Dublin 6W"
+        if could_be_locality(area):
+            return area
+    return 'Dublin'
+
+
+class NameTrie:
+    """Token trie of locality names: longest name starting at a token, in one pass"""
+
+    END = ''
+
+    def __init__(self, names=()):
+        self.root = {}
+        for normalised, name in names:
+            self.add(normalised, name)
+
+    def add(self, normalised, name):
+        node = self.root
+        for token in normalised.split():
+            node = node.setdefault(token, {})
+        node[self.END] = name
+
+    def longest(self, tokens, start):
+        """(name, end) of the longest name starting at tokens[start], or None"""
+        node, found = self.root, None
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if self.END in node:
+                found = node[self.END], i + 1
+        return found
+
+
+def point_in_polygon(lat, lng, polygon):
+    """Ray casting - polygon is a list of [lat, lng]"""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lng_i = polygon[i]
+        lat_j, lng_j = polygon[j]
+        if (lng_i > lng) != (lng_j > lng) and lat < (lat_j - lat_i) * (lng - lng_i) / (lng_j - lng_i) + lat_i:
+            inside = not inside
+        j = i
+    return inside
+
+
+def polygon_area(polygon):
+    """Shoelace area in square degrees - only used to rank outlines against each other"""
+    total = 0.0
+    for (lat1, lng1), (lat2, lng2) in zip(polygon, polygon[1:] + polygon[:1]):
+        total += lng1 * lat2 - lng2 * lat1
+    return abs(total) / 2
+
+
+def convex_hull(points):
+    """Monotone chain hull of (lat, lng) points, as a list of [lat, lng]"""
+    points = sorted(set(points))
+    if len(points) < 3:
+        return [list(p) for p in points]
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower, upper = [], []
+    for p in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return [[round(lat, 5), round(lng, 5)] for lat, lng in lower[:-1] + upper[:-1]]
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+class Gazetteer:
+    """Localities (centre + outline) and Eircode routing keys, with the lookups over them"""
+
+    def __init__(self, data):
+        self.localities = data['localities']
+        self.routing_keys = data['routing_keys']
+        self.version = hashlib.sha1(json.dumps([RULES_VERSION, data], sort_keys=True).encode()).hexdigest()[:12]
+        self.trie = NameTrie((normalise(name), name) for name in self.localities)
+        # Smallest first, so the first outline containing a point is the most specific one
+        self.outlines = sorted(
+            ((name, loc['outline'], bbox(loc['outline'])) for name, loc in self.localities.items()
+             if len(loc.get('outline') or ()) >= 3),
+            key=lambda o: polygon_area(o[1]))
+
+    @classmethod
+    def load(cls, path=GAZETTEER_JSON):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def named_locality(self, address):
+        """The locality the address names, scanning its parts from the end (not the street line)"""
+        parts = [normalise(p) for p in (address or '').split(',')]
+        candidates = parts[1:] if len(parts) > 1 else parts
+        for part in reversed(candidates):
+            tokens = part.split()
+            for start in range(len(tokens)):
+                match = self.trie.longest(tokens, start)
+                if match and (match[1] == len(tokens) or tokens[match[1]] not in STREET_WORDS):
+                    name = match[0]
+                    if not DISTRICT.fullmatch(normalise(name)):
+                        return name
+        return None
+
+    def district(self, address):
+        m = DISTRICT.search(normalise(address))
+        return district_name(m.group(1), m.group(2)) if m else None
+
+    def containing(self, lat, lng):
+        for name, outline, (low_lat, low_lng, high_lat, high_lng) in self.outlines:
+            if low_lat <= lat <= high_lat and low_lng <= lng <= high_lng and point_in_polygon(lat, lng, outline):
+                return name
+        return None
+
+    def resolve(self, address, lat, lng):
+        """(area, lat, lng, located) - located is 'exact', 'approx' or '' if we have no position"""
+        eircode = EIRCODE.search(address or '')
+        routing_key = eircode.group(1).upper() if eircode else None
+        key_info = self.routing_keys.get(routing_key) if routing_key else None
+
+        area = self.named_locality(address) or self.district(address)
+        if area is None and routing_key:
+            area = (key_info or {}).get('area') or routing_key_district(routing_key)
+        if area is None and lat and lng:
+            area = self.containing(lat, lng)
+        if area is None:
+            area = fallback_area(address or '')
+
+        if lat and lng:
+            return area, lat, lng, 'exact'
+        place = self.localities.get(area) or key_info
+        if place and place.get('lat'):
+            return area, place['lat'], place['lng'], 'approx'
+        return area, 0, 0, ''
+
+
+def bbox(polygon):
+    lats = [p[0] for p in polygon]
+    lngs = [p[1] for p in polygon]
+    return min(lats), min(lngs), max(lats), max(lngs)
+
+
+def cache_key(address, lat, lng):
+    return hashlib.sha1(f"{address}|{lat}|{lng}".encode()).hexdigest()[:16]
+
+
+class GeoResolver:
+    """Gazetteer lookups through the address-hash cache"""
+
+    def __init__(self, gazetteer=None, cache_path=CACHE_JSON):
+        self.gazetteer = gazetteer or Gazetteer.load()
+        self.cache_path = cache_path
+        self.cache = {}
+        self.used = {}
+        self.hits = 0
+        try:
+            with open(cache_path, encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('gazetteer') == self.gazetteer.version:
+                self.cache = saved['entries']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def resolve(self, address, lat, lng):
+        key = cache_key(address, lat, lng)
+        if key in self.cache:
+            self.hits += 1
+            result = self.cache[key]
+        else:
+            result = list(self.gazetteer.resolve(address, lat, lng))
+        self.used[key] = result
+        return tuple(result)
+
+    def save(self):
+        """Write back only what this run used, so addresses of long-gone listings drop out"""
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'gazetteer': self.gazetteer.version, 'entries': self.used}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+
+
+def build(listings):
+    """A gazetteer from scraped Listing records (see the module docstring)"""
+    spellings = {}
+    for l in listings:
+        parts = [p.strip() for p in (l.address or '').split(',')][1:]
+        for part in set(parts):
+            if could_be_locality(part):
+                key = normalise(part)
+                spellings.setdefault(key, {}).setdefault(part, 0)
+                spellings[key][part] += 1
+
+    names = {}
+    for key, variants in spellings.items():
+        if sum(variants.values()) >= MIN_LISTINGS:
+            names[max(variants, key=variants.get)] = {}
+    for n in list(range(1, 25)) + ['6W']:
+        names[f"Dublin {n}"] = {}
+
+    gazetteer = Gazetteer({'localities': names, 'routing_keys': {}})
+    points, keys = {}, {}
+    for l in listings:
+        area = gazetteer.named_locality(l.address) or gazetteer.district(l.address)
+        if area is not None and l.latitude is not None:
+            points.setdefault(area, []).append((l.latitude, l.longitude))
+        eircode = EIRCODE.search(l.address or '')
+        if eircode:
+            info = keys.setdefault(eircode.group(1).upper(), {'areas': {}, 'points': []})
+            if area:
+                info['areas'][area] = info['areas'].get(area, 0) + 1
+            if l.latitude is not None:
+                info['points'].append((l.latitude, l.longitude))
+
+    localities = {}
+    for name in sorted(names):
+        located = points.get(name, [])
+        entry = {'lat': None, 'lng': None, 'outline': None}
+        if located:
+            entry['lat'] = round(median(p[0] for p in located), 5)
+            entry['lng'] = round(median(p[1] for p in located), 5)
+        if len(located) >= MIN_OUTLINE_POINTS:
+            by_distance = sorted(located, key=lambda p: (p[0] - entry['lat']) ** 2 + (p[1] - entry['lng']) ** 2)
+            kept = by_distance[:max(3, int(len(by_distance) * (1 - OUTLINE_TRIM)))]
+            entry['outline'] = convex_hull(kept)
+        localities[name] = entry
+
+    routing_keys = {}
+    for key in sorted(keys):
+        info = keys[key]
+        total = sum(info['areas'].values())
+        top = max(info['areas'], key=info['areas'].get) if total else None
+        routing_keys[key] = {
+            'area': top if total and info['areas'][top] / total >= ROUTING_KEY_SHARE else routing_key_district(key),
+            'lat': round(median(p[0] for p in info['points']), 5) if info['points'] else None,
+            'lng': round(median(p[1] for p in info['points']), 5) if info['points'] else None,
+        }
+    return {'localities': localities, 'routing_keys': routing_keys}
+
+
+def main():
+    from dedupe import SOURCES, load_listings
+
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer from the scraped listings")
+    parser.add_argument('--build', action='store_true', help=f"rewrite {GAZETTEER_JSON}")
+    args = parser.parse_args()
+    if not args.build:
+        parser.error("nothing to do - pass --build")
+
+    listings = []
+    for source, path in SOURCES.items():
+        if Path(path).exists():
+            listings.extend(load_listings(path, source))
+    data = build(listings)
+    with open(GAZETTEER_JSON, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+    print(f"✓ Gazetteer: {len(data['localities'])} localities, {len(data['routing_keys'])} routing keys "
+          f"-> {GAZETTEER_JSON}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+What each scraper searches for - regions x property types, from scrapers/jobs.json
+
+Per source the job spec lists the regions (the sites' county slugs: "dublin",
+"cork", ... or "ireland" for the whole country), the property types, how many
+pages may be fetched from its host at once, and for Daft the starting price
+bands:
+
+    {"daft": {"regions": ["dublin", "wicklow"], "property_types": ["houses"],
+              "concurrency": 5, "price_bands": [[null, 300000], [300000, null]]},
+     "myhome": {"regions": ["dublin"], "property_types": ["houses"], "concurrency": 1}}
+
+Every region/type pair is one shard with its own search URL, so the site does the
+filtering and nothing is downloaded just to be dropped. A source's shards share
+its pool of tabs (or HTTP workers): whichever is free takes the next page of any
+shard, so one big county doesn't hold the others up. Sources are separate hosts
+and run side by side (run_all.py, --isolate for a process each), each under its
+own concurrency and pacer (pacing.py).
+"""
+
+import json
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+JOBS_JSON = str(Path(__file__).parent / "jobs.json")
+
+# Search URL per source and property type - the type filter is applied by the site
+SEARCH_URLS = {
+    'daft': {
+        'houses': "https://www.daft.ie/property-for-sale/{region}/houses",
+        'apartments': "https://www.daft.ie/property-for-sale/{region}/apartments",
+        'all': "https://www.daft.ie/property-for-sale/{region}",
+    },
+    'myhome': {
+        'houses': "https://www.myhome.ie/residential/{region}/house-for-sale",
+        'apartments': "https://www.myhome.ie/residential/{region}/apartment-for-sale",
+        'all': "https://www.myhome.ie/residential/{region}/property-for-sale",
+    },
+}
+
+Shard = namedtuple('Shard', 'source name region property_type url')
+
+
+def with_query(url, **params):
+    """url with params set in its query string - None leaves a parameter out"""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update((k, v) for k, v in params.items() if v is not None)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def load_jobs(path=JOBS_JSON):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def source_job(jobs, source):
+    """One source's job from the spec, checked"""
+    job = jobs.get(source)
+    if not job or not job.get('regions') or not job.get('property_types'):
+        raise ValueError(f"the job spec needs regions and property_types for {source}")
+    unknown = [t for t in job['property_types'] if t not in SEARCH_URLS[source]]
+    if unknown:
+        raise ValueError(f"{source} can't search for {', '.join(unknown)} - "
+                         f"property_types are {', '.join(SEARCH_URLS[source])}")
+    return job
+
+
+def shards(jobs, source):
+    """A source's searches, one per region and property type"""
+    job = source_job(jobs, source)
+    result = []
+    for region in job['regions']:
+        slug = region.strip().lower().replace(' ', '-')
+        for property_type in job['property_types']:
+            url = SEARCH_URLS[source][property_type].format(region=slug)
+            result.append(Shard(source, f"{slug}-{property_type}", slug, property_type, url))
+    return result
@@ -0,0 +1,109 @@
+"""
+Compact image URLs for the outputs (--compact-images)
+
+Daft's image URLs are media.daft.ie edit requests: a base64 JSON document with
+the bucket, the watermark and the 720x480 resize, then a signature. They are
+nearly 500 characters each and most of the size of daft_listings.csv, yet
+only the image key and the signature differ from one listing to the next.
+
+With --compact-images the outputs hold "@<template>:<rest>" instead. The
+templates - the edit document without its key, or just the scheme and host
+for plain image URLs - are interned in data/<source>_media.json:
+
+    https://media.daft.ie/eyJidWNrZXQi...In0?signature=d322...
+    -> @0:0/1/01b7ff5c-d48d-4b3e-af4b-d37a1a285601.JPEG?signature=d322...
+
+Templates are only ever appended, so a listing keeps the same compact value from
+run to run. A URL is only compacted if it expands back to exactly the same text.
+"""
+
+import os
+import json
+import base64
+from urllib.parse import urlsplit
+
+# Hosts whose image URLs are base64 edit documents with the image's "key" last
+EDIT_HOSTS = ('media.daft.ie',)
+
+
+def decode_edit(path):
+    """The edit document in a media URL's path, or None if it isn't one"""
+    try:
+        text = base64.b64decode(path + '=' * (-len(path) % 4), validate=True)
+        payload = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get('key'), str) or list(payload)[-1] != 'key':
+        return None
+    return payload
+
+
+def encode_edit(payload, key):
+    text = json.dumps({**payload, 'key': key}, separators=(',', ':'), ensure_ascii=False)
+    return base64.b64encode(text.encode('utf-8')).decode('ascii')
+
+
+class MediaTable:
+    """The interned URL templates of one source, and the compact <-> full conversions"""
+
+    def __init__(self, path):
+        self.path = path
+        self.templates = []
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.templates = json.load(f)['templates']
+        except (OSError, ValueError, KeyError):
+            pass
+        self.ids = {self._id_key(t): i for i, t in enumerate(self.templates)}
+        self.added = 0
+
+    @staticmethod
+    def _id_key(template):
+        return template['prefix'], json.dumps(template.get('payload'))
+
+    @staticmethod
+    def _expand(template, rest):
+        if 'payload' not in template:
+            return template['prefix'] + rest
+        key, sep, query = rest.partition('?')
+        return template['prefix'] + encode_edit(template['payload'], key) + sep + query
+
+    def compact(self, url):
+        """The compact form of an image URL - the URL itself if it doesn't fit a template"""
+        if not url or url.startswith('@'):
+            return url
+        parts = urlsplit(url)
+        if not parts.scheme or not parts.netloc:
+            return url
+        prefix = f"{parts.scheme}://{parts.netloc}/"
+        query = '?' + parts.query if parts.query else ''
+        payload = decode_edit(parts.path[1:]) if parts.netloc in EDIT_HOSTS else None
+        if payload is not None:
+            key = payload.pop('key')
+            template, rest = {'prefix': prefix, 'payload': payload}, key + query
+        else:
+            template, rest = {'prefix': prefix}, url[len(prefix):]
+        if self._expand(template, rest) != url:
+            return url
+        ref = self.ids.get(self._id_key(template))
+        if ref is None:
+            ref = self.ids[self._id_key(template)] = len(self.templates)
+            self.templates.append(template)
+            self.added += 1
+        return f"@{ref}:{rest}"
+
+    def expand(self, value):
+        """The full URL of a compact value; anything else is returned as it is"""
+        if not value or not value.startswith('@'):
+            return value
+        ref, _, rest = value[1:].partition(':')
+        return self._expand(self.templates[int(ref)], rest)
+
+    def save(self):
+        """Write the table if this run added to it"""
+        if not self.added:
+            return
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'templates': self.templates}, f, indent=2, ensure_ascii=False)
+        os.replace(self.path + '.tmp', self.path)
+        self.added = 0
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Run metrics and timing spans for the scrapers
+
+Wraps the expensive steps of a run (navigation, selector waits, JSON decoding,
+parsing, pacer waits/backoffs, journal and output writes) in named spans, and
+counts pages, listings, bytes and retries per price band. At the end of a run
+everything is summarised - count, total, p50/p95/max per span - and written to
+data/metrics/<source>-<timestamp>.json next to the pacer's own numbers. Only the
+last KEEP_RUNS files per source are kept.
+
+Spans overlap when several workers run at once, so a span's total is worker
+time, not wall-clock time. Compare runs with:
+
+    python scrapers/metrics.py                 # latest run vs the one before, per source
+    python scrapers/metrics.py A.json B.json   # two specific runs
+"""
+
+import json
+import time
+import argparse
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime
+
+SCRIPT_DIR = Path(__file__).parent.parent
+METRICS_DIR = SCRIPT_DIR / "data/metrics"
+
+# A span whose p95 grew by more than this between runs is flagged in the report
+REGRESSION_THRESHOLD = 0.20
+
+# Metrics files kept per source - enough to look back a couple of months of weekly runs
+KEEP_RUNS = 8
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+class RunMetrics:
+    """Spans, counters and per-band totals for one scraper run"""
+
+    def __init__(self, source):
+        self.source = source
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.spans = {}     # name -> [seconds]
+        self.counters = {}  # name -> int
+        self.bands = {}     # band name -> {'pages', 'listings', 'bytes', 'retries', 'failures', 'seconds'}
+
+    def record(self, name, seconds, band=None):
+        """Add one timing; with a band, it's also added to that band's total"""
+        self.spans.setdefault(name, []).append(seconds)
+        if band is not None:
+            self._band(band)['seconds'] += seconds
+
+    @contextmanager
+    def span(self, name, band=None):
+        """Time the block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, band)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def _band(self, band):
+        if band not in self.bands:
+            self.bands[band] = {'pages': 0, 'listings': 0, 'bytes': 0, 'retries': 0, 'failures': 0,
+                                'seconds': 0.0}
+        return self.bands[band]
+
+    def fetched(self, band, stats):
+        """Bytes and timings of one fetch, as filled in by fetch_json / extract_listings_from_page"""
+        stats = dict(stats)
+        nbytes = stats.pop('bytes', 0)
+        self._band(band)['bytes'] += nbytes
+        self.count('bytes', nbytes)
+        for name, seconds in stats.items():
+            self.record(name, seconds, band)
+
+    def page(self, band, listings):
+        """One results page done"""
+        stats = self._band(band)
+        stats['pages'] += 1
+        stats['listings'] += listings
+        self.count('pages')
+        self.count('listings', listings)
+
+    def retry(self, band, failed=False):
+        """A page attempt failed; failed=True when it was the last attempt"""
+        stats = self._band(band)
+        stats['retries'] += 0 if failed else 1
+        stats['failures'] += 1 if failed else 0
+        self.count('failed_pages' if failed else 'retries')
+
+    def summary(self):
+        spans = {}
+        for name, durations in sorted(self.spans.items()):
+            durations = sorted(durations)
+            spans[name] = {
+                'count': len(durations),
+                'total': round(sum(durations), 3),
+                'p50': round(percentile(durations, 0.50), 4),
+                'p95': round(percentile(durations, 0.95), 4),
+                'max': round(durations[-1], 4),
+            }
+        bands = {name: {**stats, 'seconds': round(stats['seconds'], 2)}
+                 for name, stats in sorted(self.bands.items())}
+        return {
+            'source': self.source,
+            'started_at': self.started_at.isoformat(),
+            'elapsed': round(time.perf_counter() - self.start, 2),
+            'counters': dict(sorted(self.counters.items())),
+            'spans': spans,
+            'bands': bands,
+        }
+
+    def write(self, extra=None, directory=METRICS_DIR):
+        """Write the run's summary (plus e.g. the pacer metrics) and return the path"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.source}-{self.started_at.strftime('%Y%m%d-%H%M%S')}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({**self.summary(), **(extra or {})}, f, indent=2, ensure_ascii=False)
+        prune(self.source, directory)
+        return str(path)
+
+
+_metrics = {}
+
+
+def start_run(source):
+    """Fresh metrics for a new run of a source"""
+    _metrics[source] = RunMetrics(source)
+    return _metrics[source]
+
+
+def get_metrics(source):
+    """The current run's metrics for a source"""
+    if source not in _metrics:
+        return start_run(source)
+    return _metrics[source]
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def latest_runs(source, directory=METRICS_DIR, n=2):
+    """Paths of a source's last n metrics files, oldest first"""
+    return sorted(Path(directory).glob(f"{source}-*.json"))[-n:]
+
+
+def prune(source, directory=METRICS_DIR, keep=KEEP_RUNS):
+    """Delete all but a source's last `keep` metrics files; returns the deleted paths"""
+    old = sorted(Path(directory).glob(f"{source}-*.json"))[:-keep]
+    for path in old:
+        path.unlink()
+    return old
+
+
+def change(old, new):
+    if not old:
+        return ''
+    pct = (new - old) / old
+    return f"{pct:+.0%}"
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    """Print how two runs of a source differ; returns the spans whose p95 regressed"""
+    print(f"\n{new['source']}: {old['started_at']} -> {new['started_at']}")
+    print(f"  elapsed {old['elapsed']:.0f}s -> {new['elapsed']:.0f}s ({change(old['elapsed'], new['elapsed'])})")
+    for name in sorted(set(old['counters']) | set(new['counters'])):
+        a, b = old['counters'].get(name, 0), new['counters'].get(name, 0)
+        print(f"  {name}: {a:,} -> {b:,}")
+
+    print(f"\n  {'span':<22}{'count':>7}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p95 change':>12}")
+    regressed = []
+    for name in sorted(set(old['spans']) | set(new['spans'])):
+        a, b = old['spans'].get(name), new['spans'].get(name)
+        if b is None:
+            print(f"  {name:<22}{'(gone)':>7}")
+            continue
+        flag = ''
+        if a and a['p95'] and (b['p95'] - a['p95']) / a['p95'] > threshold:
+            flag = '  ▲'
+            regressed.append(name)
+        print(f"  {name:<22}{b['count']:>7}{b['total']:>10.1f}{b['p50'] * 1000:>10.1f}{b['p95'] * 1000:>10.1f}"
+              f"{change(a['p95'], b['p95']) if a else 'new':>12}{flag}")
+
+    print(f"\n  {'band':<22}{'pages':>7}{'listings':>10}{'KB':>10}{'retries':>9}{'seconds':>10}")
+    for name, b in new['bands'].items():
+        print(f"  {name:<22}{b['pages']:>7}{b['listings']:>10}{b['bytes'] / 1024:>10.0f}{b['retries']:>9}"
+              f"{b['seconds']:>10.1f}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare scraper run metrics")
+    parser.add_argument('files', nargs='*', help="two metrics files (default: the last two runs of each source)")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help=f"flag spans whose p95 grew by more than this (default: {REGRESSION_THRESHOLD})")
+    args = parser.parse_args()
+
+    if args.files:
+        if len(args.files) != 2:
+            parser.error("give two metrics files to compare")
+        pairs = {'': args.files}
+    else:
+        pairs = {source: latest_runs(source) for source in ('daft', 'myhome')}
+
+    regressed = []
+    for source, pair in pairs.items():
+        if len(pair) < 2:
+            print(f"{source}: need two runs to compare, found {len(pair)} in {METRICS_DIR}")
+            continue
+        regressed += compare(load(pair[0]), load(pair[1]), args.threshold)
+
+    if regressed:
+        print(f"\n▲ p95 up more than {args.threshold:.0%}: {', '.join(regressed)}")
+
+
+if __name__ == '__main__':
+    main()
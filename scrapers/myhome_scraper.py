@@ -5,23 +5,55 @@ Uses Playwright with your Chrome profile to bypass any protection
 """
 
 import json
-import csv
 import time
 import random
+import asyncio
+import argparse
 from pathlib import Path
-from datetime import datetime
+from urllib.parse import urlsplit
 
 # Use your Chrome profile for cookies
 CHROME_USER_DATA = str(Path.home() / "Library/Application Support/Google/Chrome")
 
-from playwright.sync_api import sync_playwright
+from fetch import HttpBackend, BrowserChallengeSolver, values_at_keys, lean_navigation, goto_script
+from store import ListingStore, RunRecorder
+from checkpoint import CheckpointJournal
+from pacing import get_pacer
+from metrics import start_run, get_metrics
+from outputs import ListingWriter, ShardedWriter, SHARD_BY
+from media import MediaTable
+from validate import Validator
+from details import DetailEnricher
+from columnar import COMPRESSION
+from schema import InvalidListing, parse_myhome
+from jobs import JOBS_JSON, load_jobs, source_job, shards, with_query
 
 BASE_URL = "https://www.myhome.ie"
-SEARCH_URL = "https://www.myhome.ie/residential/dublin/property-for-sale"
 SCRIPT_DIR = Path(__file__).parent.parent
 OUTPUT_CSV = str(SCRIPT_DIR / "data/myhome_listings.csv")
 OUTPUT_JSON = str(SCRIPT_DIR / "data/myhome_listings.json")
+OUTPUT_COLUMNAR = str(SCRIPT_DIR / "data/myhome_listings.col")
+SHARDS_DIR = str(SCRIPT_DIR / "data/shards")
+MANIFEST_JSON = str(SCRIPT_DIR / "data/myhome_manifest.json")
+MEDIA_JSON = str(SCRIPT_DIR / "data/myhome_media.json")
+QUARANTINE_JSON = str(SCRIPT_DIR / "data/myhome_quarantine.json")
 TIMESTAMP_FILE = str(SCRIPT_DIR / "data/myhome_scrape_timestamp.txt")
+CHANGES_JSON = str(SCRIPT_DIR / "data/myhome_changes.json")
+CHECKPOINT_FILE = str(SCRIPT_DIR / "data/myhome_checkpoint.jsonl")
+
+# Incremental runs sort newest first and stop once a page has nothing new
+NEWEST_FIRST = {'sortBy': 'NewestFirst'}
+
+# ng-state keys holding the search results, e.g. "SEARCH_RESOLVER:/residential/dublin/...?page=2"
+SEARCH_RESOLVER_KEY = r'SEARCH_RESOLVER:[^"\\]*(?:\\.[^"\\]*)*'
+
+# The site filters each search by property type; anything of these types that still
+# turns up in a search for houses is dropped
+SKIP_TYPES = {'houses': ('apartment',)}
+DEFAULT_SEARCH_PATH = '/residential/dublin/property-for-sale'
+
+# Lean navigation only lets requests to MyHome's own hosts through
+SITE_DOMAINS = ('myhome.ie',)
 
 # User agents
 USER_AGENTS = [
@@ -29,126 +61,107 @@ USER_AGENTS = [
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15',
 ]
 
-def extract_listings_from_page(page, page_num):
-    """Extract listings from ng-state JSON"""
-    try:
-        script = page.query_selector('script#ng-state')
-        if not script:
-            print(f"  No ng-state found on page {page_num}")
-            return [], 0, 0
-
-        data = json.loads(script.inner_text())
-
-        # Find the search resolver key - it changes per page
-        search_key = None
+def decode_ng_state(text):
+    """Decode only the SEARCH_RESOLVER entries out of the ng-state text
+
+    The other resolvers (menus, ads, agent branding...) are never built. Falls back to
+    decoding everything if no search results can be found.
+    """
+    found = {key: value for key, value in values_at_keys(text, SEARCH_RESOLVER_KEY)
+             if isinstance(value, dict)}
+    if found:
+        return found
+    return json.loads(text)
+
+
+def parse_ng_state(data, page_num, search_path=DEFAULT_SEARCH_PATH, skip_types=('apartment',)):
+    """Parse listings and paging info out of a decoded ng-state blob"""
+    # Find the search resolver key - it changes per page
+    search_key = None
+    for key in data.keys():
+        if key.startswith('SEARCH_RESOLVER:') and search_path in key:
+            search_key = key
+            break
+
+    if not search_key:
+        # Try any SEARCH_RESOLVER key
         for key in data.keys():
-            if key.startswith('SEARCH_RESOLVER:') and '/residential/dublin/property-for-sale' in key:
+            if key.startswith('SEARCH_RESOLVER:'):
                 search_key = key
                 break
 
-        if not search_key:
-            # Try any SEARCH_RESOLVER key
-            for key in data.keys():
-                if key.startswith('SEARCH_RESOLVER:'):
-                    search_key = key
-                    break
+    if not search_key:
+        print(f"  No SEARCH_RESOLVER found on page {page_num}")
+        return [], 0, 0
 
-        if not search_key:
-            print(f"  No SEARCH_RESOLVER found on page {page_num}")
-            return [], 0, 0
+    search_data = data[search_key]
+    total_count = search_data.get('ResultCount', 0)
+    page_size = search_data.get('PageSize', 20)
+    total_pages = (total_count + page_size - 1) // page_size
 
-        search_data = data[search_key]
-        total_count = search_data.get('ResultCount', 0)
-        page_size = search_data.get('PageSize', 20)
-        total_pages = (total_count + page_size - 1) // page_size
+    results = search_data.get('SearchResults', []) or search_data.get('Results', [])
 
-        results = search_data.get('SearchResults', []) or search_data.get('Results', [])
+    listings = []
+    for item in results:
+        if (item.get('PropertyType') or '').lower() in skip_types:
+            continue
+        try:
+            listings.append(parse_myhome(item, BASE_URL))
+        except InvalidListing as e:
+            print(f"  Skipping listing: {e}")
+
+    return listings, total_count, total_pages
+
+
+def search_filters(search):
+    """parse_ng_state's search_path and skip_types for a jobs.py shard"""
+    return {'search_path': urlsplit(search.url).path, 'skip_types': SKIP_TYPES.get(search.property_type, ())}
+
+
+def find_property(data, property_id):
+    """The object describing property_id anywhere in a decoded ng-state blob, or None"""
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if str(node.get('PropertyId')) == property_id:
+                return node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
 
-        listings = []
-        for item in results:
-
-            # Skip apartments (Daft scraper only fetches houses via URL filter)
-            property_type = item.get('PropertyType', '')
-            if property_type.lower() == 'apartment':
-                continue
-
-            # Parse price - handle ranges like "€1,275,000 to €1,350,000"
-            price_str = item.get('PriceAsString', '')
-            price_num = 0
-            if price_str:
-                # If it's a range, take the lower value
-                if ' to ' in price_str.lower():
-                    first_price = price_str.lower().split(' to ')[0]
-                    price_num = int(''.join(c for c in first_price if c.isdigit()) or 0)
-                else:
-                    price_num = int(''.join(c for c in price_str if c.isdigit()) or 0)
-
-            # Parse date listed
-            created = item.get('CreatedOnDate', '')
-            date_listed = ''
-            days_on_market = ''
-            if created:
-                try:
-                    dt = datetime.fromisoformat(created.replace('+00:00', ''))
-                    date_listed = dt.strftime('%Y-%m-%d')
-                    days_on_market = (datetime.now() - dt).days
-                except Exception as e:
-                    # If CreatedOnDate fails, try ActivatedOn as fallback
-                    activated = item.get('ActivatedOn', '')
-                    if activated:
-                        try:
-                            dt = datetime.fromisoformat(activated.replace('+00:00', ''))
-                            date_listed = dt.strftime('%Y-%m-%d')
-                            days_on_market = (datetime.now() - dt).days
-                        except:
-                            pass
-
-            # Get coordinates
-            location = item.get('Location', {}) or {}
-            lat = location.get('lat', 0)
-            lng = location.get('lon', 0)
-            # Skip if coordinates are 0,0 (not mapped)
-            if lat == 0 and lng == 0:
-                lat = ''
-                lng = ''
-
-            # Get BrochureMap coordinates as fallback
-            brochure_map = item.get('BrochureMap', {}) or {}
-            brochure_lat = brochure_map.get('latitude', 0) if brochure_map else 0
-            brochure_lng = brochure_map.get('longitude', 0) if brochure_map else 0
-            if brochure_lat == 0 and brochure_lng == 0:
-                brochure_lat = ''
-                brochure_lng = ''
-
-            # Build URL
-            brochure_url = item.get('BrochureUrl', '')
-            if brochure_url and not brochure_url.startswith('http'):
-                brochure_url = BASE_URL + brochure_url
-
-            listings.append({
-                'listing_id': str(item.get('PropertyId', '')),
-                'source': 'myhome',
-                'url': brochure_url,
-                'address': item.get('DisplayAddress', ''),
-                'price': price_str,
-                'price_num': price_num,
-                'beds': item.get('NumberOfBeds', ''),
-                'baths': item.get('NumberOfBathrooms', ''),
-                'size_sqm': item.get('SizeStringMeters', ''),
-                'property_type': property_type,
-                'ber': item.get('BerRating', ''),
-                'latitude': str(lat) if lat else '',
-                'longitude': str(lng) if lng else '',
-                'brochure_latitude': str(brochure_lat) if brochure_lat else '',
-                'brochure_longitude': str(brochure_lng) if brochure_lng else '',
-                'date_listed': date_listed,
-                'days_on_market': str(days_on_market) if isinstance(days_on_market, int) or (isinstance(days_on_market, str) and days_on_market != '') else '',
-                'agent': item.get('GroupName', ''),
-                'is_new': item.get('IsNew', False),
-                'is_sale_agreed': item.get('IsSaleAgreed', False),
-            })
-
-        return listings, total_count, total_pages
+
+def parse_detail_page(data, listing):
+    """The listing on its own page (see details.py), or None if it isn't there"""
+    item = find_property(data, listing.listing_id)
+    if item is None:
+        return None
+    # The property page doesn't always repeat its own URL
+    return parse_myhome({'BrochureUrl': listing.url, **item}, BASE_URL)
+
+
+async def extract_listings_from_page(page, page_num, stats=None, search=None):
+    """Extract listings from ng-state JSON
+
+    Pass a dict as stats to get the payload size and the read/decode/parse times back.
+    """
+    try:
+        start = time.perf_counter()
+        script = await page.query_selector('script#ng-state')
+        if not script:
+            print(f"  No ng-state found on page {page_num}")
+            return [], 0, 0
+
+        text = await script.inner_text()
+        read = time.perf_counter()
+        data = decode_ng_state(text)
+        decoded = time.perf_counter()
+        result = parse_ng_state(data, page_num, **(search_filters(search) if search else {}))
+        if stats is not None:
+            stats.update(bytes=len(text.encode('utf-8')), read_script=read - start, decode=decoded - read,
+                         parse=time.perf_counter() - decoded)
+        return result
 
     except Exception as e:
         print(f"  Error extracting page {page_num}: {e}")
@@ -157,22 +170,269 @@ def extract_listings_from_page(page, page_num):
         return [], 0, 1
 
 
-def main():
-    print("=" * 60)
-    print("MyHome.ie Dublin Houses Scraper")
-    print("=" * 60)
+async def load_with_retries(load_page, url, page_num, shard, pacer, metrics, attempts=3):
+    """load_page behind the pacer, retried on errors - None once every attempt has failed"""
+    band = shard.name
+    for attempt in range(attempts):
+        try:
+            with metrics.span('pacer_wait', band):
+                await pacer.wait_async()
+            result = await load_page(url, page_num, shard)
+            pacer.success()
+            return result
+        except Exception as e:
+            wait_time = pacer.failure(e)
+            metrics.retry(band, failed=attempt == attempts - 1)
+            metrics.record('backoff', wait_time)
+            if attempt < attempts - 1:
+                print(f"  {band} page {page_num}: Retry {attempt + 1}/{attempts} "
+                      f"(waiting {wait_time:.0f}s, now {pacer.rate:.0f}/min)...")
+            else:
+                print(f"  {band} page {page_num}: Failed after {attempts} attempts - {e}")
+    return None
+
+
+async def scrape_pages(load_page, shard, start_time, journal, replayed, store=None):
+    """Page through one search's results
+
+    load_page(url, page_num, shard) returns (listings, total_count, total_pages).
+
+    An async generator: yields each page's listings as soon as it's loaded, so nothing
+    holds the whole result set. With a store (incremental mode) results are sorted newest
+    first and paging stops at the first page where every listing is unchanged since the
+    last run. replayed has page -> unchanged for the pages already replayed from the
+    checkpoint journal (see scrape_shards), which aren't fetched again.
+    """
+    band = shard.name
+    search_url = with_query(shard.url, **NEWEST_FIRST) if store is not None else shard.url
+    pacer = get_pacer('myhome')
+    metrics = get_metrics('myhome')
+    scraped = 0
+
+    # First page
+    if 1 in replayed:
+        total_pages = journal.pages[(band, 1)]
+        total_count = '?'
+        listings = []
+        first_unchanged = replayed[1]
+    else:
+        print(f"\nLoading {band} search page...")
+        result = await load_with_retries(load_page, search_url, 1, shard, pacer, metrics)
+        if result is None:
+            # Without page 1 there's no page count to go on
+            print(f"  ⚠ {band}: first page failed - skipping this search")
+            return
+        listings, total_count, total_pages = result
+        with metrics.span('journal_write'):
+            journal.record(band, 1, total_pages, listings)
+        metrics.page(band, len(listings))
+        scraped += len(listings)
+        first_unchanged = unchanged_page(listings, store)
+        yield listings
+
+    print(f"✓ {band}: {total_count} listings across {total_pages} pages")
+    if 1 not in replayed:
+        print(f"  {band} page 1/{total_pages}: {len(listings)} listings")
+    if first_unchanged:
+        print(f"  {band}: page 1 unchanged since last run - nothing new")
+        return
+
+    # Scrape remaining pages
+    for page_num in range(2, total_pages + 1):
+        url = with_query(search_url, page=page_num)
+
+        if page_num in replayed:
+            if replayed[page_num]:
+                break
+            continue
+
+        result = await load_with_retries(load_page, url, page_num, shard, pacer, metrics)
+        if result is not None:
+            listings = result[0]
+            with metrics.span('journal_write'):
+                journal.record(band, page_num, total_pages, listings)
+            metrics.page(band, len(listings))
+            scraped += len(listings)
+
+            elapsed = time.time() - start_time
+            rate = scraped / elapsed * 60
+            print(f"  {band} page {page_num}/{total_pages}: {len(listings)} listings "
+                  f"(total: {scraped}, {rate:.0f}/min)")
+            yield listings
+            if unchanged_page(listings, store):
+                print(f"  {band}: page {page_num} unchanged since last run - stopping")
+                break
+
+        if pacer.should_give_up():
+            print(f"  ⚠ {band}: too many errors - stopping early")
+            break
+
+
+def unchanged_page(listings, store):
+    """Incremental runs: True if every listing on the page is already in the store as it is now"""
+    return store is not None and bool(listings) and all(store.is_unchanged('myhome', l) for l in listings)
+
+
+async def scrape_shards(loaders, searches, start_time, journal, store=None):
+    """Scrape every search (jobs.py shard) - each loader takes the next search whenever it's free
+
+    loaders are load_page functions, one per tab (or HTTP worker). An async generator of
+    pages of listings from all searches, in the order they come in. Pages an interrupted
+    run already finished are replayed from the checkpoint journal first.
+    """
+    replayed = {search.name: {} for search in searches}
+    for band, page_num, _, listings in journal.replay():
+        replayed.setdefault(band, {})[page_num] = unchanged_page(listings, store)
+        yield listings
+    if any(replayed.values()):
+        print(f"  Replayed {sum(len(pages) for pages in replayed.values())} pages from the checkpoint")
+
+    todo = asyncio.Queue()
+    for search in searches:
+        todo.put_nowait(search)
+    done_pages = asyncio.Queue()
+
+    async def tab(load_page):
+        while not todo.empty():
+            search = todo.get_nowait()
+            async for listings in scrape_pages(load_page, search, start_time, journal, replayed[search.name], store):
+                done_pages.put_nowait(listings)
+
+    tabs = [asyncio.create_task(tab(load_page)) for load_page in loaders[:len(searches)]]
+    waiter = asyncio.ensure_future(asyncio.gather(*tabs))
+    # Once every tab is done (or one has failed), stop waiting for pages
+    waiter.add_done_callback(lambda _: done_pages.put_nowait(None))
+    try:
+        while (listings := await done_pages.get()) is not None:
+            yield listings
+        await waiter
+    finally:
+        for task in tabs:
+            task.cancel()
+        await asyncio.gather(*tabs, waiter, return_exceptions=True)
+
+    print(f"  Pacing: {get_pacer('myhome').summary()}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="MyHome.ie Dublin Houses Scraper")
+    parser.add_argument('--backend', choices=['browser', 'http'], default='browser',
+                        help="browser: full Chromium navigation, http: plain HTTP + embedded JSON")
+    parser.add_argument('--incremental', action='store_true',
+                        help="newest first, stop at listings unchanged since the last run")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run from its checkpoint journal")
+    parser.add_argument('--compress', choices=list(COMPRESSION),
+                        help="compress the columnar output (.col.gz / .col.br)")
+    parser.add_argument('--lean', action='store_true',
+                        help="browser backend: skip images/fonts/CSS/third parties, read the data as soon as it's there")
+    parser.add_argument('--details', action='store_true',
+                        help="fetch the page of each listing with blank fields and fill them in (cached)")
+    parser.add_argument('--shard-by', choices=SHARD_BY,
+                        help="also write content-hashed CSV shards by area or price band, with a manifest")
+    parser.add_argument('--compact-images', action='store_true',
+                        help="write image URLs as a template reference plus key (see media.py)")
+    parser.add_argument('--allow-drop', action='store_true',
+                        help="write the outputs even if a full run found far fewer listings than the last")
+    parser.add_argument('--concurrency', type=int,
+                        help="pages loaded at once, one search each (default: the job spec's, or 1)")
+    parser.add_argument('--jobs', default=JOBS_JSON,
+                        help="job spec with the regions and property types to search (see jobs.py)")
+    return parser
+
+
+async def scrape_in_context(context, concurrency, searches, start_time, journal, store=None, lean=False):
+    """Scrape every search with a pool of tabs in one browser context
+
+    lean=True turns on lean navigation for the context (see fetch.lean_navigation):
+    no networkidle wait or hydration sleep, ng-state is read as soon as it's attached.
+    """
+    metrics = get_metrics('myhome')
+    if lean:
+        await lean_navigation(context, SITE_DOMAINS, lambda request: metrics.count('blocked_requests'))
+    pages = list(context.pages[:concurrency])
+    while len(pages) < min(concurrency, len(searches)):
+        pages.append(await context.new_page())
+
+    def loader(page):
+        async def load_page(url, page_num, search):
+            band = search.name
+            if lean:
+                with metrics.span('goto', band):
+                    await goto_script(page, url, 'script#ng-state', 30000 if page_num == 1 else 20000)
+                stats = {}
+                result = await extract_listings_from_page(page, page_num, stats, search)
+                metrics.fetched(band, stats)
+                return result
+
+            with metrics.span('goto', band):
+                await page.goto(url, wait_until='networkidle', timeout=30000)
+            with metrics.span('wait_for_selector', band):
+                await page.wait_for_selector('script#ng-state', state='attached',
+                                             timeout=15000 if page_num == 1 else 10000)
+            with metrics.span('hydrate_sleep', band):
+                await asyncio.sleep(0.5)  # Let Angular hydrate
+            stats = {}
+            result = await extract_listings_from_page(page, page_num, stats, search)
+            metrics.fetched(band, stats)
+            return result
+        return load_page
+
+    try:
+        async for listings in scrape_shards([loader(page) for page in pages], searches, start_time, journal, store):
+            yield listings
+    finally:
+        await context.close()
 
-    all_listings = []
+
+async def scrape_all(searches, journal, backend='browser', store=None, browser=None, lean=False, concurrency=1):
+    """Scrape every search (jobs.py shard), either in the browser or over plain HTTP
+
+    Yields each page's listings as it comes in, with up to concurrency pages loading at
+    once. Pass a running Playwright browser to share it with other scrapers (see
+    run_all.py); otherwise Chrome is launched here with your profile.
+    """
     start_time = time.time()
-    scrape_timestamp = datetime.now().isoformat()
+    user_agent = random.choice(USER_AGENTS)
+
+    if backend == 'http':
+        print("\nUsing HTTP backend (browser only for challenges)")
+        http_backend = HttpBackend(user_agent, challenge_solver=BrowserChallengeSolver('script#ng-state'))
+
+        async def load_page(url, page_num, search):
+            stats = {}
+            try:
+                data = await asyncio.to_thread(http_backend.fetch_json, url, 'ng-state', (), stats,
+                                                decode_ng_state)
+                start = time.perf_counter()
+                result = parse_ng_state(data, page_num, **search_filters(search))
+                stats['parse'] = time.perf_counter() - start
+            finally:
+                get_metrics('myhome').fetched(search.name, stats)
+            return result
 
-    with sync_playwright() as p:
+        try:
+            async for listings in scrape_shards([load_page] * concurrency, searches, start_time, journal, store):
+                yield listings
+        finally:
+            http_backend.close()
+        print(f"  Downloaded {http_backend.bytes_read / 1e6:.1f} MB")
+        return
+
+    if browser is not None:
+        print("\nUsing shared browser")
+        context = await browser.new_context(user_agent=user_agent)
+        async for listings in scrape_in_context(context, concurrency, searches, start_time, journal, store, lean):
+            yield listings
+        return
+
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
         print("\nLaunching Chrome with your profile...")
 
-        user_agent = random.choice(USER_AGENTS)
-
         try:
-            context = p.chromium.launch_persistent_context(
+            context = await p.chromium.launch_persistent_context(
                 user_data_dir=CHROME_USER_DATA + "/Default",
                 channel='chrome',
                 headless=True,
@@ -182,118 +442,139 @@ def main():
             print("✓ Using your Chrome profile")
         except Exception as e:
             print(f"Could not use Chrome profile: {e}")
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(user_agent=user_agent)
+            browser = await p.chromium.launch(headless=True)
+            context = await browser.new_context(user_agent=user_agent)
             print("⚠ Using fresh browser")
 
-        page = context.pages[0] if context.pages else context.new_page()
-
-        # First page
-        print(f"\nLoading search page...")
-        page.goto(SEARCH_URL, wait_until='networkidle', timeout=30000)
-        page.wait_for_selector('script#ng-state', state='attached', timeout=15000)
-        time.sleep(0.5)  # Let Angular hydrate
-
-        listings, total_count, total_pages = extract_listings_from_page(page, 1)
-        all_listings.extend(listings)
-
-        print(f"✓ Found {total_count} listings across {total_pages} pages")
-        print(f"  Page 1/{total_pages}: {len(listings)} listings")
-
-        # Scrape remaining pages
-        consecutive_errors = 0
-        for page_num in range(2, total_pages + 1):
-            url = f"{SEARCH_URL}?page={page_num}"
-
-            for attempt in range(3):
-                try:
-                    if consecutive_errors > 0:
-                        time.sleep(3)
-
-                    page.goto(url, wait_until='networkidle', timeout=30000)
-                    page.wait_for_selector('script#ng-state', state='attached', timeout=10000)
-                    time.sleep(0.5)  # Let Angular hydrate
-
-                    listings, *_ = extract_listings_from_page(page, page_num)
-                    all_listings.extend(listings)
-
-                    elapsed = time.time() - start_time
-                    rate = len(all_listings) / elapsed * 60
-                    print(f"  Page {page_num}/{total_pages}: {len(listings)} listings "
-                          f"(total: {len(all_listings)}, {rate:.0f}/min)")
+        async for listings in scrape_in_context(context, concurrency, searches, start_time, journal, store, lean):
+            yield listings
 
-                    consecutive_errors = 0
 
-                    # Random delay
-                    delay = random.uniform(0.5, 1.5)
-                    time.sleep(delay)
+def open_writer(args, scrape_timestamp):
+    shards = None
+    if args.shard_by:
+        shards = ShardedWriter(SHARDS_DIR, MANIFEST_JSON, 'myhome', args.shard_by, scrape_timestamp)
+    media = MediaTable(MEDIA_JSON) if args.compact_images else None
+    return ListingWriter(OUTPUT_CSV, OUTPUT_JSON, OUTPUT_COLUMNAR, scrape_timestamp, args.compress, shards, media)
 
-                    # Save progress every 20 pages
-                    if page_num % 20 == 0:
-                        with open(OUTPUT_JSON + '.partial', 'w') as f:
-                            json.dump(all_listings, f)
 
-                    break
-
-                except Exception as e:
-                    consecutive_errors += 1
-                    if attempt < 2:
-                        wait_time = 5 * (attempt + 1)
-                        print(f"  Page {page_num}: Retry {attempt + 1}/3 (waiting {wait_time}s)...")
-                        time.sleep(wait_time)
-                    else:
-                        print(f"  Page {page_num}: Failed after 3 attempts - {e}")
-
-            if consecutive_errors >= 5:
-                print("  ⚠ Too many errors - stopping early")
-                break
-
-        context.close()
-
-    # Remove duplicates
-    seen = set()
-    unique_listings = []
-    for l in all_listings:
-        if l['listing_id'] not in seen:
-            seen.add(l['listing_id'])
-            unique_listings.append(l)
+async def run(args, browser=None):
+    """Scrape, update the store and write the outputs - returns a summary of the run"""
+    print("=" * 60)
+    print("MyHome.ie Dublin Houses Scraper")
+    print("=" * 60)
 
-    elapsed = time.time() - start_time
-    print(f"\n{'=' * 60}")
-    print(f"✓ Scraped {len(unique_listings)} unique listings in {elapsed:.1f}s")
+    start_time = time.time()
+    jobs = load_jobs(args.jobs)
+    searches = shards(jobs, 'myhome')
+    concurrency = max(1, args.concurrency or source_job(jobs, 'myhome').get('concurrency', 1))
+    print(f"Searching {', '.join(s.name for s in searches)}")
+
+    metrics = start_run('myhome')
+    journal = CheckpointJournal(CHECKPOINT_FILE, resume=args.resume)
+    scrape_timestamp = journal.started_at
+
+    store = ListingStore()
+    recorder = RunRecorder(store, 'myhome', scrape_timestamp, not args.incremental, CHANGES_JSON)
+    changes = {}
+    scraped = 0
+    writer = None
+    details = None
+    validator = Validator('myhome', QUARANTINE_JSON)
+    if args.details:
+        details = DetailEnricher('myhome', 'ng-state', parse_detail_page, random.choice(USER_AGENTS))
+    try:
+        incremental_store = store if args.incremental else None
+        if not args.incremental:
+            # Full runs stream each page straight into the outputs
+            writer = open_writer(args, scrape_timestamp)
+
+        async for listings in scrape_all(searches, journal, args.backend, incremental_store, browser, args.lean,
+                                         concurrency):
+            if details is not None:
+                with metrics.span('details'):
+                    listings = await details.fill(listings)
+            # Bad rows go to the quarantine file instead of the store and outputs
+            with metrics.span('validate'):
+                listings = validator.check(listings)
+            # Staging drops listings already seen on an earlier page
+            with metrics.span('stage'):
+                listings = recorder.add(listings)
+            scraped += len(listings)
+            if writer is not None:
+                with metrics.span('write_outputs'):
+                    writer.write(listings)
+
+        elapsed = time.time() - start_time
+        print(f"\n{'=' * 60}")
+        print(f"✓ Scraped {scraped} unique listings in {elapsed:.1f}s")
+        # Stops here, before the store or outputs are touched, if the run came up far short
+        validator.finish(store.active_count('myhome'), not args.incremental, args.allow_drop)
+
+        # Record this run in the store and write what changed since the last one
+        if scraped:
+            with metrics.span('store_update'):
+                changes = recorder.finish()
+            if args.incremental:
+                # Only saw the newest pages - the full outputs come from the store
+                writer = open_writer(args, scrape_timestamp)
+                with metrics.span('write_outputs'):
+                    writer.write(store.active_listings('myhome'))
+        elif writer is not None:
+            writer.abort()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        store.close()
+        if details is not None:
+            details.close()
+            print(f"  Details: {details.summary()}")
 
     # Save outputs
-    if unique_listings:
-        fieldnames = list(unique_listings[0].keys())
-
-        with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(unique_listings)
+    if scraped:
+        with metrics.span('finish_outputs'):
+            path = writer.close()
         print(f"✓ CSV: {OUTPUT_CSV}")
-
-        with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-            output_data = {
-                'scraped_at': scrape_timestamp,
-                'listings': unique_listings
-            }
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
         print(f"✓ JSON: {OUTPUT_JSON}")
+        print(f"✓ Columnar: {path}")
+        if args.shard_by:
+            print(f"✓ Shards: {len(writer.shards.shards)} by {args.shard_by} -> {MANIFEST_JSON}")
 
         # Save timestamp
         with open(TIMESTAMP_FILE, 'w', encoding='utf-8') as f:
             f.write(scrape_timestamp)
         print(f"✓ Timestamp: {TIMESTAMP_FILE}")
 
+        # Outputs are written - the checkpoint isn't needed any more
+        journal.finish()
+
         # Quick stats
-        prices = [l['price_num'] for l in unique_listings if l['price_num'] > 0]
+        prices = writer.price_stats()
         if prices:
             print(f"\nPrice Stats:")
-            print(f"   Min: €{min(prices):,}")
-            print(f"   Max: €{max(prices):,}")
-            print(f"   Avg: €{sum(prices)//len(prices):,}")
+            print(f"   Min: €{prices[0]:,}")
+            print(f"   Max: €{prices[1]:,}")
+            print(f"   Avg: €{prices[2]:,}")
+
+    written = writer.count if scraped else 0
+    metrics_path = metrics.write({'backend': args.backend, 'incremental': args.incremental,
+                                  'unique_listings': written, 'pacer': get_pacer('myhome').metrics()})
+    print(f"✓ Metrics: {metrics_path}")
 
     print("\nDone!")
+    return {
+        'source': 'myhome',
+        'listings': written,
+        'elapsed': round(time.time() - start_time, 1),
+        'changes': {k: len(v) for k, v in changes.items()},
+        'metrics': metrics_path,
+    }
+
+
+def main():
+    asyncio.run(run(build_parser().parse_args()))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,240 @@
+"""
+Streaming output writers shared by both scrapers
+
+Listings are written to the CSV and JSON outputs one page at a time as the
+scrape goes, and the columnar file is built from compact per-column arrays, so
+no full list of listings is ever held in memory. The JSON comes out exactly as
+json.dump(..., indent=2) would write it. Everything goes to .tmp files that
+only replace the real outputs once the run has finished, so a crash halfway
+never leaves a truncated CSV or JSON behind.
+
+With --shard-by area or price, the listings also go into small CSV shards named
+by a hash of their content (data/shards/daft-dublin-15.3f9c2a7e01.csv), listed
+in data/<source>_manifest.json. A shard whose listings didn't change keeps its
+name and file, so a run only adds the shards that did change, and the
+dashboard can cache shards for good and fetch just the ones it needs.
+
+With --compact-images the image URLs are written in media.py's compact form.
+"""
+
+import os
+import csv
+import json
+import hashlib
+from pathlib import Path
+
+from schema import FIELDS, as_dict
+from columnar import ColumnarEncoder, compress, COMPRESSION
+from store import VOLATILE_FIELDS
+from planner import band_name
+from geo import Gazetteer, normalise
+
+SHARD_BY = ('area', 'price')
+# Shards leave out what changes every day without the listing changing
+SHARD_FIELDS = tuple(f for f in FIELDS if f not in VOLATILE_FIELDS)
+# Price shard boundaries - the dashboard's chart buckets, roughly even counts per shard
+PRICE_SHARDS = (300000, 400000, 500000, 600000, 700000, 800000, 1000000, 1500000)
+HASH_LENGTH = 10
+
+
+def indented(row):
+    """One listing as it appears inside the indented "listings" array"""
+    return '    ' + json.dumps(row, indent=2, ensure_ascii=False).replace('\n', '\n    ')
+
+
+class ListingWriter:
+    """Writes the CSV, JSON and columnar outputs a page of Listing records at a time
+
+    Use as a context manager: the outputs are moved into place on a clean exit
+    and the partial files removed if the block raises.
+    """
+
+    def __init__(self, csv_path, json_path, columnar_path, scraped_at, compression=None, shards=None, media=None):
+        self.shards = shards  # a ShardedWriter, if the run is sharded
+        self.media = media  # a media.MediaTable, to write compact image URLs
+        self.csv_path = csv_path
+        self.json_path = json_path
+        self.columnar_path = columnar_path + (COMPRESSION[compression] if compression else '')
+        self.scraped_at = scraped_at
+        self.compression = compression
+        self.count = 0
+        self.prices = []  # min, max, total, count of the asking prices written
+
+        self.csv_file = open(csv_path + '.tmp', 'w', newline='', encoding='utf-8')
+        self.csv_writer = csv.DictWriter(self.csv_file, fieldnames=FIELDS)
+        self.csv_writer.writeheader()
+        self.json_file = open(json_path + '.tmp', 'w', encoding='utf-8')
+        self.json_file.write('{\n  "scraped_at": ' + json.dumps(scraped_at) + ',\n  "listings": [')
+        self.columnar = ColumnarEncoder()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, listings):
+        for listing in listings:
+            row = as_dict(listing)
+            if self.media is not None:
+                row['image_url'] = self.media.compact(row['image_url'])
+            self.csv_writer.writerow(row)
+            self.json_file.write((',\n' if self.count else '\n') + indented(row))
+            self.columnar.add(row)
+            if self.shards is not None:
+                self.shards.add(listing, row)
+            self.count += 1
+            if listing.price_num:
+                self._price(listing.price_num)
+
+    def _price(self, price):
+        if not self.prices:
+            self.prices = [price, price, 0, 0]
+        self.prices[0] = min(self.prices[0], price)
+        self.prices[1] = max(self.prices[1], price)
+        self.prices[2] += price
+        self.prices[3] += 1
+
+    def price_stats(self):
+        """(min, max, average) of the prices written, or None if nothing had a price"""
+        if not self.prices:
+            return None
+        low, high, total, count = self.prices
+        return low, high, total // count
+
+    def close(self):
+        """Finish the files and move them into place - returns the columnar file's path"""
+        self.csv_file.close()
+        self.json_file.write('\n  ]\n}' if self.count else ']\n}')
+        self.json_file.close()
+
+        data = self.columnar.finish(self.scraped_at)
+        if self.compression:
+            data = compress(data, self.compression)
+        with open(self.columnar_path + '.tmp', 'wb') as f:
+            f.write(data)
+
+        if self.media is not None:
+            self.media.save()
+        for path in (self.csv_path, self.json_path, self.columnar_path):
+            os.replace(path + '.tmp', path)
+        if self.shards is not None:
+            self.shards.close()
+        return self.columnar_path
+
+    def abort(self):
+        self.csv_file.close()
+        self.json_file.close()
+        for path in (self.csv_path, self.json_path, self.columnar_path):
+            if os.path.exists(path + '.tmp'):
+                os.remove(path + '.tmp')
+        if self.shards is not None:
+            self.shards.abort()
+
+
+def price_shard(price):
+    if not price:
+        return 'poa'
+    lo = max((b for b in PRICE_SHARDS if b <= price), default=None)
+    hi = min((b for b in PRICE_SHARDS if b > price), default=None)
+    return band_name(lo, hi)
+
+
+def shard_key(shard_by):
+    """Listing -> shard name: its area as the dashboard resolves it (geo.py), or its price band"""
+    if shard_by == 'price':
+        return lambda listing: price_shard(listing.price_num)
+    gazetteer = Gazetteer.load()
+    return lambda listing: gazetteer.resolve(listing.address, listing.latitude, listing.longitude)[0]
+
+
+def slug(name):
+    return normalise(name).replace(' ', '-') or 'unknown'
+
+
+class ShardedWriter:
+    """Content-hashed CSV shards of one source's listings, plus their manifest
+
+    Rows are streamed into a .tmp file per shard. At close each shard is sorted by
+    listing_id - scrape order changes from run to run, the content doesn't - and
+    named by a hash of its bytes. Files already there under that name are left
+    alone; the source's shards that aren't in the new manifest are removed.
+    """
+
+    def __init__(self, shards_dir, manifest_path, source, shard_by, scraped_at):
+        if shard_by not in SHARD_BY:
+            raise ValueError(f"can't shard by {shard_by!r} - choose from {', '.join(SHARD_BY)}")
+        self.shards_dir = Path(shards_dir)
+        self.manifest_path = manifest_path
+        self.source = source
+        self.shard_by = shard_by
+        self.scraped_at = scraped_at
+        self.key = shard_key(shard_by)
+        self.shards = {}  # key -> [slug, tmp path, file, writer, count, min price, max price]
+        self.slugs = set()
+        self.shards_dir.mkdir(parents=True, exist_ok=True)
+        # Left behind by a run that was killed before it could close or abort
+        for path in self.shards_dir.glob(f"{source}-*.csv.tmp"):
+            path.unlink()
+
+    def add(self, listing, row):
+        key = self.key(listing)
+        shard = self.shards.get(key)
+        if shard is None:
+            name = slug(key)
+            while name in self.slugs:  # "Dún Laoghaire" and "Dun Laoghaire"
+                name += '-'
+            self.slugs.add(name)
+            path = self.shards_dir / f"{self.source}-{name}.csv.tmp"
+            f = open(path, 'w', newline='', encoding='utf-8')
+            writer = csv.DictWriter(f, fieldnames=SHARD_FIELDS, extrasaction='ignore')
+            shard = self.shards[key] = [name, path, f, writer, 0, None, None]
+        shard[3].writerow(row)
+        shard[4] += 1
+        price = listing.price_num
+        if price:
+            shard[5] = price if shard[5] is None else min(shard[5], price)
+            shard[6] = price if shard[6] is None else max(shard[6], price)
+
+    def _finish(self, key, shard):
+        """Sort and hash one shard, move it into place - returns its manifest entry"""
+        name, path, f, _, count, low, high = shard
+        f.close()
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = sorted(csv.reader(f), key=lambda r: r[0])
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(SHARD_FIELDS)
+            writer.writerows(rows)
+        with open(path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:HASH_LENGTH]
+        name = f"{self.source}-{name}.{digest}.csv"
+        final = self.shards_dir / name
+        if final.exists():
+            os.remove(path)
+        else:
+            os.replace(path, final)
+        return {'key': key, 'file': f"shards/{name}", 'count': count, 'min_price': low, 'max_price': high}
+
+    def close(self):
+        entries = [self._finish(key, self.shards[key]) for key in sorted(self.shards)]
+        keep = {Path(e['file']).name for e in entries}
+        for path in self.shards_dir.glob(f"{self.source}-*.csv"):
+            if path.name not in keep:
+                path.unlink()
+
+        manifest = {'scraped_at': self.scraped_at, 'source': self.source, 'shard_by': self.shard_by,
+                    'fields': list(SHARD_FIELDS), 'shards': entries}
+        with open(self.manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
+        return manifest
+
+    def abort(self):
+        for _, path, f, *_ in self.shards.values():
+            f.close()
+            if path.exists():
+                path.unlink()
@@ -0,0 +1,140 @@
+"""
+Adaptive request pacing shared by both scrapers
+
+AIMD (additive increase, multiplicative decrease) on the request rate: every
+clean response nudges the rate up, every error page, challenge or timeout cuts
+it and pauses all workers for an exponentially growing backoff. On good days we
+stop sleeping for nothing, on bad days we slow down before getting banned.
+"""
+
+import time
+import random
+import asyncio
+import threading
+
+# Per-source pacing: starting/min/max requests per minute, and backoff on failures
+SOURCE_DEFAULTS = {
+    'daft': {
+        'rate': 45, 'min_rate': 6, 'max_rate': 90,
+        'backoff_base': 10, 'backoff_max': 120,
+        'give_up_after': None,
+    },
+    'myhome': {
+        'rate': 40, 'min_rate': 6, 'max_rate': 80,
+        'backoff_base': 5, 'backoff_max': 60,
+        'give_up_after': 5,
+    },
+}
+
+# How much one clean response raises the rate, and how hard a failure cuts it
+INCREASE_PER_SUCCESS = 1.0
+DECREASE_FACTOR = 0.5
+
+
+def classify(error):
+    """Bucket an exception into error_page / challenge / timeout / error"""
+    name = type(error).__name__.lower()
+    message = str(error).lower()
+    if 'challenge' in name or 'challenge' in message:
+        return 'challenge'
+    if 'timeout' in name or 'timed out' in message:
+        return 'timeout'
+    if 'error page' in message or 'rate limited' in message:
+        return 'error_page'
+    return 'error'
+
+
+class AdaptivePacer:
+    """AIMD request pacing for one source, safe to share between threads and asyncio tasks"""
+
+    def __init__(self, source, rate, min_rate, max_rate, backoff_base, backoff_max, give_up_after=None):
+        self.source = source
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.give_up_after = give_up_after
+
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+        self.consecutive_failures = 0
+        self.lock = threading.Lock()
+
+        # Metrics
+        self.requests = 0
+        self.successes = 0
+        self.failures = {}
+        self.wait_seconds = 0.0
+        self.lowest_rate = self.rate
+        self.highest_rate = self.rate
+
+    def _reserve(self):
+        """Claim the next request slot and return how long to wait for it"""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot, self.paused_until)
+            # Jitter so the request pattern doesn't look like a metronome
+            self.next_slot = slot + 60.0 / self.rate * random.uniform(0.7, 1.3)
+            self.requests += 1
+            delay = slot - now
+            self.wait_seconds += delay
+        return delay
+
+    def wait(self):
+        """Block until the next request is allowed"""
+        time.sleep(self._reserve())
+
+    async def wait_async(self):
+        await asyncio.sleep(self._reserve())
+
+    def success(self):
+        with self.lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.rate = min(self.max_rate, self.rate + INCREASE_PER_SUCCESS)
+            self.highest_rate = max(self.highest_rate, self.rate)
+
+    def failure(self, error):
+        """Cut the rate and pause every worker; returns the pause in seconds"""
+        kind = classify(error) if isinstance(error, Exception) else error
+        with self.lock:
+            self.failures[kind] = self.failures.get(kind, 0) + 1
+            self.consecutive_failures += 1
+            self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+            self.lowest_rate = min(self.lowest_rate, self.rate)
+            pause = min(self.backoff_max, self.backoff_base * 2 ** (self.consecutive_failures - 1))
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        return pause
+
+    def should_give_up(self):
+        return self.give_up_after is not None and self.consecutive_failures >= self.give_up_after
+
+    def metrics(self):
+        return {
+            'source': self.source,
+            'requests': self.requests,
+            'successes': self.successes,
+            'failures': dict(self.failures),
+            'wait_seconds': round(self.wait_seconds, 1),
+            'rate_per_min': round(self.rate, 1),
+            'lowest_rate_per_min': round(self.lowest_rate, 1),
+            'highest_rate_per_min': round(self.highest_rate, 1),
+        }
+
+    def summary(self):
+        m = self.metrics()
+        failures = ', '.join(f"{k}: {v}" for k, v in m['failures'].items()) or 'none'
+        return (f"{m['requests']} requests, failures: {failures}, "
+                f"rate {m['lowest_rate_per_min']:.0f}-{m['highest_rate_per_min']:.0f}/min, "
+                f"{m['wait_seconds']:.0f}s spent waiting")
+
+
+_pacers = {}
+
+
+def get_pacer(source, **overrides):
+    """One shared pacer per source"""
+    if source not in _pacers:
+        _pacers[source] = AdaptivePacer(source, **{**SOURCE_DEFAULTS[source], **overrides})
+    return _pacers[source]
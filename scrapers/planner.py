@@ -0,0 +1,137 @@
+"""
+Price band planner for Daft searches
+
+Daft only serves the first ~1000 results (49 usable pages) of any search, so the
+search is split into price bands. Instead of hand-picking them, the planner
+reads paging.totalResults from each band's first page and bisects any band
+that is over the cap until every band fits. At the end of a run adjacent small
+bands are merged and the partition is cached, so the next run starts from a
+split that is already close to the minimum number of requests.
+"""
+
+import json
+import os
+from collections import namedtuple
+
+from jobs import with_query
+
+# Daft breaks at page 50, 20 results per page
+MAX_PAGES = 49
+PAGE_SIZE = 20
+MAX_RESULTS = MAX_PAGES * PAGE_SIZE
+
+# Merged bands leave headroom so a few new listings don't push them over the cap
+MERGE_TARGET = int(MAX_RESULTS * 0.8)
+
+# Don't bisect below this - nothing more can be done about 1000 houses at one price
+MIN_BAND_WIDTH = 10000
+
+# Where a search with no price bands at all is first cut
+SEED_PRICE = 500000
+
+# search is the jobs.py shard the band belongs to, when a run covers several
+PriceBand = namedtuple('PriceBand', 'name url lo hi search', defaults=(None,))
+
+
+def format_price(value):
+    if value >= 1000000:
+        return f"{value / 1000000:g}m"
+    return f"{value / 1000:g}k"
+
+
+def band_name(lo, hi):
+    if lo is None and hi is None:
+        return "all"
+    if lo is None:
+        return f"under_{format_price(hi)}"
+    if hi is None:
+        return f"over_{format_price(lo)}"
+    return f"{format_price(lo)}_{format_price(hi)}"
+
+
+def band_url(base_url, lo, hi):
+    return with_query(base_url, salePrice_from=lo, salePrice_to=hi)
+
+
+class BandPlanner:
+    """Keeps the price partition for one search, splitting and merging bands as needed"""
+
+    def __init__(self, base_url, default_bands, cache_file=None, search=None):
+        self.base_url = base_url
+        self.cache_file = cache_file
+        self.search = search
+        self.counts = {}  # (lo, hi) -> totalResults, for bands that fit under the cap
+        self.splits = 0
+
+        bounds = default_bands
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, encoding='utf-8') as f:
+                    bounds = [(b['from'], b['to']) for b in json.load(f)['bands']]
+                print(f"✓ Starting from cached price partition ({len(bounds)} bands)")
+            except (ValueError, KeyError) as e:
+                print(f"⚠ Ignoring unreadable band cache: {e}")
+        self.bands = [self.band(lo, hi) for lo, hi in bounds]
+
+    def band(self, lo, hi):
+        name = f"{self.search}/{band_name(lo, hi)}" if self.search else band_name(lo, hi)
+        return PriceBand(name, band_url(self.base_url, lo, hi), lo, hi, self.search)
+
+    def needs_split(self, total_count, total_pages):
+        return total_count > MAX_RESULTS or total_pages > MAX_PAGES
+
+    def split(self, band):
+        """Bisect a band that's over the cap - returns None if it can't be narrowed any more"""
+        lo, hi = band.lo, band.hi
+        if lo is None and hi is None:
+            mid = SEED_PRICE
+        elif hi is None:
+            # Open-ended top band: double the floor
+            mid = max(lo * 2, lo + MIN_BAND_WIDTH)
+        else:
+            floor = lo or 0
+            if hi - floor < 2 * MIN_BAND_WIDTH:
+                return None
+            # Round to a tidy price so band names stay readable
+            mid = round((floor + hi) / 2 / 5000) * 5000
+        self.splits += 1
+        return [self.band(lo, mid), self.band(mid, hi)]
+
+    def record(self, band, total_count):
+        """A band that fits - remember its size for merging at the end"""
+        self.counts[(band.lo, band.hi)] = total_count
+
+    def partition(self):
+        """Bands that fit, in price order, with adjacent small ones merged"""
+        leaves = sorted(self.counts.items(), key=lambda kv: -1 if kv[0][0] is None else kv[0][0])
+        merged = []
+        for (lo, hi), count in leaves:
+            if merged and merged[-1][1] == lo and merged[-1][2] + count <= MERGE_TARGET:
+                prev_lo, _, prev_count = merged.pop()
+                merged.append((prev_lo, hi, prev_count + count))
+            else:
+                merged.append((lo, hi, count))
+        return merged
+
+    def covers_everything(self, partition):
+        """True if the bands are contiguous from no floor to no ceiling"""
+        if not partition or partition[0][0] is not None or partition[-1][1] is not None:
+            return False
+        return all(a[1] == b[0] for a, b in zip(partition, partition[1:]))
+
+    def save(self):
+        """Cache the merged partition for the next run - only if every band was scraped"""
+        partition = self.partition()
+        if not self.cache_file:
+            return partition
+        if not self.covers_everything(partition):
+            print("⚠ Some price bands failed - keeping the previous band cache")
+            return partition
+
+        requests = sum(max(1, -(-count // PAGE_SIZE)) for _, _, count in partition)
+        with open(self.cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'bands': [{'name': band_name(lo, hi), 'from': lo, 'to': hi, 'count': count}
+                                 for lo, hi, count in partition]}, f, indent=2)
+        print(f"✓ Price bands: {len(partition)} bands, ~{requests} requests next run "
+              f"({self.splits} splits this run) -> {self.cache_file}")
+        return partition
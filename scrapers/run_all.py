@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Run several source scrapers at once
+
+The sites don't contend with each other, so running them side by side takes
+about as long as the slowest one instead of the sum. By default they share one
+process and one Chromium (each gets its own browser context); --isolate runs
+each in its own process instead. Each source has its own timeout, a failing
+source doesn't take the others down, and a single summary is printed at the end.
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+import daft_scraper
+import myhome_scraper
+from columnar import COMPRESSION
+from outputs import SHARD_BY
+
+SCRIPT_DIR = Path(__file__).parent
+
+SCRAPERS = {
+    'daft': daft_scraper,
+    'myhome': myhome_scraper,
+}
+
+# Per-source wall-clock limit - a timed-out run keeps its checkpoint for --resume
+DEFAULT_TIMEOUT = 90 * 60
+
+
+def scraper_args(args):
+    """Flags passed through to every scraper"""
+    extra = ['--backend', args.backend]
+    if args.incremental:
+        extra.append('--incremental')
+    if args.resume:
+        extra.append('--resume')
+    if args.compress:
+        extra += ['--compress', args.compress]
+    if args.details:
+        extra.append('--details')
+    if args.lean:
+        extra.append('--lean')
+    if args.jobs:
+        extra += ['--jobs', args.jobs]
+    if args.shard_by:
+        extra += ['--shard-by', args.shard_by]
+    if args.compact_images:
+        extra.append('--compact-images')
+    if args.allow_drop:
+        extra.append('--allow-drop')
+    return extra
+
+
+async def run_in_process(source, args, browser):
+    module = SCRAPERS[source]
+    return await module.run(module.build_parser().parse_args(scraper_args(args)), browser)
+
+
+async def run_isolated(source, args):
+    script = SCRIPT_DIR / f"{source}_scraper.py"
+    proc = await asyncio.create_subprocess_exec(sys.executable, str(script), *scraper_args(args))
+    try:
+        code = await proc.wait()
+    except asyncio.CancelledError:
+        proc.kill()
+        await proc.wait()
+        raise
+    if code != 0:
+        raise RuntimeError(f"exited with code {code}")
+    return {'source': source}
+
+
+async def run_source(source, args, browser):
+    """Run one scraper under its timeout and turn the outcome into a summary row"""
+    start = time.time()
+    try:
+        if args.isolate:
+            summary = await asyncio.wait_for(run_isolated(source, args), args.timeout)
+        else:
+            summary = await asyncio.wait_for(run_in_process(source, args, browser), args.timeout)
+        summary['status'] = 'ok'
+    except asyncio.TimeoutError:
+        summary = {'source': source, 'status': 'timeout', 'error': f"no result after {args.timeout}s"}
+    except Exception as e:
+        summary = {'source': source, 'status': 'failed', 'error': str(e) or type(e).__name__}
+    summary['elapsed'] = round(time.time() - start, 1)
+    return summary
+
+
+async def run_all(args):
+    sources = args.sources
+    shared_browser = not args.isolate and args.backend == 'browser'
+
+    if not shared_browser:
+        return await asyncio.gather(*(run_source(s, args, None) for s in sources))
+
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        print(f"Launching one shared Chromium for {', '.join(sources)}...")
+        browser = await p.chromium.launch(
+            headless=True,
+            args=['--disable-blink-features=AutomationControlled'],
+        )
+        try:
+            return await asyncio.gather(*(run_source(s, args, browser) for s in sources))
+        finally:
+            await browser.close()
+
+
+def print_summary(results, elapsed):
+    print(f"\n{'=' * 60}")
+    print(f"Run summary ({elapsed:.0f}s wall clock)")
+    print(f"{'=' * 60}")
+    for r in results:
+        if r['status'] == 'ok':
+            detail = ''
+            if 'listings' in r:
+                changes = ', '.join(f"{v} {k}" for k, v in r.get('changes', {}).items() if v)
+                detail = f" - {r['listings']} listings" + (f" ({changes})" if changes else '')
+            print(f"  ✓ {r['source']}: {r['elapsed']:.0f}s{detail}")
+        else:
+            print(f"  ✗ {r['source']}: {r['status']} after {r['elapsed']:.0f}s - {r['error']}")
+    serial = sum(r['elapsed'] for r in results)
+    print(f"  (sequential would have taken ~{serial:.0f}s)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the property scrapers side by side")
+    # No choices= here: argparse checks an empty list against them and rejects it
+    parser.add_argument('sources', nargs='*',
+                        help=f"which scrapers to run: {', '.join(SCRAPERS)} (default: all)")
+    parser.add_argument('--isolate', action='store_true',
+                        help="run each scraper in its own process with its own browser")
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT,
+                        help=f"seconds before a source is given up on (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument('--backend', choices=['browser', 'http'], default='browser')
+    parser.add_argument('--incremental', action='store_true')
+    parser.add_argument('--resume', action='store_true')
+    parser.add_argument('--compress', choices=list(COMPRESSION))
+    parser.add_argument('--details', action='store_true')
+    parser.add_argument('--lean', action='store_true')
+    parser.add_argument('--jobs', help="job spec with the regions and property types to search (see jobs.py)")
+    parser.add_argument('--shard-by', choices=SHARD_BY)
+    parser.add_argument('--compact-images', action='store_true')
+    parser.add_argument('--allow-drop', action='store_true')
+    parser.add_argument('--strict', action='store_true',
+                        help="exit non-zero if any source fails (default: only if all fail)")
+    return parser
+
+
+def parse_args(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = [s for s in args.sources if s not in SCRAPERS]
+    if unknown:
+        parser.error(f"unknown source {', '.join(unknown)} (choose from {', '.join(SCRAPERS)})")
+    args.sources = args.sources or list(SCRAPERS)
+    return args
+
+
+def main():
+    args = parse_args()
+
+    start = time.time()
+    results = asyncio.run(run_all(args))
+    print_summary(results, time.time() - start)
+
+    failed = [r for r in results if r['status'] != 'ok']
+    if failed and (args.strict or len(failed) == len(results)):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Listing schema shared by every source
+
+Each site's raw JSON is turned into the same typed, validated Listing record at
+extraction time, so nothing downstream (store, outputs, dashboard) has to guess
+whether beds is 3 or "3 Bed", or which of MyHome's two coordinate sets to use.
+Listing is a namedtuple - far lighter than a dict per listing on a big crawl -
+and is converted to a plain dict only where it's written out.
+"""
+
+import re
+from collections import namedtuple
+from datetime import datetime
+
+FIELDS = (
+    'listing_id', 'source', 'url', 'address',
+    'price',            # as displayed, e.g. "€299,950" or "€1,275,000 to €1,350,000"
+    'price_num',        # int, lower bound of a range; None for POA
+    'beds', 'baths',    # int or None
+    'size_sqm',         # float or None
+    'property_type', 'ber',
+    'latitude', 'longitude',  # float or None
+    'date_listed',      # YYYY-MM-DD or ''
+    'days_on_market',   # int or None
+    'image_url', 'agent', 'agent_branch',
+    'is_new', 'is_sale_agreed',
+)
+
+Listing = namedtuple('Listing', FIELDS)
+
+TEXT_FIELDS = ('listing_id', 'source', 'url', 'address', 'price', 'property_type', 'ber',
+               'date_listed', 'image_url', 'agent', 'agent_branch')
+INT_FIELDS = ('price_num', 'beds', 'baths', 'days_on_market')
+FLOAT_FIELDS = ('size_sqm', 'latitude', 'longitude')
+BOOL_FIELDS = ('is_new', 'is_sale_agreed')
+
+# Anything outside this box is a bad geocode, not a house
+LAT_RANGE = (51.0, 56.0)
+LNG_RANGE = (-11.0, -5.0)
+
+# MyHome timestamps have 7 fractional digits, which fromisoformat only accepts from 3.11
+EXTRA_FRACTION_DIGITS = re.compile(r'(\.\d{6})\d+')
+
+
+class InvalidListing(ValueError):
+    pass
+
+
+def to_text(value):
+    return '' if value is None else str(value).strip()
+
+
+def to_int(value):
+    """3, 3.0, "3", "3 Bed" -> 3; blanks and anything without a leading number -> None"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    digits = ''
+    for c in str(value).strip():
+        if not c.isdigit():
+            break
+        digits += c
+    return int(digits) if digits else None
+
+
+def to_float(value):
+    if value is None or value == '' or isinstance(value, bool):
+        return None
+    try:
+        value = float(str(value).replace(',', '').split()[0]) if isinstance(value, str) else float(value)
+    except (ValueError, IndexError):
+        return None
+    return value if value == value else None  # NaN
+
+
+def to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes')
+    return bool(value)
+
+
+def price_from_text(price):
+    """"€299,950" -> 299950, ranges -> the lower bound, "Price on Application" -> None"""
+    digits = ''.join(c for c in str(price).lower().split(' to ')[0] if c.isdigit())
+    return int(digits) if digits else None
+
+
+def coordinates(lat, lng):
+    """(lat, lng) as floats, or (None, None) if missing, (0, 0) or outside Ireland"""
+    lat, lng = to_float(lat), to_float(lng)
+    if lat is None or lng is None:
+        return None, None
+    if not (LAT_RANGE[0] <= lat <= LAT_RANGE[1] and LNG_RANGE[0] <= lng <= LNG_RANGE[1]):
+        return None, None
+    return lat, lng
+
+
+def listed(dt):
+    """Date listed and days on market from a datetime"""
+    return dt.strftime('%Y-%m-%d'), (datetime.now() - dt).days
+
+
+def make_listing(**values):
+    """Coerce every field to its type and check the record is usable"""
+    record = {}
+    for field in TEXT_FIELDS:
+        record[field] = to_text(values.get(field))
+    for field in INT_FIELDS:
+        record[field] = to_int(values.get(field))
+    for field in FLOAT_FIELDS:
+        record[field] = to_float(values.get(field))
+    for field in BOOL_FIELDS:
+        record[field] = to_bool(values.get(field))
+
+    if not record['listing_id']:
+        raise InvalidListing("no listing id")
+    if not record['url'].startswith('http'):
+        raise InvalidListing(f"{record['listing_id']}: bad url {record['url']!r}")
+    if record['size_sqm'] is not None and record['size_sqm'] <= 0:
+        record['size_sqm'] = None
+    record['latitude'], record['longitude'] = coordinates(record['latitude'], record['longitude'])
+    return Listing(**record)
+
+
+def from_dict(data, source=None):
+    """Listing from a stored dict (checkpoint journal, listing store) - re-coerces the types"""
+    values = {field: data.get(field) for field in FIELDS}
+    if source and not values['source']:
+        values['source'] = source
+    if values['latitude'] in (None, '') and data.get('brochure_latitude'):
+        # Rows written before this schema kept MyHome's BrochureMap position separately
+        values['latitude'], values['longitude'] = data['brochure_latitude'], data.get('brochure_longitude')
+    if values['price_num'] is None:
+        values['price_num'] = price_from_text(values['price'] or '')
+    return make_listing(**values)
+
+
+def as_dict(listing):
+    return listing._asdict()
+
+
+def parse_daft(item, base_url):
+    """One entry of __NEXT_DATA__ pageProps.listings -> Listing"""
+    listing = item.get('listing', {})
+    coords = listing.get('point', {}).get('coordinates') or []
+
+    images = listing.get('media', {}).get('images', [])
+    seller = listing.get('seller', {})
+
+    # publishDate is a millisecond timestamp
+    date_listed, days_on_market = '', None
+    publish_ts = listing.get('publishDate')
+    if publish_ts:
+        try:
+            date_listed, days_on_market = listed(datetime.fromtimestamp(publish_ts / 1000))
+        except (TypeError, ValueError, OverflowError, OSError):
+            pass
+
+    floor_area = listing.get('floorArea')
+    ber = listing.get('ber')
+
+    return make_listing(
+        listing_id=listing.get('id'),
+        source='daft',
+        url=base_url + listing.get('seoFriendlyPath', ''),
+        address=listing.get('title'),
+        price=listing.get('price'),
+        price_num=price_from_text(listing.get('price', '')),
+        beds=listing.get('numBedrooms'),
+        baths=listing.get('numBathrooms'),
+        size_sqm=floor_area.get('value') if isinstance(floor_area, dict) else None,
+        property_type=listing.get('propertyType'),
+        ber=ber.get('rating') if isinstance(ber, dict) else None,
+        latitude=coords[1] if len(coords) > 1 else None,
+        longitude=coords[0] if coords else None,
+        date_listed=date_listed,
+        days_on_market=days_on_market,
+        image_url=images[0].get('size720x480', '') if images else '',
+        agent=seller.get('name'),
+        agent_branch=seller.get('branch'),
+    )
+
+
+def parse_myhome(item, base_url):
+    """One entry of the ng-state SearchResults -> Listing"""
+    # CreatedOnDate, falling back to ActivatedOn
+    date_listed, days_on_market = '', None
+    for key in ('CreatedOnDate', 'ActivatedOn'):
+        if item.get(key):
+            try:
+                timestamp = EXTRA_FRACTION_DIGITS.sub(r'\1', item[key].replace('+00:00', ''))
+                date_listed, days_on_market = listed(datetime.fromisoformat(timestamp))
+                break
+            except (TypeError, ValueError):
+                continue
+
+    # Location is often (0, 0) when the agent didn't pin it - BrochureMap has it then
+    location = item.get('Location') or {}
+    lat, lng = coordinates(location.get('lat'), location.get('lon'))
+    if lat is None:
+        brochure_map = item.get('BrochureMap') or {}
+        lat, lng = coordinates(brochure_map.get('latitude'), brochure_map.get('longitude'))
+
+    url = item.get('BrochureUrl', '')
+    if url and not url.startswith('http'):
+        url = base_url + url
+
+    price = item.get('PriceAsString', '')
+    return make_listing(
+        listing_id=item.get('PropertyId'),
+        source='myhome',
+        url=url,
+        address=item.get('DisplayAddress'),
+        price=price,
+        price_num=price_from_text(price),
+        beds=item.get('NumberOfBeds'),
+        baths=item.get('NumberOfBathrooms'),
+        size_sqm=item.get('SizeStringMeters'),
+        property_type=item.get('PropertyType'),
+        ber=item.get('BerRating'),
+        latitude=lat,
+        longitude=lng,
+        date_listed=date_listed,
+        days_on_market=days_on_market,
+        image_url=(item.get('MainPhoto') or ''),
+        agent=item.get('GroupName'),
+        is_new=item.get('IsNew'),
+        is_sale_agreed=item.get('IsSaleAgreed'),
+    )
@@ -0,0 +1,300 @@
+"""
+Persistent listing store (SQLite) shared by both scrapers
+
+Keyed by (source, listing_id). Keeps first/last seen dates, price history and
+sale-agreed transitions across runs, so each scrape can report what changed
+and incremental runs can stop paging once they reach listings we already have.
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+
+from schema import as_dict, from_dict
+
+DB_FILE = str(Path(__file__).parent.parent / "data/listings.db")
+# Text dump of the store - what's committed, since a binary that changes every run
+# would pile up in the history. Rebuild the database from it with --restore.
+DUMP_FILE = str(Path(__file__).parent.parent / "data/listings.sql")
+
+# Fields that change every day without the listing itself changing
+VOLATILE_FIELDS = ('days_on_market',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    source TEXT NOT NULL,
+    listing_id TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    removed_at TEXT,
+    price_num INTEGER,
+    is_sale_agreed INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (source, listing_id)
+);
+CREATE TABLE IF NOT EXISTS price_history (
+    source TEXT NOT NULL,
+    listing_id TEXT NOT NULL,
+    seen_at TEXT NOT NULL,
+    price TEXT,
+    price_num INTEGER
+);
+CREATE TABLE IF NOT EXISTS sale_agreed_history (
+    source TEXT NOT NULL,
+    listing_id TEXT NOT NULL,
+    seen_at TEXT NOT NULL,
+    is_sale_agreed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_staging (
+    source TEXT NOT NULL,
+    listing_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (source, listing_id)
+);
+CREATE INDEX IF NOT EXISTS price_history_listing ON price_history (source, listing_id);
+CREATE INDEX IF NOT EXISTS sale_agreed_history_listing ON sale_agreed_history (source, listing_id);
+"""
+
+
+def price_number(listing):
+    """Numeric price - price_num, or parsed from the "€299,950" string for rows stored before it existed"""
+    if listing.get('price_num'):
+        return int(listing['price_num'])
+    price = str(listing.get('price', ''))
+    digits = ''.join(c for c in price.lower().split(' to ')[0] if c.isdigit())
+    return int(digits) if digits else None
+
+
+def listing_hash(listing):
+    """Hash of everything except fields that tick over daily"""
+    stable = {k: v for k, v in listing.items() if k not in VOLATILE_FIELDS}
+    return hashlib.sha1(json.dumps(stable, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ListingStore:
+    """SQLite-backed store of every listing we've seen, with change detection on upsert"""
+
+    def __init__(self, path=DB_FILE):
+        # Both scrapers may write at the end of a run_all.py run - wait for the lock
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def dump(self, path):
+        """Write the whole store out as SQL - rows stay in rowid order, so dumps diff line by line"""
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            for line in self.db.iterdump():
+                f.write(line + '\n')
+        os.replace(path + '.tmp', path)
+
+    def is_unchanged(self, source, listing):
+        """True if we already have this exact listing from a previous run
+
+        Fields the search results leave blank but the stored record has (filled in
+        from the listing's own page, see details.py) don't count as a change.
+        """
+        row = self.db.execute(
+            "SELECT content_hash, removed_at, data FROM listings WHERE source = ? AND listing_id = ?",
+            (source, listing.listing_id)).fetchone()
+        if row is None or row[1] is not None:
+            return False
+        current = as_dict(listing)
+        if row[0] == listing_hash(current):
+            return True
+        stored = json.loads(row[2])
+        return row[0] == listing_hash({k: stored.get(k) if v is None or v == '' else v for k, v in current.items()})
+
+    def upsert(self, source, listings, seen_at):
+        """Insert/update Listing records and return the changes: new, price_changed, sale_agreed, updated"""
+        changes = {'new': [], 'price_changed': [], 'sale_agreed': [], 'updated': []}
+        with self.db:
+            for listing in map(as_dict, listings):
+                listing_id = listing['listing_id']
+                price_num = price_number(listing)
+                sale_agreed = 1 if listing.get('is_sale_agreed') else 0
+                content_hash = listing_hash(listing)
+                row = self.db.execute(
+                    "SELECT price_num, is_sale_agreed, content_hash, removed_at FROM listings "
+                    "WHERE source = ? AND listing_id = ?", (source, listing_id)).fetchone()
+
+                if row is None:
+                    self.db.execute(
+                        "INSERT INTO listings (source, listing_id, first_seen, last_seen, price_num, "
+                        "is_sale_agreed, content_hash, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (source, listing_id, seen_at, seen_at, price_num, sale_agreed, content_hash,
+                         json.dumps(listing, ensure_ascii=False)))
+                    self.db.execute(
+                        "INSERT INTO price_history VALUES (?, ?, ?, ?, ?)",
+                        (source, listing_id, seen_at, str(listing.get('price', '')), price_num))
+                    self.db.execute(
+                        "INSERT INTO sale_agreed_history VALUES (?, ?, ?, ?)",
+                        (source, listing_id, seen_at, sale_agreed))
+                    changes['new'].append(listing)
+                    continue
+
+                old_price, old_sale_agreed, old_hash, removed_at = row
+                if price_num != old_price:
+                    self.db.execute(
+                        "INSERT INTO price_history VALUES (?, ?, ?, ?, ?)",
+                        (source, listing_id, seen_at, str(listing.get('price', '')), price_num))
+                    changes['price_changed'].append(
+                        {'listing_id': listing_id, 'old_price': old_price, 'new_price': price_num,
+                         'listing': listing})
+                if sale_agreed != old_sale_agreed:
+                    self.db.execute(
+                        "INSERT INTO sale_agreed_history VALUES (?, ?, ?, ?)",
+                        (source, listing_id, seen_at, sale_agreed))
+                    if sale_agreed:
+                        changes['sale_agreed'].append(listing)
+                if content_hash != old_hash or removed_at is not None:
+                    changes['updated'].append(listing)
+
+                self.db.execute(
+                    "UPDATE listings SET last_seen = ?, removed_at = NULL, price_num = ?, is_sale_agreed = ?, "
+                    "content_hash = ?, data = ? WHERE source = ? AND listing_id = ?",
+                    (seen_at, price_num, sale_agreed, content_hash,
+                     json.dumps(listing, ensure_ascii=False), source, listing_id))
+        return changes
+
+    def mark_removed(self, source, run_started):
+        """After a full run: anything active we didn't see this time has been taken down"""
+        with self.db:
+            removed = [r[0] for r in self.db.execute(
+                "SELECT listing_id FROM listings WHERE source = ? AND removed_at IS NULL AND last_seen < ?",
+                (source, run_started))]
+            self.db.execute(
+                "UPDATE listings SET removed_at = ? WHERE source = ? AND removed_at IS NULL AND last_seen < ?",
+                (run_started, source, run_started))
+        return removed
+
+    def active_count(self, source):
+        return self.db.execute(
+            "SELECT COUNT(*) FROM listings WHERE source = ? AND removed_at IS NULL", (source,)).fetchone()[0]
+
+    def active_listings(self, source):
+        """Every listing still on the market, in the order we first saw them - streamed off the cursor"""
+        for (data,) in self.db.execute(
+                "SELECT data FROM listings WHERE source = ? AND removed_at IS NULL ORDER BY rowid", (source,)):
+            yield from_dict(json.loads(data), source)
+
+    def price_history(self, source, listing_id):
+        return self.db.execute(
+            "SELECT seen_at, price, price_num FROM price_history WHERE source = ? AND listing_id = ? "
+            "ORDER BY seen_at", (source, listing_id)).fetchall()
+
+
+class RunRecorder:
+    """Records a run in the store as its pages come in
+
+    Pages are staged on disk (run_staging) as they arrive, which also drops listings
+    already seen earlier in the run. The store itself is only updated by finish(),
+    so change detection works exactly as if the whole run had been upserted at once,
+    and a resumed run that replays its journal doesn't see its own listings as old.
+    """
+
+    def __init__(self, store, source, run_started, full_run, changes_file):
+        self.store = store
+        self.source = source
+        self.run_started = run_started
+        self.full_run = full_run
+        self.changes_file = changes_file
+        with store.db:
+            store.db.execute("DELETE FROM run_staging WHERE source = ?", (source,))
+
+    def add(self, listings):
+        """Stage one page of Listing records; returns the ones not seen earlier in this run"""
+        fresh = []
+        with self.store.db:
+            for listing in listings:
+                cursor = self.store.db.execute(
+                    "INSERT OR IGNORE INTO run_staging VALUES (?, ?, ?)",
+                    (self.source, listing.listing_id, json.dumps(as_dict(listing), ensure_ascii=False)))
+                if cursor.rowcount:
+                    fresh.append(listing)
+        return fresh
+
+    def staged(self):
+        return self.store.db.execute(
+            "SELECT COUNT(*) FROM run_staging WHERE source = ?", (self.source,)).fetchone()[0]
+
+    def finish(self):
+        """Upsert everything staged, detect removals on full runs and write the deltas file"""
+        store, source = self.store, self.source
+        seen = self.staged()
+        active_before = store.active_count(source)
+        staged = (from_dict(json.loads(data), source) for (data,) in store.db.execute(
+            "SELECT data FROM run_staging WHERE source = ? ORDER BY rowid", (source,)))
+        changes = store.upsert(source, staged, self.run_started)
+
+        changes['removed'] = []
+        if self.full_run:
+            # Don't mark half the market as removed because a run died early
+            if seen >= active_before * 0.5:
+                changes['removed'] = store.mark_removed(source, self.run_started)
+            else:
+                print(f"  ⚠ Only got {seen} of {active_before} known listings - not marking removals")
+
+        with store.db:
+            store.db.execute("DELETE FROM run_staging WHERE source = ?", (source,))
+
+        with open(self.changes_file, 'w', encoding='utf-8') as f:
+            json.dump({'scraped_at': self.run_started, 'full_run': self.full_run, **changes}, f,
+                      indent=2, ensure_ascii=False)
+
+        print(f"✓ Store: {len(changes['new'])} new, {len(changes['price_changed'])} price changes, "
+              f"{len(changes['sale_agreed'])} sale agreed, {len(changes['removed'])} removed")
+        print(f"✓ Changes: {self.changes_file}")
+        return changes
+
+
+def record_run(store, source, listings, run_started, full_run, changes_file):
+    """Upsert a run's listings, detect removals on full runs and write the deltas file"""
+    recorder = RunRecorder(store, source, run_started, full_run, changes_file)
+    recorder.add(listings)
+    return recorder.finish()
+
+
+def restore(dump_file=DUMP_FILE, path=DB_FILE):
+    """Rebuild the database from a dump - only if there's no database yet. True if it did."""
+    if os.path.exists(path) or not os.path.exists(dump_file):
+        return False
+    with open(dump_file, encoding='utf-8') as f:
+        script = f.read()
+    if os.path.exists(path + '.tmp'):
+        os.remove(path + '.tmp')  # left by a restore that died half way
+    db = sqlite3.connect(path + '.tmp')
+    db.executescript(script)
+    db.close()
+    os.replace(path + '.tmp', path)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dump the listing store to SQL text (the committed copy), "
+                                                 "or rebuild it from one")
+    parser.add_argument('--db', default=DB_FILE)
+    parser.add_argument('--dump-file', default=DUMP_FILE)
+    parser.add_argument('--restore', action='store_true', help="rebuild the database from the dump if it's missing")
+    args = parser.parse_args()
+
+    if args.restore:
+        if restore(args.dump_file, args.db):
+            print(f"✓ Rebuilt {args.db} from {args.dump_file}")
+        else:
+            print(f"  Nothing to restore ({args.db} exists or there's no {args.dump_file})")
+        return
+
+    store = ListingStore(args.db)
+    store.dump(args.dump_file)
+    store.close()
+    print(f"✓ Dumped {args.db} to {args.dump_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Small WebP thumbnails of the listings' photos, cached on disk
+
+The listings point at the sites' full-size photos (720x480 on Daft). This
+downloads each listing's photo once, a few at a time, shrinks it to a 240x160
+WebP and keeps it in data/thumbs/, named by a hash of the thumbnail itself, so
+the same photo on two listings is stored once. data/thumbs/index.json maps each
+photo URL to its thumbnail and records when a listing last used it. A listing
+whose photo hasn't changed is never downloaded again. Photos that no listing has
+used for KEEP_DAYS are evicted, along with their files.
+
+Run after the scrapers and before enrich.py, which puts each listing's thumbnail
+into dashboard.json for the map popups. Needs Pillow (pip install Pillow).
+
+    python scrapers/thumbs.py
+"""
+
+import io
+import csv
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import urllib.request
+from pathlib import Path
+from datetime import date, timedelta
+
+from media import MediaTable
+
+SCRIPT_DIR = Path(__file__).parent.parent
+THUMBS_DIR = SCRIPT_DIR / "data/thumbs"
+SOURCES = {
+    'daft': (str(SCRIPT_DIR / "data/daft_listings.csv"), str(SCRIPT_DIR / "data/daft_media.json")),
+    'myhome': (str(SCRIPT_DIR / "data/myhome_listings.csv"), str(SCRIPT_DIR / "data/myhome_media.json")),
+}
+
+THUMB_SIZE = (240, 160)
+WEBP_QUALITY = 70
+# Photos downloaded at once - they come from the sites' image CDNs, not the search pages
+DOWNLOAD_CONCURRENCY = 6
+DOWNLOAD_TIMEOUT = 20
+# A photo no listing has used for this long is dropped from the cache
+KEEP_DAYS = 30
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+
+def make_thumbnail(data, size=THUMB_SIZE, quality=WEBP_QUALITY):
+    """A photo's bytes -> a WebP thumbnail, cropped to fill size"""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise RuntimeError("thumbnails need the 'Pillow' package (pip install Pillow)")
+    with Image.open(io.BytesIO(data)) as image:
+        thumb = ImageOps.fit(image.convert('RGB'), size)
+    out = io.BytesIO()
+    thumb.save(out, 'WEBP', quality=quality)
+    return out.getvalue()
+
+
+def download(url, timeout=DOWNLOAD_TIMEOUT):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def url_key(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+
+
+class ThumbCache:
+    """Thumbnails on disk, named by their content, with an index from photo URL to file"""
+
+    def __init__(self, directory=THUMBS_DIR, keep_days=KEEP_DAYS):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.dir / 'index.json'
+        self.keep_days = keep_days
+        self.today = date.today().isoformat()
+        self.images = {}
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                self.images = json.load(f)['images']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def get(self, url):
+        """The thumbnail file of a photo URL, or None if it has to be downloaded"""
+        entry = self.images.get(url_key(url))
+        if entry is None or not (self.dir / entry['file']).exists():
+            return None
+        entry['used'] = self.today
+        return entry['file']
+
+    def put(self, url, thumb):
+        name = hashlib.sha1(thumb).hexdigest()[:16] + '.webp'
+        path = self.dir / name
+        if not path.exists():
+            with open(path.with_suffix('.tmp'), 'wb') as f:
+                f.write(thumb)
+            path.with_suffix('.tmp').replace(path)
+        self.images[url_key(url)] = {'file': name, 'used': self.today}
+        return name
+
+    def evict(self):
+        """Drop photos unused for keep_days and any file nothing points at - returns how many files went"""
+        cutoff = (date.today() - timedelta(days=self.keep_days)).isoformat()
+        self.images = {k: e for k, e in self.images.items() if e['used'] >= cutoff}
+        keep = {e['file'] for e in self.images.values()}
+        removed = 0
+        for path in self.dir.glob('*.webp'):
+            if path.name not in keep:
+                path.unlink()
+                removed += 1
+        return removed
+
+    def save(self, listings):
+        """Write the index - listings maps "source/listing_id" to its thumbnail file"""
+        with open(self.index_path.with_suffix('.tmp'), 'w', encoding='utf-8') as f:
+            json.dump({'updated': self.today, 'images': self.images, 'listings': listings}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        self.index_path.with_suffix('.tmp').replace(self.index_path)
+
+
+class Thumbnailer:
+    """Thumbnails for many listings through the cache, DOWNLOAD_CONCURRENCY downloads at a time"""
+
+    def __init__(self, cache, concurrency=DOWNLOAD_CONCURRENCY, fetch=download, resize=make_thumbnail):
+        self.cache = cache
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.fetch = fetch
+        self.resize = resize
+        self.cached = 0
+        self.fetched = 0
+        self.failed = 0
+
+    async def _thumb(self, url):
+        name = self.cache.get(url)
+        if name is not None:
+            self.cached += 1
+            return name
+        async with self.semaphore:
+            try:
+                data = await asyncio.to_thread(self.fetch, url)
+                thumb = await asyncio.to_thread(self.resize, data)
+            except Exception as e:
+                self.failed += 1
+                print(f"  Thumbnail for {url[:80]} failed: {e}")
+                return None
+        self.fetched += 1
+        return self.cache.put(url, thumb)
+
+    async def run(self, photos):
+        """photos: (listing key, photo URL) pairs -> {listing key: thumbnail file}"""
+        urls = sorted({url for _, url in photos if url})
+        names = dict(zip(urls, await asyncio.gather(*(self._thumb(url) for url in urls))))
+        return {key: names[url] for key, url in photos if url and names[url]}
+
+    def summary(self):
+        return f"{self.fetched} photos downloaded, {self.cached} from cache, {self.failed} failed"
+
+
+def read_photos(sources=SOURCES):
+    """(source/listing_id, full photo URL) for every listing in the scrapers' CSVs"""
+    photos = []
+    for source, (csv_path, media_path) in sources.items():
+        if not Path(csv_path).exists():
+            continue
+        media = MediaTable(media_path)
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                url = media.expand(row.get('image_url') or '')
+                if url:
+                    photos.append((f"{source}/{row['listing_id']}", url))
+    return photos
+
+
+def listing_thumbs(directory=THUMBS_DIR):
+    """{"source/listing_id": "thumbs/<file>.webp"} from the last run, or {} if there wasn't one"""
+    try:
+        with open(Path(directory) / 'index.json', encoding='utf-8') as f:
+            return {key: f"thumbs/{name}" for key, name in json.load(f)['listings'].items()}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download and cache small thumbnails of the listings' photos")
+    parser.add_argument('--concurrency', type=int, default=DOWNLOAD_CONCURRENCY)
+    args = parser.parse_args()
+
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print("⚠ Thumbnails need the 'Pillow' package (pip install Pillow) - skipping")
+        return
+    start = time.time()
+    photos = read_photos()
+    cache = ThumbCache()
+    thumbnailer = Thumbnailer(cache, args.concurrency)
+    listings = asyncio.run(thumbnailer.run(photos))
+    evicted = cache.evict()
+    cache.save(listings)
+    print(f"✓ Thumbnails for {len(listings)}/{len(photos)} listings: {thumbnailer.summary()}, "
+          f"{evicted} unused files evicted ({time.time() - start:.1f}s) -> {THUMBS_DIR}")
+
+
+if __name__ == '__main__':
+    main()
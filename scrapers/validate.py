@@ -0,0 +1,187 @@
+"""
+Checks on each run's listings before they're written
+
+Every page goes through the validator on its way from the scrape to the store and
+the outputs:
+
+  - rows with wrong types or impossible values - a price outside PRICE_RANGE,
+    a floor area outside SIZE_RANGE, 40 bedrooms, bedrooms on a Site, a listing
+    date in the future - are quarantined: kept out of the store and the outputs
+    and written to data/<source>_quarantine.json with the reasons;
+  - rows that are odd but may be right are flagged in the same file and kept:
+    price ranges ("€1,275,000 to €1,350,000" is stored as its lower bound), and
+    prices or prices per m2 far from their area's - more than OUTLIER_Z robust
+    z-scores (median and MAD of the logs, so one mansion doesn't move them);
+  - at the end of a full run, a run that found far fewer listings than the store
+    holds (VOLUME_DROP) stops before anything is replaced. A site change that
+    breaks half the pages then leaves last week's outputs as they were, rather
+    than publishing half the market. --allow-drop accepts the drop.
+
+Per row the checks are a few comparisons. The area statistics are one sort per
+area at the end, over two floats kept per listing, so this costs next to nothing
+next to the scrape.
+"""
+
+import os
+import json
+import math
+from datetime import date
+
+from schema import TEXT_FIELDS, INT_FIELDS, FLOAT_FIELDS, BOOL_FIELDS, as_dict
+from geo import Gazetteer
+
+PRICE_RANGE = (10000, 50000000)
+SIZE_RANGE = (10, 3000)  # m2
+MAX_ROOMS = 15
+# Land, not homes - bedrooms on one of these are a parsing slip
+LAND_TYPES = ('Site',)
+
+# Robust z-score above which a price or price per m2 is flagged
+OUTLIER_Z = 3.5
+# Areas with fewer priced listings are compared with the whole market
+MIN_AREA_LISTINGS = 8
+# Floor for the MAD of log prices, so an estate of identical houses doesn't flag a 1% difference
+MIN_MAD = 0.05
+# A full run that finds this share fewer listings than the store holds is stopped
+VOLUME_DROP = 0.3
+
+
+class VolumeDropError(Exception):
+    """A full run found far fewer listings than the last one"""
+
+
+def type_problems(listing):
+    found = []
+    for field in TEXT_FIELDS + BOOL_FIELDS:
+        value = getattr(listing, field)
+        if not isinstance(value, str if field in TEXT_FIELDS else bool):
+            found.append(f"{field} is {type(value).__name__}: {value!r}")
+    for field in INT_FIELDS + FLOAT_FIELDS:
+        value = getattr(listing, field)
+        if value is not None and (isinstance(value, bool) or
+                                  not isinstance(value, int if field in INT_FIELDS else (int, float))):
+            found.append(f"{field} is {type(value).__name__}: {value!r}")
+    return found
+
+
+def problems(listing, today=None):
+    """Why a listing can't be used, or [] if it can"""
+    found = type_problems(listing)
+    if found:
+        return found
+    today = today or date.today().isoformat()
+    # 0 or None is no price (POA), which the dashboard already leaves out
+    if listing.price_num and not PRICE_RANGE[0] <= listing.price_num <= PRICE_RANGE[1]:
+        found.append(f"price {listing.price_num} outside {PRICE_RANGE[0]}-{PRICE_RANGE[1]}")
+    if listing.size_sqm is not None and not SIZE_RANGE[0] <= listing.size_sqm <= SIZE_RANGE[1]:
+        found.append(f"size {listing.size_sqm:g} m2 outside {SIZE_RANGE[0]}-{SIZE_RANGE[1]}")
+    for field in ('beds', 'baths'):
+        value = getattr(listing, field)
+        if value is not None and not 0 <= value <= MAX_ROOMS:
+            found.append(f"{value} {field}")
+    if listing.property_type in LAND_TYPES and (listing.beds or listing.baths):
+        found.append(f"{listing.beds or 0} beds / {listing.baths or 0} baths on a {listing.property_type}")
+    if listing.date_listed > today:
+        found.append(f"listed in the future ({listing.date_listed})")
+    if listing.days_on_market is not None and listing.days_on_market < 0:
+        found.append(f"{listing.days_on_market} days on market")
+    return found
+
+
+def median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+def robust_stats(values):
+    """(median, MAD) of a list of numbers"""
+    m = median(values)
+    return m, max(median([abs(v - m) for v in values]), MIN_MAD)
+
+
+class Validator:
+    """Checks one source's listings page by page, and writes what it found at the end"""
+
+    def __init__(self, source, quarantine_path, gazetteer=None):
+        self.source = source
+        self.quarantine_path = quarantine_path
+        self.gazetteer = gazetteer or Gazetteer.load()
+        self.today = date.today().isoformat()
+        self.checked = 0
+        self.quarantined = {}  # listing_id -> {'reasons', 'listing'}
+        self.kept = set()
+        self.flagged = {}  # listing_id -> reasons
+        self.priced = {}  # listing_id -> (url, area, log price, log price per m2 or None)
+
+    def check(self, listings):
+        """A page of listings without the ones that can't be used"""
+        kept = []
+        for listing in listings:
+            self.checked += 1
+            found = problems(listing, self.today)
+            if found:
+                self.quarantined[listing.listing_id] = {'reasons': found, 'listing': as_dict(listing)}
+                continue
+            kept.append(listing)
+            self.kept.add(listing.listing_id)
+            if ' to ' in listing.price.lower():
+                self.flagged[listing.listing_id] = ["price range - stored as its lower bound"]
+            if listing.price_num:
+                area = self.gazetteer.resolve(listing.address, listing.latitude, listing.longitude)[0]
+                pps = math.log(listing.price_num / listing.size_sqm) if listing.size_sqm else None
+                self.priced[listing.listing_id] = (listing.url, area, math.log(listing.price_num), pps)
+        return kept
+
+    def outliers(self):
+        """{listing_id: reasons} for prices and prices per m2 far from their area's"""
+        found = {}
+        for column, label in ((2, 'price'), (3, 'price per m2')):
+            by_area, market = {}, []
+            for row in self.priced.values():
+                if row[column] is not None:
+                    by_area.setdefault(row[1], []).append(row[column])
+                    market.append(row[column])
+            if not market:
+                continue
+            market_stats = robust_stats(market)
+            stats = {area: robust_stats(values) if len(values) >= MIN_AREA_LISTINGS else market_stats
+                     for area, values in by_area.items()}
+            for listing_id, row in self.priced.items():
+                if row[column] is None:
+                    continue
+                m, mad = stats[row[1]]
+                z = 0.6745 * (row[column] - m) / mad
+                if abs(z) > OUTLIER_Z:
+                    found.setdefault(listing_id, []).append(
+                        f"{label} {math.exp(row[column] - m):.2f}x the {row[1]} median (z {z:+.1f})")
+        return found
+
+    def finish(self, previous_count=0, full_run=True, allow_drop=False):
+        """Write the quarantine file; raises VolumeDropError if a full run came up far short"""
+        flagged = dict(self.flagged)
+        for listing_id, reasons in self.outliers().items():
+            flagged[listing_id] = flagged.get(listing_id, []) + reasons
+        kept = len(self.kept)
+        drop = None
+        if full_run and previous_count and kept < previous_count * (1 - VOLUME_DROP):
+            drop = f"{kept} listings against {previous_count} in the store"
+
+        report = {
+            'source': self.source,
+            'checked_at': self.today,
+            'checked': self.checked,
+            'volume_drop': drop,
+            'quarantined': [{'listing_id': k, **v} for k, v in self.quarantined.items()],
+            'flagged': [{'listing_id': k, 'url': self.priced[k][0] if k in self.priced else '', 'reasons': v}
+                        for k, v in sorted(flagged.items())],
+        }
+        with open(self.quarantine_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        os.replace(self.quarantine_path + '.tmp', self.quarantine_path)
+        print(f"✓ Validation: {len(self.quarantined)} quarantined, {len(flagged)} flagged -> {self.quarantine_path}")
+
+        if drop and not allow_drop:
+            raise VolumeDropError(f"{self.source}: only {drop} - outputs left as they were "
+                                  f"(--allow-drop to accept)")
+        return report
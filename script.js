@@ -1,5 +1,7 @@
 let allData = [], filteredData = [], tableData = [], areaStats = {}, globalStats = {};
-let map, markers, priceChart, areaChart, daysChart;
+let aggregates = null;  // data/aggregates.json - charts and map cells for the unfiltered view
+let shardSets = [];  // sharded datasets in use: { manifest, loaded: Set of keys, rows: text -> listings }
+let map, markers, cellLayer, markerMode = null, priceChart, areaChart, daysChart;
 let scrapeTimestamps = { daft: null, myhome: null };
 let compareList = [];
 let currentSort = { key: 'desirability.score', dir: -1 };
@@ -102,6 +104,11 @@ function loadFilters() {
 const BER_COSTS = { A: 800, B: 1200, C: 1600, D: 2000, E: 2500, F: 3000, G: 3500 };
 const AVG_HEATING = 2000;
 
+function daysSince(date) {
+    const listed = Date.parse(date);
+    return isNaN(listed) ? 0 : Math.max(0, Math.floor((Date.now() - listed) / 86400000));
+}
+
 function parseCSV(text, source) {
     const lines = text.trim().split('\n');
     const headers = parseCSVLine(lines[0]);
@@ -110,39 +117,110 @@ function parseCSV(text, source) {
         const values = parseCSVLine(line);
         const obj = {};
         headers.forEach((h, i) => obj[h] = values[i] || '');
+        return normalizeListing(obj, source);
+    });
+}
 
-        // Normalize field names between sources
-        obj.source = source;
-        obj.priceNum = parseInt(obj.price_num) || parseInt(obj.price.replace(/[^0-9]/g, '')) || 0;
-        // Handle "2 Bed" or "2" format
-        obj.bedsNum = parseInt(obj.beds) || 0;
-        obj.sizeNum = parseFloat(obj.size_sqm) || 0;
-        obj.daysNum = parseInt(obj.days_on_market) || 0;
-        // For myhome listings, use BrochureMap coordinates if Location coordinates are 0 or empty
-        if (source === 'myhome') {
-            const lat = parseFloat(obj.latitude) || 0;
-            const lng = parseFloat(obj.longitude) || 0;
-            if (lat === 0 && lng === 0) {
-                obj.lat = parseFloat(obj.brochure_latitude) || 0;
-                obj.lng = parseFloat(obj.brochure_longitude) || 0;
-            } else {
-                obj.lat = lat;
-                obj.lng = lng;
-            }
+// One raw listing (every field a string, as in the CSV) -> the fields the dashboard uses
+function normalizeListing(obj, source) {
+    // Normalize field names between sources
+    obj.source = source;
+    obj.priceNum = parseInt(obj.price_num) || parseInt(obj.price.replace(/[^0-9]/g, '')) || 0;
+    // Handle "2 Bed" or "2" format
+    obj.bedsNum = parseInt(obj.beds) || 0;
+    obj.sizeNum = parseFloat(obj.size_sqm) || 0;
+    // Shards leave days_on_market out - it changes every day
+    obj.daysNum = parseInt(obj.days_on_market) || daysSince(obj.date_listed);
+    // For myhome listings, use BrochureMap coordinates if Location coordinates are 0 or empty
+    if (source === 'myhome') {
+        const lat = parseFloat(obj.latitude) || 0;
+        const lng = parseFloat(obj.longitude) || 0;
+        if (lat === 0 && lng === 0) {
+            obj.lat = parseFloat(obj.brochure_latitude) || 0;
+            obj.lng = parseFloat(obj.brochure_longitude) || 0;
         } else {
-            obj.lat = parseFloat(obj.latitude) || 0;
-            obj.lng = parseFloat(obj.longitude) || 0;
+            obj.lat = lat;
+            obj.lng = lng;
         }
-        obj.pricePerSqm = obj.sizeNum > 0 ? Math.round(obj.priceNum / obj.sizeNum) : 0;
-        obj.area = extractArea(obj.address);
-        obj.heatingCost = obj.ber ? (BER_COSTS[obj.ber[0]] || 2200) : 2200;
-        obj.heatingSaving = AVG_HEATING - obj.heatingCost;
-        obj.inPreferredArea = isPreferredArea(obj.address);
-        // Normalize beds display for table
-        obj.bedsDisplay = obj.bedsNum ? obj.bedsNum + ' bed' : '-';
-
-        return obj;
+    } else {
+        obj.lat = parseFloat(obj.latitude) || 0;
+        obj.lng = parseFloat(obj.longitude) || 0;
+    }
+    obj.pricePerSqm = obj.sizeNum > 0 ? Math.round(obj.priceNum / obj.sizeNum) : 0;
+    obj.area = extractArea(obj.address);
+    obj.heatingCost = obj.ber ? (BER_COSTS[obj.ber[0]] || 2200) : 2200;
+    obj.heatingSaving = AVG_HEATING - obj.heatingCost;
+    obj.inPreferredArea = isPreferredArea(obj.address);
+    // Normalize beds display for table
+    obj.bedsDisplay = obj.bedsNum ? obj.bedsNum + ' bed' : '-';
+
+    return obj;
+}
+
+// Columnar listings file (scrapers/columnar.py) -> raw listings, every value as a string like the CSV
+const COLUMNAR_INTS = { int8: Int8Array, int16: Int16Array, int32: Int32Array };
+const COLUMNAR_CODES = { uint8: Uint8Array, uint16: Uint16Array, uint32: Uint32Array };
+
+function decodeColumnar(buffer) {
+    const bytes = new Uint8Array(buffer);
+    if (String.fromCharCode(...bytes.subarray(0, 4)) !== 'LCOL') throw new Error('Not a columnar listings file');
+    const headerLength = new DataView(buffer).getUint32(4, true);
+    const utf8 = new TextDecoder();
+    const header = JSON.parse(utf8.decode(bytes.subarray(8, 8 + headerLength)));
+    const body = 8 + headerLength;
+    // Buffers are 4-byte aligned from the start of the file, so typed arrays map straight onto them
+    const view = (Type, [start, length]) => new Type(buffer, body + start, length / Type.BYTES_PER_ELEMENT);
+
+    const rows = Array.from({ length: header.rows }, () => ({}));
+    header.columns.forEach(column => {
+        const name = column.name;
+        let get;
+        if (column.type === 'int' || column.type === 'date') {
+            const values = view(COLUMNAR_INTS[column.storage], column.buffers[0]);
+            get = i => values[i] === column.null ? ''
+                : column.type === 'date' ? new Date(values[i] * 86400000).toISOString().slice(0, 10)
+                : String(values[i]);
+        } else if (column.type === 'float32') {
+            const values = view(Float32Array, column.buffers[0]);
+            // float32 -> the shortest decimal that reads back as the same float32
+            get = i => isNaN(values[i]) ? '' : String(parseFloat(values[i].toPrecision(7)));
+        } else if (column.type === 'bool') {
+            const values = view(Uint8Array, column.buffers[0]);
+            get = i => values[i] ? 'True' : 'False';
+        } else if (column.type === 'dict') {
+            const codes = view(COLUMNAR_CODES[column.storage], column.buffers[0]);
+            get = i => codes[i] ? column.dictionary[codes[i] - 1] : '';
+        } else {
+            const ends = view(Uint32Array, column.buffers[0]);
+            const [blobStart, blobLength] = column.buffers[1];
+            const blob = bytes.subarray(body + blobStart, body + blobStart + blobLength);
+            get = i => utf8.decode(blob.subarray(i ? ends[i - 1] : 0, ends[i]));
+        }
+        rows.forEach((row, i) => row[name] = get(i));
     });
+    return rows;
+}
+
+// The columnar file if one was published (gzipped or not), else null
+async function fetchColumnar(source) {
+    for (const file of [`data/${source}_listings.col.gz`, `data/${source}_listings.col`]) {
+        const response = await fetch(file).catch(() => null);
+        if (!response || !response.ok) continue;
+        let buffer = await response.arrayBuffer();
+        const bytes = new Uint8Array(buffer);
+        // Served as-is rather than with Content-Encoding, so still gzipped here
+        if (bytes[0] === 0x1f && bytes[1] === 0x8b) {
+            if (typeof DecompressionStream === 'undefined') continue;
+            const stream = new Blob([buffer]).stream().pipeThrough(new DecompressionStream('gzip'));
+            buffer = await new Response(stream).arrayBuffer();
+        }
+        try {
+            return decodeColumnar(buffer);
+        } catch (e) {
+            console.warn(`${file}:`, e.message);
+        }
+    }
+    return null;
 }
 
 // Preferred areas (South Dublin / North Wicklow coast)
@@ -210,34 +288,144 @@ function updateTimestampDisplay() {
     }
 }
 
+function fetchJSON(url) {
+    return fetch(url).then(r => r.ok ? r.json() : null).catch(() => null);
+}
+
 async function loadData() {
     showLoading(true);
     try {
         // Load timestamps
         await loadTimestamps();
-        
-        // Load both data sources in parallel
-        const [daftResponse, myhomeResponse] = await Promise.all([
-            fetch('data/daft_listings.csv'),
-            fetch('data/myhome_listings.csv').catch(() => null)
-        ]);
+        // Saved filters first - they decide which shards are fetched
+        loadFilters();
+
+        // Scores and area stats precomputed at scrape time (scrapers/enrich.py), split by area
+        const manifest = await fetchJSON('data/dashboard_manifest.json');
+        const precomputed = manifest ? null : await fetchJSON('data/dashboard.json');
+        if (manifest || precomputed) {
+            if (manifest) {
+                areaStats = manifest.areas;
+                globalStats = { medianDays: manifest.medianDays };
+                shardSets = [{ manifest, loaded: new Set(),
+                               rows: text => JSON.parse(text).map(row => precomputedListing(manifest.fields, row)) }];
+                await loadMissingShards();
+            } else {
+                loadPrecomputed(precomputed);
+            }
+            // Aggregated from the same run (scrapers/aggregate.py) - ignore a stale one
+            const agg = await fetchJSON('data/aggregates.json');
+            aggregates = agg && agg.generated_at === (manifest || precomputed).generated_at ? agg : null;
+        } else {
+            await loadFromCSV();
+        }
+
+    filteredData = [...allData];
+    initDashboard();
+    applyFilters();
+    showLoading(false);
+    } catch (error) {
+        showLoading(false);
+        showError('Unable to load property data. Please refresh the page to try again.');
+        console.error('Data load error:', error);
+    }
+}
 
-        if (!daftResponse.ok) throw new Error('Failed to load Daft data');
+const BADGE_LABELS = { ftb: 'Starter home', negotiate: 'Negotiable', gem: 'Below market' };
 
-        // Parse Daft data
-        const daftText = await daftResponse.text();
-        const daftData = parseCSV(daftText, 'daft');
+function precomputedListing(fields, row) {
+    const d = {};
+    for (let i = 0; i < fields.length; i++) d[fields[i]] = row[i];
+    const [demand, value, ber, type] = d.parts;
+    d.desirability = { score: d.score, level: d.level, breakdown: scoreBreakdown(d, { demand, value, ber, type }) };
+    d.badges = d.badges.map(type => ({ type, label: BADGE_LABELS[type] }));
+    d.bedsDisplay = d.bedsNum ? d.bedsNum + ' bed' : '-';
+    return d;
+}
 
-        // Parse MyHome data if available
-        let myhomeData = [];
-        if (myhomeResponse && myhomeResponse.ok) {
-            const myhomeText = await myhomeResponse.text();
-            myhomeData = parseCSV(myhomeText, 'myhome');
-        }
+function loadPrecomputed(dataset) {
+    areaStats = dataset.areas;
+    globalStats = { medianDays: dataset.medianDays };
+    allData = dataset.listings.rows.map(row => precomputedListing(dataset.listings.fields, row));
+}
 
-        // Combine both sources
-        allData = [...daftData, ...myhomeData].filter(d => d.priceNum > 0);
+// Content-hashed shards (scrapers/enrich.py, or scrapers/outputs.py --shard-by) - a
+// shard's name changes only when its listings do, so the browser can cache them for
+// good. keys picks which shards to fetch (all of them by default).
+async function loadShards(manifest, keys, rows) {
+    const shards = manifest.shards.filter(s => !keys || keys.includes(s.key));
+    const texts = await Promise.all(shards.map(s =>
+        fetch('data/' + s.file).then(r => {
+            if (!r.ok) throw new Error(`Failed to load ${s.file}`);
+            return r.text();
+        })));
+    return texts.flatMap(rows || (text => parseCSV(text, manifest.source)));
+}
 
+// The shards that can hold listings the filters let through. Dashboard shards say
+// which sources they hold and whether they have a preferred-area listing; shards
+// of either kind have their lowest price.
+function shardKeys(manifest) {
+    const source = document.getElementById('filterSource').value;
+    const preferred = document.getElementById('filterArea').value === 'preferred';
+    const maxPrice = parseInt(document.getElementById('filterPrice').value) || 0;
+    if (source && manifest.source && manifest.source !== source) return [];
+    return manifest.shards.filter(s =>
+        (!source || !s.sources || s.sources.includes(source)) &&
+        (!preferred || s.preferred !== false) &&
+        (!maxPrice || s.min_price == null || s.min_price <= maxPrice)
+    ).map(s => s.key);
+}
+
+function allShardsLoaded() {
+    return shardSets.every(set => set.loaded.size === set.manifest.shards.length);
+}
+
+// Fetch the shards the current filters need that aren't loaded yet - false if there were none
+async function loadMissingShards() {
+    const wanted = shardSets.map(set => shardKeys(set.manifest).filter(k => !set.loaded.has(k)));
+    if (!wanted.some(keys => keys.length)) return false;
+    const loaded = await Promise.all(shardSets.map((set, i) =>
+        wanted[i].length ? loadShards(set.manifest, wanted[i], set.rows) : []));
+    shardSets.forEach((set, i) => wanted[i].forEach(k => set.loaded.add(k)));
+    allData = allData.concat(...loaded);
+    return true;
+}
+
+// One source's listings: the columnar file if one was published - a fraction of even
+// the CSV shards' size, with no parsing - else its CSV shards, else the whole CSV
+async function loadSource(source) {
+    const columnar = await fetchColumnar(source);
+    if (columnar) return columnar.map(row => normalizeListing(row, source));
+    const manifest = await fetchJSON(`data/${source}_manifest.json`);
+    if (manifest) {
+        const set = { manifest, loaded: new Set(shardKeys(manifest)) };
+        shardSets.push(set);
+        return loadShards(manifest, [...set.loaded]);
+    }
+    const response = await fetch(`data/${source}_listings.csv`).catch(() => null);
+    if (!response || !response.ok) return null;
+    return parseCSV(await response.text(), source);
+}
+
+// Fallback when dashboard.json hasn't been generated - same scoring, done in the browser
+async function loadFromCSV() {
+    // Load both data sources in parallel
+    const [daftData, myhomeData] = await Promise.all([
+        loadSource('daft'),
+        loadSource('myhome').catch(() => null)
+    ]);
+
+    if (!daftData) throw new Error('Failed to load Daft data');
+
+    // Combine both sources
+    allData = [...daftData, ...(myhomeData || [])];
+    scoreInBrowser();
+}
+
+// Area stats and scores over whatever is loaded - redone when more CSV shards come in
+function scoreInBrowser() {
+    allData = allData.filter(d => d.priceNum > 0);
     areaStats = {};
     allData.forEach(d => {
         if (!areaStats[d.area]) areaStats[d.area] = { days: [], pps: [], prices: [], count: 0, types: {} };
@@ -258,6 +446,7 @@ async function loadData() {
 
     Object.keys(areaStats).forEach(area => {
         const s = areaStats[area];
+        s.daysCount = s.days.length;
         s.avgDays = s.days.length ? s.days.reduce((a,b) => a+b, 0) / s.days.length : medianDays;
         s.avgPPS = s.pps.length ? s.pps.reduce((a,b) => a+b, 0) / s.pps.length : 0;
         s.avgPrice = s.prices.reduce((a,b) => a+b, 0) / s.prices.length;
@@ -275,51 +464,43 @@ async function loadData() {
         d.badges = calcBadges(d);
         d.ppsPercentile = calcPercentile(d.pricePerSqm, allPPS);
     });
-
-    filteredData = [...allData];
-    initDashboard();
-    loadFilters();
-    applyFilters();
-    showLoading(false);
-    } catch (error) {
-        showLoading(false);
-        showError('Unable to load property data. Please refresh the page to try again.');
-        console.error('Data load error:', error);
-    }
 }
 
 function calcDesirability(d) {
-    let score = 0;
-    let breakdown = {};
     const area = areaStats[d.area] || {};
+    const parts = {};
 
-    const demandScore = area.demandScore || 50;
-    score += demandScore * 0.40;
-    breakdown.demand = { value: Math.round(demandScore), weight: 40, label: 'Area Demand', desc: area.avgDays ? 'Avg ' + Math.round(area.avgDays) + ' days to sell' : 'Unknown' };
+    parts.demand = area.demandScore || 50;
 
-    let valueScore = 50;
+    parts.value = 50;
     if (d.pricePerSqm > 0 && area.avgPPS > 0) {
         const r = d.pricePerSqm / area.avgPPS;
-        valueScore = r < 0.8 ? 100 : r < 0.95 ? 75 : r < 1.1 ? 50 : 25;
+        parts.value = r < 0.8 ? 100 : r < 0.95 ? 75 : r < 1.1 ? 50 : 25;
     }
-    score += valueScore * 0.25;
-    breakdown.value = { value: valueScore, weight: 25, label: 'Value for Area', desc: area.avgPPS ? 'Area avg ' + area.avgPPS.toLocaleString() + '/m2' : 'Unknown' };
 
     const berScores = { A: 100, B: 80, C: 60, D: 40, E: 25, F: 15, G: 10 };
-    const berScore = d.ber ? (berScores[d.ber[0]] || 30) : 30;
-    score += berScore * 0.20;
-    breakdown.ber = { value: berScore, weight: 20, label: 'Energy Efficiency', desc: d.ber ? 'BER ' + d.ber + ' = ~€' + d.heatingCost + '/yr heating' : 'No BER rating' };
+    parts.ber = d.ber ? (berScores[d.ber[0]] || 30) : 30;
 
     const typeScores = { Detached: 100, 'Semi-D': 85, Semi: 85, Bungalow: 80, Terrace: 70, End: 75 };
-    let typeScore = 60;
+    parts.type = 60;
     for (const [t, p] of Object.entries(typeScores)) {
-        if (d.property_type && d.property_type.includes(t)) { typeScore = p; break; }
+        if (d.property_type && d.property_type.includes(t)) { parts.type = p; break; }
     }
-    score += typeScore * 0.15;
-    breakdown.type = { value: typeScore, weight: 15, label: 'Property Type', desc: d.property_type || 'Unknown type' };
 
+    const score = parts.demand * 0.40 + parts.value * 0.25 + parts.ber * 0.20 + parts.type * 0.15;
     const level = score >= 70 ? 'hot' : score >= 50 ? 'warm' : 'cool';
-    return { score: Math.round(score), level, breakdown };
+    parts.demand = Math.round(parts.demand);
+    return { score: Math.round(score), level, breakdown: scoreBreakdown(d, parts) };
+}
+
+function scoreBreakdown(d, parts) {
+    const area = areaStats[d.area] || {};
+    return {
+        demand: { value: parts.demand, weight: 40, label: 'Area Demand', desc: area.avgDays ? 'Avg ' + Math.round(area.avgDays) + ' days to sell' : 'Unknown' },
+        value: { value: parts.value, weight: 25, label: 'Value for Area', desc: area.avgPPS ? 'Area avg ' + area.avgPPS.toLocaleString() + '/m2' : 'Unknown' },
+        ber: { value: parts.ber, weight: 20, label: 'Energy Efficiency', desc: d.ber ? 'BER ' + d.ber + ' = ~€' + d.heatingCost + '/yr heating' : 'No BER rating' },
+        type: { value: parts.type, weight: 15, label: 'Property Type', desc: d.property_type || 'Unknown type' }
+    };
 }
 
 function calcBadges(d) {
@@ -328,17 +509,17 @@ function calcBadges(d) {
 
     // Under 500k, 3+ bed, good BER, decent size - ideal starter home
     if (d.priceNum <= 500000 && d.bedsNum >= 3 && d.ber && 'ABC'.includes(d.ber[0]) && d.sizeNum >= 80) {
-        badges.push({ type: 'ftb', label: 'Starter home' });
+        badges.push({ type: 'ftb', label: BADGE_LABELS.ftb });
     }
 
     // Been on market a while - room to negotiate
     if (d.daysNum >= 90) {
-        badges.push({ type: 'negotiate', label: 'Negotiable' });
+        badges.push({ type: 'negotiate', label: BADGE_LABELS.negotiate });
     }
 
     // Large property, priced well below area average
     if (d.sizeNum >= 100 && area.avgPPS && d.pricePerSqm < area.avgPPS * 0.85 && area.tier !== 'premium') {
-        badges.push({ type: 'gem', label: 'Below market' });
+        badges.push({ type: 'gem', label: BADGE_LABELS.gem });
     }
 
     return badges;
@@ -361,11 +542,26 @@ function parseCSVLine(line) {
     r.push(c.trim()); return r;
 }
 
+// Same rule as fallback_area in scrapers/geo.py: the second-to-last address part, district
+// dropped, passing over street lines ("230 Drumnigh Manor") and counties
+const NOT_AREAS = ['co dublin', 'county dublin', 'dublin', 'ireland', 'co wicklow', 'co kildare', 'co meath'];
+const STREET_WORDS = new Set(['road', 'rd', 'street', 'st', 'avenue', 'ave', 'park', 'drive', 'lane', 'court',
+    'grove', 'close', 'crescent', 'gardens', 'green', 'square', 'terrace', 'way', 'view', 'place', 'hill',
+    'heights', 'lawn', 'lawns', 'rise', 'walk', 'wood', 'woods', 'manor', 'village', 'upper', 'lower', 'cottages']);
+
+function couldBeArea(part) {
+    const words = part.normalize('NFKD').replace(/[\u0300-\u036f']/g, '').toLowerCase().match(/[a-z0-9]+/g);
+    if (!words) return false;
+    const key = words.join(' ');
+    return !NOT_AREAS.includes(key) && !/\d/.test(key) && !STREET_WORDS.has(words[words.length - 1]);
+}
+
 function extractArea(addr) {
-    const p = addr.split(',');
-    if (p.length >= 2) {
-        let a = p[p.length - 2].trim().replace(/Dublin \d+/gi, '').trim();
-        return a || p[p.length - 2].trim();
+    const parts = addr.split(',').map(p => p.trim());
+    for (let i = parts.length - 2; i >= 0; i--) {
+        const area = parts[i].replace(/\bDublin \d+W?\b/gi, '').trim();
+        if (!area && parts[i]) return parts[i];
+        if (couldBeArea(area)) return area;
     }
     return 'Dublin';
 }
@@ -427,7 +623,7 @@ function genInsights() {
     c.textContent = '';
 
     const topAreas = Object.entries(areaStats)
-        .filter(([_,v]) => v.days.length >= 3)
+        .filter(([_,v]) => v.daysCount >= 3)
         .sort((a,b) => b[1].demandScore - a[1].demandScore)
         .slice(0, 3)
         .map(([a]) => a);
@@ -495,6 +691,10 @@ function showAreaInsights(area) {
         { label: 'Avg Days Listed', value: Math.round(s.avgDays) + ' days' },
         { label: 'Properties', value: s.count, tier: s.tier, tierLabel: tierLabels[s.tier] }
     ];
+    const summary = aggregates && aggregates.areas[area];
+    if (summary && summary.ppsQuantiles) {
+        stats.splice(2, 0, { label: 'Median €/m²', value: '€' + summary.ppsQuantiles[2].toLocaleString() });
+    }
 
     stats.forEach(stat => {
         const div = document.createElement('div');
@@ -528,6 +728,20 @@ function toggleAreaInsights() {
     grid.style.display = grid.style.display === 'none' ? 'grid' : 'none';
 }
 
+// True when nothing is filtered out, so the precomputed aggregates describe what's shown
+function showingEverything() {
+    return !!aggregates && allShardsLoaded() && filteredData.length === allData.length;
+}
+
+// The precomputed map cells for the current zoom, or null to draw individual markers
+function mapCells() {
+    if (!showingEverything()) return null;
+    const zooms = Object.keys(aggregates.cells).map(Number);
+    const zoom = map.getZoom();
+    if (zoom > Math.max.apply(null, zooms)) return null;
+    return aggregates.cells[String(Math.max(zoom, Math.min.apply(null, zooms)))];
+}
+
 function initMap() {
     map = L.map('map').setView([53.33, -6.26], 11);
     L.tileLayer('https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png', {
@@ -544,18 +758,21 @@ function initMap() {
         }
     });
 
+    cellLayer = L.layerGroup();
+    map.on('zoomend', renderMapMarkers);
     updateMapMarkers();
-    map.addLayer(markers);
 }
 
 function updateMapMarkers() {
     if (!markers) return;
-    markers.clearLayers();
+    markerMode = null;  // the filtered set changed - rebuild whatever is drawn
 
     // Center map based on filter
     var areaFilter = document.getElementById('filterArea').value;
     if (areaFilter === 'preferred') {
         map.setView([53.27, -6.12], 12);
+    } else if (showingEverything() && aggregates.bounds) {
+        map.fitBounds(aggregates.bounds, { padding: [20, 20] });
     } else if (filteredData.length > 0) {
         // Fit to bounds of filtered data
         var lats = filteredData.filter(function(d) { return d.lat; }).map(function(d) { return d.lat; });
@@ -567,6 +784,48 @@ function updateMapMarkers() {
     } else {
         map.setView([53.33, -6.26], 11);
     }
+    renderMapMarkers();
+}
+
+// One bubble per precomputed cell, coloured by the cell's most common score level
+function addMapCell(row) {
+    const f = aggregates.cellFields;
+    const cell = {};
+    for (let i = 0; i < f.length; i++) cell[f[i]] = row[i];
+    const colors = { hot: '#EF4444', warm: '#F97316', cool: '#3B82F6' };
+    const level = cell.hot >= cell.warm && cell.hot >= cell.cool ? 'hot' : cell.warm >= cell.cool ? 'warm' : 'cool';
+    const size = Math.min(48, 24 + Math.round(Math.sqrt(cell.count) * 2));
+    const m = L.marker([cell.lat, cell.lng], {
+        icon: L.divIcon({
+            html: '<div style="background:' + colors[level] + ';color:white;border-radius:50%;width:' + size + 'px;height:' + size + 'px;display:flex;align-items:center;justify-content:center;font:600 12px Outfit,sans-serif;box-shadow:0 2px 8px rgba(0,0,0,0.2);">' + cell.count + '</div>',
+            className: '',
+            iconSize: [size, size]
+        })
+    });
+    m.bindTooltip(cell.count + (cell.count === 1 ? ' listing' : ' listings') + ' - median ' + formatPrice(cell.medianPrice));
+    m.on('click', function() { map.setView([cell.lat, cell.lng], map.getZoom() + 2); });
+    cellLayer.addLayer(m);
+}
+
+function renderMapMarkers() {
+    if (!markers) return;
+    const cells = mapCells();
+    if (cells) {
+        // Unfiltered and zoomed out: draw the precomputed cells, not thousands of markers
+        if (map.hasLayer(markers)) map.removeLayer(markers);
+        markers.clearLayers();
+        cellLayer.clearLayers();
+        cells.forEach(addMapCell);
+        if (!map.hasLayer(cellLayer)) map.addLayer(cellLayer);
+        markerMode = 'cells';
+        return;
+    }
+    if (map.hasLayer(cellLayer)) map.removeLayer(cellLayer);
+    if (!map.hasLayer(markers)) map.addLayer(markers);
+    if (markerMode === 'points') return;
+    markerMode = 'points';
+    markers.clearLayers();
+
     filteredData.forEach(d => {
         if (d.lat && d.lng) {
             const colors = { hot: '#EF4444', warm: '#F97316', cool: '#3B82F6' };
@@ -582,6 +841,17 @@ function updateMapMarkers() {
             const popup = document.createElement('div');
             popup.style.cssText = 'font-size:13px;min-width:200px;';
 
+            if (d.thumb) {
+                // Cached WebP thumbnail (scrapers/thumbs.py), only fetched once the popup opens
+                const img = document.createElement('img');
+                img.width = 240;
+                img.height = 160;
+                img.alt = '';
+                img.style.cssText = 'display:block;border-radius:4px;margin-bottom:8px;';
+                popup.appendChild(img);
+                m.on('popupopen', () => { if (!img.src) img.src = 'data/' + d.thumb; });
+            }
+
             const addrDiv = document.createElement('div');
             addrDiv.style.cssText = 'font-weight:600;margin-bottom:8px;';
             addrDiv.textContent = d.address.substring(0, 45) + (d.address.length > 45 ? '...' : '');
@@ -633,6 +903,13 @@ function updateMapMarkers() {
                 popup.appendChild(badgeDiv);
             }
 
+            if (d.located === 'approx') {
+                const approxDiv = document.createElement('div');
+                approxDiv.style.cssText = 'color:#7a7067;font-size:11px;margin-bottom:8px;';
+                approxDiv.textContent = 'Approximate position - centre of ' + d.area;
+                popup.appendChild(approxDiv);
+            }
+
             const link = document.createElement('a');
             link.href = d.url;
             link.target = '_blank';
@@ -646,6 +923,29 @@ function updateMapMarkers() {
     });
 }
 
+// Top 8 areas by demand among the filtered listings
+function filteredAreaDemand() {
+    const filteredAreaStats = {};
+    filteredData.forEach(function(d) {
+        if (!filteredAreaStats[d.area]) filteredAreaStats[d.area] = { days: [], count: 0 };
+        filteredAreaStats[d.area].count++;
+        if (d.daysNum > 0) filteredAreaStats[d.area].days.push(d.daysNum);
+    });
+
+    const filteredDays = filteredData.filter(function(d) { return d.daysNum > 0; }).map(function(d) { return d.daysNum; });
+    const filteredMedianDays = filteredDays.length ? filteredDays.sort(function(a,b) { return a-b; })[Math.floor(filteredDays.length / 2)] : 60;
+
+    return Object.entries(filteredAreaStats)
+        .filter(function(e) { return e[1].days.length >= 3; })
+        .map(function(e) {
+            var avgDays = e[1].days.reduce(function(a,b) { return a+b; }, 0) / e[1].days.length;
+            var demand = Math.max(0, Math.min(100, 100 - (avgDays / filteredMedianDays * 50)));
+            return { area: e[0], demand: Math.round(demand) };
+        })
+        .sort(function(a, b) { return b.demand - a.demand; })
+        .slice(0, 8);
+}
+
 function initCharts() {
     Chart.defaults.font.family = "'Outfit', sans-serif";
     Chart.defaults.font.size = 11;
@@ -653,8 +953,10 @@ function initCharts() {
 
     const priceBuckets = [0, 300, 400, 500, 600, 700, 800, 1000, 1500, 2000, 10000];
     const priceLabels = ['<300k', '300-400k', '400-500k', '500-600k', '600-700k', '700-800k', '800k-1M', '1-1.5M', '1.5-2M', '2M+'];
-    const priceCounts = new Array(10).fill(0);
-    filteredData.forEach(d => {
+    // Unfiltered, the buckets come precomputed (scrapers/aggregate.py)
+    const everything = showingEverything();
+    const priceCounts = everything ? aggregates.charts.price.slice() : new Array(10).fill(0);
+    if (!everything) filteredData.forEach(d => {
         const pk = d.priceNum / 1000;
         for (let i = 0; i < 10; i++) {
             if (pk >= priceBuckets[i] && pk < priceBuckets[i + 1]) { priceCounts[i]++; break; }
@@ -684,26 +986,8 @@ function initCharts() {
         }
     });
 
-    // Calculate area stats from filtered data
-    const filteredAreaStats = {};
-    filteredData.forEach(function(d) {
-        if (!filteredAreaStats[d.area]) filteredAreaStats[d.area] = { days: [], count: 0 };
-        filteredAreaStats[d.area].count++;
-        if (d.daysNum > 0) filteredAreaStats[d.area].days.push(d.daysNum);
-    });
-
-    const filteredDays = filteredData.filter(function(d) { return d.daysNum > 0; }).map(function(d) { return d.daysNum; });
-    const filteredMedianDays = filteredDays.length ? filteredDays.sort(function(a,b) { return a-b; })[Math.floor(filteredDays.length / 2)] : 60;
-
-    const areaData = Object.entries(filteredAreaStats)
-        .filter(function(e) { return e[1].days.length >= 3; })
-        .map(function(e) {
-            var avgDays = e[1].days.reduce(function(a,b) { return a+b; }, 0) / e[1].days.length;
-            var demand = Math.max(0, Math.min(100, 100 - (avgDays / filteredMedianDays * 50)));
-            return { area: e[0].length > 14 ? e[0].substring(0, 14) + '...' : e[0], demand: Math.round(demand) };
-        })
-        .sort(function(a, b) { return b.demand - a.demand; })
-        .slice(0, 8);
+    const areaData = (everything ? aggregates.charts.areaDemand : filteredAreaDemand())
+        .map(function(a) { return { area: a.area.length > 14 ? a.area.substring(0, 14) + '...' : a.area, demand: a.demand }; });
 
     if (areaChart) areaChart.destroy();
     areaChart = new Chart(document.getElementById('areaChart'), {
@@ -731,8 +1015,8 @@ function initCharts() {
 
     const daysBuckets = [0, 7, 30, 60, 90, 180, 365, 9999];
     const daysLabels = ['<7d', '7-30d', '30-60d', '60-90d', '90-180d', '180-365d', '1yr+'];
-    const daysCounts = new Array(7).fill(0);
-    filteredData.forEach(d => {
+    const daysCounts = everything ? aggregates.charts.days.slice() : new Array(7).fill(0);
+    if (!everything) filteredData.forEach(d => {
         for (let i = 0; i < 7; i++) {
             if (d.daysNum >= daysBuckets[i] && d.daysNum < daysBuckets[i + 1]) { daysCounts[i]++; break; }
         }
@@ -1130,6 +1414,21 @@ function clearCompare() {
 }
 
 function applyFilters() {
+    // A filter that reaches past the loaded shards fetches the rest first
+    if (shardSets.some(set => shardKeys(set.manifest).some(k => !set.loaded.has(k)))) {
+        showLoading(true);
+        loadMissingShards().then(() => {
+            // CSV shards are scored in the browser, over everything loaded
+            if (!shardSets[0].rows) scoreInBrowser();
+            showLoading(false);
+            applyFilters();
+        }).catch(error => {
+            showLoading(false);
+            showError('Unable to load property data. Please refresh the page to try again.');
+            console.error('Shard load error:', error);
+        });
+        return;
+    }
     const loc = document.getElementById('filterLocation').value.toLowerCase();
     const areaFilter = document.getElementById('filterArea').value;
     const sourceFilter = document.getElementById('filterSource').value;
@@ -163,6 +163,59 @@ test('MyHome listing IDs are unique', () => {
     assertEqual(unique.size, ids.length, `Found ${ids.length - unique.size} duplicates`);
 });
 
+// --- Precomputed Dashboard Data ---
+console.log('\n--- Precomputed Data ---');
+
+const dashboardPath = path.join(__dirname, 'data/dashboard.json');
+if (fs.existsSync(dashboardPath)) {
+    const dashboard = JSON.parse(fs.readFileSync(dashboardPath, 'utf8'));
+
+    test('dashboard.json rows match its field list', () => {
+        const width = dashboard.listings.fields.length;
+        const bad = dashboard.listings.rows.filter(r => r.length !== width).length;
+        assertEqual(bad, 0, `${bad} rows have the wrong number of columns`);
+    });
+
+    test('dashboard.json has area stats for every listing', () => {
+        const areaCol = dashboard.listings.fields.indexOf('area');
+        const missing = dashboard.listings.rows.filter(r => !(r[areaCol] in dashboard.areas)).length;
+        assertEqual(missing, 0, `${missing} listings have no area stats`);
+    });
+
+    const aggregatesPath = path.join(__dirname, 'data/aggregates.json');
+    if (fs.existsSync(aggregatesPath)) {
+        const aggregates = JSON.parse(fs.readFileSync(aggregatesPath, 'utf8'));
+        const col = name => dashboard.listings.fields.indexOf(name);
+        const rows = dashboard.listings.rows;
+
+        test('aggregates.json is from the same run as dashboard.json', () => {
+            assertEqual(aggregates.generated_at, dashboard.generated_at);
+            assertEqual(aggregates.listings, rows.length);
+        });
+
+        test('aggregates.json price buckets match the listings', () => {
+            const buckets = [0, 300, 400, 500, 600, 700, 800, 1000, 1500, 2000, 10000];
+            const counts = new Array(10).fill(0);
+            rows.forEach(r => {
+                const pk = r[col('priceNum')] / 1000;
+                for (let i = 0; i < 10; i++) {
+                    if (pk >= buckets[i] && pk < buckets[i + 1]) { counts[i]++; break; }
+                }
+            });
+            assertEqual(aggregates.charts.price.join(), counts.join());
+        });
+
+        test('aggregates.json map cells cover every listing with a position at each zoom', () => {
+            const located = rows.filter(r => r[col('lat')] && r[col('lng')]).length;
+            const countCol = aggregates.cellFields.indexOf('count');
+            Object.entries(aggregates.cells).forEach(([zoom, cells]) => {
+                const total = cells.reduce((sum, c) => sum + c[countCol], 0);
+                assertEqual(total, located, `zoom ${zoom}: ${total} of ${located} listings in cells`);
+            });
+        });
+    }
+}
+
 // --- HTML Validation Tests ---
 console.log('\n--- HTML Validation ---');
 
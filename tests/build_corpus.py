@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Build the offline extraction corpus used by the tests
+
+    python tests/build_corpus.py                  # rebuild the generated pages
+    python tests/build_corpus.py --record URL     # save a live page's payload
+    python tests/build_corpus.py --update-golden  # accept the current parser output
+
+Generated pages are the decoded __NEXT_DATA__ / ng-state blobs that the
+extractors read. Daft pages are rebuilt from data/daft_listings.json in
+Daft's payload shape; MyHome pages start from the real result in
+myhome_sample.json with each listing's values swapped in. A few edge cases
+(apartments, price ranges, POA, unpinned locations, missing IDs) are mixed in.
+Recorded pages (recorded_*.json.gz) are real payloads and are never regenerated.
+
+--update-golden rewrites the expected outputs - only run it after checking
+that a change in the parser output is intended.
+"""
+
+import sys
+import copy
+import gzip
+import json
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+ROOT = Path(__file__).parent.parent
+CORPUS = Path(__file__).parent / "corpus"
+sys.path.insert(0, str(ROOT / "scrapers"))
+
+from daft_scraper import parse_next_data, USER_AGENTS  # noqa: E402
+from myhome_scraper import parse_ng_state  # noqa: E402
+from schema import as_dict  # noqa: E402
+from store import VOLATILE_FIELDS  # noqa: E402
+
+PAGES = 10
+PAGE_SIZE = 20
+MYHOME_SEARCH_KEY = 'SEARCH_RESOLVER:/residential/dublin/property-for-sale?page={page}'
+
+
+def save(path, data):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def load(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def daft_item(row):
+    lat, lng = row.get('latitude'), row.get('longitude')
+    listing = {
+        'id': int(row['listing_id']),
+        'title': row['address'],
+        'seoFriendlyPath': row['url'].replace('https://www.daft.ie', ''),
+        'price': row['price'],
+        'abbreviatedPrice': row['price'].replace(',000', 'k'),
+        'numBedrooms': row['beds'],
+        'numBathrooms': row['baths'],
+        'propertyType': row['property_type'],
+        'sections': ['Property', 'House', row['property_type']],
+        'saleType': ['For Sale'],
+        'featuredLevel': 'STANDARD',
+        'media': {'images': [{'size720x480': row['image_url']}] if row['image_url'] else [],
+                  'totalImages': 1 if row['image_url'] else 0, 'hasVideo': False},
+        'seller': {'name': row['agent'], 'branch': row['agent_branch'], 'sellerType': 'BRANDED_AGENT'},
+    }
+    if lat and lng:
+        listing['point'] = {'type': 'Point', 'coordinates': [float(lng), float(lat)]}
+    if row['size_sqm']:
+        listing['floorArea'] = {'unit': 'METRES_SQUARED', 'value': row['size_sqm']}
+    if row['ber']:
+        listing['ber'] = {'rating': row['ber']}
+    if row['date_listed']:
+        listing['publishDate'] = int(datetime.fromisoformat(row['date_listed'] + 'T12:00').timestamp() * 1000)
+    return {'listing': listing, 'savedAd': False}
+
+
+def daft_pages(rows):
+    items = [daft_item(row) for row in rows[:PAGES * PAGE_SIZE]]
+    # Edge cases: POA, a price range, no coordinates, no ID
+    items[3]['listing']['price'] = 'Price on Application'
+    items[7]['listing']['price'] = '€1,275,000 to €1,350,000'
+    items[11]['listing'].pop('point', None)
+    del items[15]['listing']['id']
+
+    total_results = len(rows)
+    return [{'props': {'pageProps': {
+        'listings': items[i:i + PAGE_SIZE],
+        'paging': {'totalResults': total_results, 'totalPages': -(-total_results // PAGE_SIZE),
+                   'currentPage': i // PAGE_SIZE + 1, 'pageSize': PAGE_SIZE},
+    }}, 'page': '/property-for-sale/[...searchLocation]'} for i in range(0, len(items), PAGE_SIZE)]
+
+
+def myhome_item(sample, row):
+    item = copy.deepcopy(sample)
+    lat, lng = row.get('latitude') or 0, row.get('longitude') or 0
+    item.update({
+        'PropertyId': int(row['listing_id']),
+        'id': int(row['listing_id']),
+        'DisplayAddress': row['address'],
+        'PriceAsString': row['price'],
+        'NumberOfBeds': row['beds'],
+        'NumberOfBathrooms': row['baths'],
+        'SizeStringMeters': row['size_sqm'],
+        'PropertyType': row['property_type'],
+        'BerRating': row['ber'],
+        'Location': {'lat': float(lat), 'lon': float(lng)},
+        'BrochureMap': {'latitude': float(row.get('brochure_latitude') or 0),
+                        'longitude': float(row.get('brochure_longitude') or 0)},
+        'BrochureUrl': row['url'].replace('https://www.myhome.ie', ''),
+        'GroupName': row['agent'],
+        'IsNew': row['is_new'],
+        'IsSaleAgreed': row['is_sale_agreed'],
+    })
+    if row['date_listed']:
+        item['CreatedOnDate'] = row['date_listed'] + 'T11:29:24.5500000+00:00'
+    return item
+
+
+def myhome_pages(rows, sample):
+    items = [myhome_item(sample, row) for row in rows[:PAGES * PAGE_SIZE]]
+    # Edge cases: an apartment (skipped), a range, POA, no ID, the untouched real sample
+    items[2]['PropertyType'] = 'Apartment'
+    items[5]['PriceAsString'] = '€1,275,000 to €1,350,000'
+    items[9]['PriceAsString'] = 'POA'
+    items[13]['PropertyId'] = None
+    items[17] = copy.deepcopy(sample)
+
+    result_count = len(rows)
+    return [{MYHOME_SEARCH_KEY.format(page=i // PAGE_SIZE + 1): {
+        'ResultCount': result_count, 'PageSize': PAGE_SIZE,
+        'SearchResults': items[i:i + PAGE_SIZE],
+    }} for i in range(0, len(items), PAGE_SIZE)]
+
+
+def build():
+    with open(ROOT / "data/daft_listings.json", encoding='utf-8') as f:
+        daft_rows = json.load(f)['listings']
+    with open(ROOT / "data/myhome_listings.json", encoding='utf-8') as f:
+        myhome_rows = json.load(f)['listings']
+    with open(ROOT / "myhome_sample.json", encoding='utf-8') as f:
+        sample = json.load(f)
+
+    for n, page in enumerate(daft_pages(daft_rows), 1):
+        save(CORPUS / f"daft/page_{n:03d}.json.gz", page)
+    for n, page in enumerate(myhome_pages(myhome_rows, sample), 1):
+        save(CORPUS / f"myhome/page_{n:03d}.json.gz", page)
+    print(f"✓ Corpus: {PAGES} Daft + {PAGES} MyHome pages -> {CORPUS}")
+
+
+def record(url):
+    from fetch import HttpBackend
+
+    source = 'daft' if 'daft.ie' in url else 'myhome'
+    script_id = '__NEXT_DATA__' if source == 'daft' else 'ng-state'
+    backend = HttpBackend(USER_AGENTS[0])
+    try:
+        data = backend.fetch_json(url, script_id)
+    finally:
+        backend.close()
+    n = len(list((CORPUS / source).glob('recorded_*.json.gz'))) + 1
+    path = CORPUS / f"{source}/recorded_{n:03d}.json.gz"
+    save(path, data)
+    print(f"✓ Recorded {url} -> {path}")
+
+
+def parse_page(source, data, page_num=1):
+    if source == 'daft':
+        return parse_next_data(data)
+    return parse_ng_state(data, page_num)
+
+
+def golden_listing(listing):
+    """A listing as stored in the golden files - without fields that change by the day"""
+    return {k: v for k, v in as_dict(listing).items() if k not in VOLATILE_FIELDS}
+
+
+def update_golden():
+    for source in ('daft', 'myhome'):
+        golden = {}
+        for path in sorted((CORPUS / source).glob('*.json.gz')):
+            listings, total_count, total_pages = parse_page(source, load(path))
+            golden[path.name] = {'total_count': total_count, 'total_pages': total_pages,
+                                 'listings': [golden_listing(l) for l in listings]}
+        with open(CORPUS / f"golden/{source}.json", 'w', encoding='utf-8') as f:
+            json.dump(golden, f, indent=1, ensure_ascii=False)
+        print(f"✓ Golden: {source} ({len(golden)} pages)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline extraction corpus")
+    parser.add_argument('--record', metavar='URL', help="save a live search page's payload")
+    parser.add_argument('--update-golden', action='store_true', help="rewrite the expected outputs")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record)
+    elif args.update_golden:
+        update_golden()
+    else:
+        build()
+
+
+if __name__ == '__main__':
+    main()
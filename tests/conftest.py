@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+TESTS_DIR = Path(__file__).parent
+sys.path.insert(0, str(TESTS_DIR.parent / "scrapers"))
+sys.path.insert(0, str(TESTS_DIR))
+
+from build_corpus import CORPUS, load  # noqa: E402
+
+SOURCES = ('daft', 'myhome')
+
+
+def corpus_pages(source):
+    """(file name, decoded payload) for every page of a source's corpus"""
+    return [(path.name, load(path)) for path in sorted((CORPUS / source).glob('*.json.gz'))]
+
+
+@pytest.fixture(scope='session', params=SOURCES)
+def corpus(request):
+    return request.param, corpus_pages(request.param)
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: throughput/latency/memory benchmark of the extractors')
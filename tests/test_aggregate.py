@@ -0,0 +1,39 @@
+"""Area summaries, chart buckets and map cells"""
+
+from aggregate import aggregate, tile, CELL_SHIFT
+
+
+def listing(area, price, days, lat, lng, level='warm', pps=5000):
+    return {'area': area, 'priceNum': price, 'daysNum': days, 'pricePerSqm': pps, 'lat': lat, 'lng': lng,
+            'property_type': 'Semi-D', 'level': level}
+
+
+def test_tile():
+    # OpenStreetMap tiles 10/511/340 (London) and 10/494/331 (Dublin)
+    assert tile(51.5074, -0.1278, 10) == (511, 340)
+    assert tile(53.3494, -6.2601, 10) == (494, 331)
+
+
+def test_aggregate():
+    listings = [
+        listing('Dublin 8', 350000, 10, 53.34, -6.28, 'hot'),
+        listing('Dublin 8', 420000, 30, 53.341, -6.281),
+        listing('Dublin 8', 2500000, 5, 53.35, -6.29),
+        listing('Bray', 600000, 0, 0, 0, 'cool', pps=0),
+    ]
+    result = aggregate({'generated_at': 'x', 'listings': listings, 'areas': {'Dublin 8': {'tier': 'premium'}}})
+
+    d8 = result['areas']['Dublin 8']
+    assert (d8['count'], d8['medianDays'], d8['meanDays'], d8['medianPrice']) == (3, 10, 15.0, 420000)
+    assert d8['ppsQuantiles'] == [5000] * 5 and d8['tier'] == 'premium'
+    assert result['areas']['Bray']['ppsQuantiles'] is None
+
+    assert result['charts']['price'] == [0, 1, 1, 0, 1, 0, 0, 0, 0, 1]
+    assert result['charts']['days'] == [2, 1, 1, 0, 0, 0, 0]
+    assert result['charts']['areaDemand'] == [{'area': 'Dublin 8', 'demand': 25}]
+
+    # Bray has no position, so it's in no cell; the others only split up as you zoom in
+    counts = {int(z): sorted(row[2] for row in rows) for z, rows in result['cells'].items()}
+    assert counts[8] == [3]
+    assert sum(counts[14]) == 3 and len(counts[14]) >= 2
+    assert result['cellShift'] == CELL_SHIFT
@@ -0,0 +1,74 @@
+"""Saved-search matching over new and re-priced listings"""
+
+import json
+import itertools
+
+import pytest
+
+from alerts import SearchIndex, changed_listings, compile_search, match_changes, matches, write_reports
+from enrich import badges, normalise
+from schema import as_dict
+from conftest import corpus_pages
+from build_corpus import parse_page
+
+AREAS = {'Co. Dublin': {'avgPPS': 9000, 'tier': 'midrange'}}
+
+
+def corpus_listings(source):
+    return [as_dict(l) for _, data in corpus_pages(source) for l in parse_page(source, data)[0]]
+
+
+def dashboard_form(listing, source):
+    d = normalise(listing, source)
+    d['badges'] = badges(d, AREAS.get(d['area'], {}))
+    return d
+
+
+def test_index_agrees_with_a_full_scan():
+    listings = [dashboard_form(l, 'daft') for l in corpus_listings('daft')]
+    listings = [d for d in listings if d['priceNum'] > 0]
+    prices = (None, 250000, 400000, 400001, 650000, 1000000)
+    searches = []
+    for n, (low, high, area, beds) in enumerate(itertools.product(prices, prices, (None, 'co. dublin'), (None, 3))):
+        spec = {'name': f"s{n}", 'min_price': low, 'max_price': high, 'min_beds': beds}
+        if area:
+            spec['areas'] = [area]
+        searches.append(compile_search(spec))
+    searches.append(compile_search({'name': 'starter', 'badges': ['ftb'], 'ber': 'C'}))
+
+    index = SearchIndex(searches)
+    for d in listings:
+        assert index.match(d) == [s['name'] for s in searches if matches(s, d)]
+    assert any(index.match(d) for d in listings)
+
+
+def test_bad_searches():
+    for spec in ({'name': 'x', 'max_bedrooms': 3}, {'min_price': 1}, {'name': 'x', 'badges': ['cheap']},
+                 {'name': 'x', 'ber': 'Q'}):
+        with pytest.raises(ValueError):
+            compile_search(spec)
+
+
+def test_reports(tmp_path):
+    listings = corpus_listings('myhome')
+    new, repriced, sale_agreed = listings[0], listings[1], listings[2]
+    changes = tmp_path / 'myhome_changes.json'
+    changes.write_text(json.dumps({
+        'new': [new],
+        'price_changed': [{'listing_id': repriced['listing_id'], 'old_price': 1, 'new_price': 2, 'listing': repriced}],
+        'sale_agreed': [sale_agreed], 'updated': [], 'removed': [],
+    }))
+    changed = list(changed_listings({'myhome': str(changes), 'daft': str(tmp_path / 'missing.json')}))
+    assert [c[1] for c in changed] == ['new', 'price_changed']
+
+    searches = [compile_search({'name': 'everything'}), compile_search({'name': 'nothing', 'max_price': 1})]
+    reports = match_changes(SearchIndex(searches), changed, AREAS)
+    assert [row['listing_id'] for row in reports['everything']] == [new['listing_id'], repriced['listing_id']]
+    assert reports['everything'][1]['oldPrice'] == 1 and 'nothing' not in reports
+
+    (tmp_path / 'alerts').mkdir()
+    (tmp_path / 'alerts' / 'nothing.json').write_text('{}')
+    write_reports(searches, reports, len(changed), tmp_path / 'alerts')
+    assert sorted(p.name for p in (tmp_path / 'alerts').iterdir()) == ['everything.json', 'index.json']
+    index = json.loads((tmp_path / 'alerts' / 'index.json').read_text())
+    assert index['searches'] == {'everything': 2, 'nothing': 0} and index['checked'] == 2
@@ -0,0 +1,80 @@
+"""Indexed queries of the local listings API"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from api import ListingIndex, QueryError, QueryService, make_server
+
+
+def listing(i, area, price, size, ber, lat, lng, score, property_type='Semi-D', date='2026-01-01'):
+    return {'listing_id': str(i), 'address': f"{i} Main St, {area}, Co. Dublin", 'area': area,
+            'priceNum': price, 'bedsNum': 3, 'sizeNum': size, 'pricePerSqm': round(price / size) if size else 0,
+            'daysNum': i, 'score': score, 'level': 'hot' if score >= 70 else 'warm', 'source': 'daft',
+            'property_type': property_type, 'ber': ber, 'lat': lat, 'lng': lng, 'date_listed': date,
+            'inPreferredArea': area == 'Blackrock'}
+
+
+LISTINGS = [
+    listing(1, 'Lucan', 350000, 100, 'B2', 53.35, -6.44, 80),
+    listing(2, 'Lucan', 450000, 0, 'D1', 53.36, -6.45, 50, 'Terrace'),
+    listing(3, 'Blackrock', 900000, 150, 'A3', 53.30, -6.18, 75, 'Detached'),
+    listing(4, 'Dublin 8', 400000, 80, '', 0, 0, 60, 'End of Terrace'),
+    listing(5, 'Blackrock', 650000, 120, 'C1', 53.301, -6.181, 65),
+]
+
+
+def ids(index, **params):
+    result = index.query({k: v if isinstance(v, list) else [str(v)] for k, v in params.items()})
+    return [d['listing_id'] for d in result['listings']]
+
+
+def test_filters_and_sort():
+    index = ListingIndex({'generated_at': 'x', 'areas': {}, 'listings': LISTINGS})
+
+    assert ids(index) == ['1', '3', '5', '4', '2']  # best score first by default
+    assert ids(index, min_price=400000, max_price=650000, sort='price') == ['4', '2', '5']
+    # Unknown sizes match no size range
+    assert ids(index, max_size=120, sort='size') == ['4', '1', '5']
+    assert ids(index, area=['Lucan', 'Dublin 8'], sort='-price') == ['2', '4', '1']
+    assert ids(index, type='Terrace', sort='price') == ['4', '2']
+    assert ids(index, ber='B', sort='price') == ['1', '3']
+    assert ids(index, preferred=1, q='5 main', sort='price') == ['5']
+    assert ids(index, bbox='53.29,-6.2,53.31,-6.1', level='hot') == ['3']
+    assert ids(index, sort='-date_listed', min_score=80) == ['1']
+
+    page = index.query({'sort': ['price'], 'page': ['2'], 'per_page': ['2'], 'fields': ['listing_id,priceNum']})
+    assert (page['total'], page['pages']) == (5, 3)
+    assert page['listings'] == [{'listing_id': '2', 'priceNum': 450000}, {'listing_id': '5', 'priceNum': 650000}]
+
+    for bad in ({'min_price': ['cheap']}, {'sort': ['beauty']}, {'ber': ['Z']}, {'bbox': ['1,2']},
+                {'per_page': ['100000']}):
+        with pytest.raises(QueryError):
+            index.query(bad)
+
+
+def test_server(tmp_path):
+    path = tmp_path / 'dashboard.json'
+    fields = list(LISTINGS[0])
+    path.write_text(json.dumps({'generated_at': 'x', 'areas': {'Lucan': {'count': 2}},
+                                'listings': {'fields': fields, 'rows': [[d[f] for f in fields] for d in LISTINGS]}}))
+    service = QueryService(str(path))
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        for _ in range(2):
+            with urllib.request.urlopen(base + '/listings?area=Lucan&fields=listing_id') as response:
+                assert json.load(response)['listings'] == [{'listing_id': '1'}, {'listing_id': '2'}]
+        assert (service.hits, service.misses) == (1, 1)
+        with urllib.request.urlopen(base + '/areas') as response:
+            assert json.load(response)['areas'] == {'Lucan': {'count': 2}}
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(base + '/listings?sort=beauty')
+        assert e.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,53 @@
+"""
+Throughput, per-page latency and peak memory of the extraction hot path
+
+Runs the two extractors over the offline corpus - no network, no browser - so
+numbers are comparable between runs and machines. Results are printed
+(pytest -s, or -m benchmark to run only these); the assertions are only loose
+floors that catch an accidental order-of-magnitude regression.
+"""
+
+import time
+import tracemalloc
+
+import pytest
+
+from build_corpus import parse_page
+
+ROUNDS = 20
+# Listings per second a CI runner clears with lots of headroom
+MIN_LISTINGS_PER_SEC = 2000
+MAX_PEAK_BYTES_PER_LISTING = 20000
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+@pytest.mark.benchmark
+def test_extraction_benchmark(corpus):
+    source, pages = corpus
+    parse_page(source, pages[0][1])  # warm up
+
+    timings, extracted = [], 0
+    for _ in range(ROUNDS):
+        for _, data in pages:
+            start = time.perf_counter()
+            listings, _, _ = parse_page(source, data)
+            timings.append(time.perf_counter() - start)
+            extracted += len(listings)
+
+    tracemalloc.start()
+    kept = [parse_page(source, data)[0] for _, data in pages]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_round = sum(len(listings) for listings in kept)
+
+    timings.sort()
+    rate = extracted / sum(timings)
+    print(f"\n  {source}: {rate:,.0f} listings/s, page p50 {percentile(timings, 0.5) * 1000:.2f}ms "
+          f"p95 {percentile(timings, 0.95) * 1000:.2f}ms, peak {peak / 1024:.0f} KiB "
+          f"for {per_round} listings")
+
+    assert rate >= MIN_LISTINGS_PER_SEC
+    assert peak <= MAX_PEAK_BYTES_PER_LISTING * per_round
@@ -0,0 +1,92 @@
+"""Checkpoint journal: resuming from torn, stale and complete journals"""
+
+import json
+from datetime import datetime, timedelta
+
+from schema import make_listing
+from checkpoint import CheckpointJournal, MAX_AGE_HOURS
+
+
+def listings(band, page, n=3):
+    return [make_listing(listing_id=f"{band}-{page}-{i}", url=f"https://www.daft.ie/{band}/{page}/{i}",
+                         price="€450,000", price_num=450000, beds=3)
+            for i in range(n)]
+
+
+def interrupted_run(path):
+    """A run that did two bands' worth of pages and split a third band, then died"""
+    journal = CheckpointJournal(path)
+    journal.record('under_300k', 1, 2, listings('under_300k', 1), total_count=40)
+    journal.record_split('over_300k')
+    journal.record('300k_600k', 1, 1, listings('300k_600k', 1), total_count=3)
+    journal.record('under_300k', 2, 2, listings('under_300k', 2))
+    return journal
+
+
+def test_resume_replays_recorded_pages(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    first = interrupted_run(path)
+
+    resumed = CheckpointJournal(path, resume=True)
+    assert resumed.started_at == first.started_at
+    assert resumed.pages == {('under_300k', 1): 2, ('300k_600k', 1): 1, ('under_300k', 2): 2}
+    assert resumed.counts == {'under_300k': 40, '300k_600k': 3}
+    assert resumed.splits == {'over_300k'}
+    assert resumed.done('under_300k', 2) and not resumed.done('over_300k', 1)
+
+    replayed = list(resumed.replay())
+    assert [(band, page, total) for band, page, total, _ in replayed] == [
+        ('under_300k', 1, 2), ('300k_600k', 1, 1), ('under_300k', 2, 2)]
+    assert [l for _, _, _, page in replayed for l in page] == \
+        listings('under_300k', 1) + listings('300k_600k', 1) + listings('under_300k', 2)
+
+
+def test_torn_last_line_dropped(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    interrupted_run(path)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'band': '300k_600k', 'page': 2, 'total_pages': 2, 'listings': []})[:25])
+
+    resumed = CheckpointJournal(path, resume=True)
+    assert len(resumed.pages) == 3 and not resumed.done('300k_600k', 2)
+    # The torn tail is cut off, so the next record starts on a clean line
+    resumed.record('300k_600k', 2, 2, listings('300k_600k', 2))
+    again = CheckpointJournal(path, resume=True)
+    assert again.done('300k_600k', 2) and len(list(again.replay())) == 4
+
+
+def test_complete_record_without_newline_dropped(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    interrupted_run(path)
+    # The write made it but the newline didn't - can't tell it from a torn one
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'split': '300k_600k'}))
+    assert CheckpointJournal(path, resume=True).splits == {'over_300k'}
+
+
+def test_stale_journal_discarded(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    interrupted_run(path)
+    with open(path, encoding='utf-8') as f:
+        lines = f.readlines()
+    old = (datetime.now() - timedelta(hours=MAX_AGE_HOURS + 1)).isoformat()
+    lines[0] = json.dumps({'started_at': old}) + '\n'
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+
+    fresh = CheckpointJournal(path, resume=True)
+    assert fresh.started_at != old
+    assert fresh.pages == {} and fresh.counts == {} and fresh.splits == set()
+    assert list(fresh.replay()) == []
+    # And the old pages are gone from the file, not just from memory
+    with open(path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 1
+
+
+def test_no_resume_starts_over(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    interrupted_run(path)
+    fresh = CheckpointJournal(path)
+    assert fresh.pages == {} and list(fresh.replay()) == []
+    fresh.finish()
+    assert not (tmp_path / "checkpoint.jsonl").exists()
@@ -0,0 +1,78 @@
+"""Cross-source duplicate matching"""
+
+from schema import make_listing
+from dedupe import (Candidate, match_score, find_duplicates, dedupe, eircode,
+                    CELL_LAT, PRICE_TOLERANCE, SIZE_TOLERANCE)
+
+
+def listing(source, listing_id, address, price=450000, beds=3, size=100.0, lat=53.2901, lng=-6.1332, **extra):
+    return make_listing(listing_id=listing_id, source=source, url=f"https://{source}.ie/{listing_id}",
+                        address=address, price=f"€{price:,}", price_num=price, beds=beds, size_sqm=size,
+                        latitude=lat, longitude=lng, **extra)
+
+
+def score(a, b):
+    return match_score(Candidate(a), Candidate(b))
+
+
+def test_same_house():
+    daft = listing('daft', '1', "42 Brackenwood Avenue, Dún Laoghaire, Co. Dublin")
+    myhome = listing('myhome', '2', "42 Brackenwood Ave, Dun Laoghaire, Dublin")
+    assert score(daft, myhome) >= 1
+
+
+def test_price_and_size_tolerances():
+    daft = listing('daft', '1', "42 Brackenwood Avenue, Dún Laoghaire")
+    # The tolerance is a share of the higher price: 450k is just within it of this one
+    limit = int(450000 / (1 - PRICE_TOLERANCE))
+    assert score(daft, listing('myhome', '2', "42 Brackenwood Avenue, Dún Laoghaire", price=limit - 500))
+    assert not score(daft, listing('myhome', '2', "42 Brackenwood Avenue, Dún Laoghaire", price=limit + 500))
+    assert not score(daft, listing('myhome', '2', "42 Brackenwood Avenue, Dún Laoghaire",
+                                   size=100 * (1 + SIZE_TOLERANCE) + 5))
+    assert not score(daft, listing('myhome', '2', "42 Brackenwood Avenue, Dún Laoghaire", beds=4))
+    # A missing price or size is no reason to rule a match out
+    assert score(daft, listing('myhome', '2', "42 Brackenwood Avenue, Dún Laoghaire", price=0, size=None))
+
+
+def test_house_numbers_must_agree():
+    daft = listing('daft', '1', "Apartment 5, The Maples, Brackenwood Avenue, Dún Laoghaire")
+    assert not score(daft, listing('myhome', '2', "Apt 6, The Maples, Brackenwood Avenue, Dún Laoghaire"))
+    assert score(daft, listing('myhome', '2', "Apt 5, The Maples, Brackenwood Avenue, Dún Laoghaire"))
+
+
+def test_eircode_decides():
+    assert eircode("1 Main St, Bray, A98 X2Y3") == eircode("1 Main St, Bray, a98x2y3") == 'A98X2Y3'
+    daft = listing('daft', '1', "The Lodge, Killiney Hill Road, Killiney, A96 K2F5")
+    # Same Eircode: certain, however different the rest of the address reads
+    assert score(daft, listing('myhome', '2', "Lodge House, Killiney, Co. Dublin, A96K2F5")) == 2.0
+    # Different Eircodes: never, however alike the addresses are
+    assert not score(daft, listing('myhome', '2', "The Lodge, Killiney Hill Road, Killiney, A96 K2F6"))
+
+
+def test_distance():
+    daft = listing('daft', '1', "12 Seafield Road, Clontarf")
+    # Another cell over is still a neighbour; three cells away is another street
+    close = listing('myhome', '2', "12 Seafield Road, Clontarf", lat=53.2901 + CELL_LAT)
+    assert find_duplicates([daft, close]) == [(0, 1)]
+    far = listing('myhome', '2', "Seafield, Clontarf", lat=53.2901 + 3 * CELL_LAT)
+    assert find_duplicates([daft, far]) == []
+    # ...unless the house number and street say it's the same house (a mis-placed pin)
+    pinned = listing('myhome', '2', "12 Seafield Road, Clontarf", lat=53.2901 + 3 * CELL_LAT)
+    assert find_duplicates([daft, pinned]) == [(0, 1)]
+
+
+def test_same_source_never_matched():
+    a = listing('daft', '1', "42 Brackenwood Avenue, Dún Laoghaire")
+    b = listing('daft', '2', "42 Brackenwood Avenue, Dún Laoghaire")
+    assert find_duplicates([a, b]) == []
+
+
+def test_dedupe_merges_and_links():
+    daft = listing('daft', '1', "42 Brackenwood Avenue, Dún Laoghaire", ber='B2')
+    myhome = listing('myhome', '2', "42 Brackenwood Ave, Dun Laoghaire", agent='Sherry FitzGerald', ber='')
+    other = listing('myhome', '3', "7 Seafield Road, Clontarf", lat=53.36, lng=-6.19)
+    unique, links = dedupe([daft, myhome, other])
+    assert len(unique) == 2 and other in unique
+    merged = next(l for l in unique if l is not other)
+    assert (merged.ber, merged.agent) == ('B2', 'Sherry FitzGerald')
+    assert len(links) == 1 and {links[0]['source'], links[0]['duplicate_source']} == {'daft', 'myhome'}
@@ -0,0 +1,62 @@
+"""Detail-page parsing, gap filling and the detail cache"""
+
+import json
+
+import daft_scraper
+import myhome_scraper
+from details import DetailCache, apply_details, gaps_filled, needs_details
+from store import listing_hash
+from schema import as_dict
+from conftest import corpus_pages
+
+
+def test_daft_detail_page():
+    item = corpus_pages('daft')[0][1]['props']['pageProps']['listings'][0]
+    listing = daft_scraper.parse_daft(item, daft_scraper.BASE_URL)
+    # A listing page has the same listing object, among plenty else
+    text = json.dumps({'props': {'pageProps': {'similar': [{'listing': {'id': 1}}], 'listing': item['listing']}}})
+
+    data = daft_scraper.decode_detail_page(text)
+    assert daft_scraper.parse_detail_page(data, listing) == listing
+    assert daft_scraper.parse_detail_page(data, listing._replace(listing_id='1')) is None
+
+
+def test_myhome_detail_page():
+    item = corpus_pages('myhome')[0][1].popitem()[1]['SearchResults'][0]
+    listing = myhome_scraper.parse_myhome(item, myhome_scraper.BASE_URL)
+    page = {'PROPERTY_RESOLVER:/x': {'Property': {k: v for k, v in item.items() if k != 'BrochureUrl'}}}
+
+    assert myhome_scraper.parse_detail_page(page, listing) == listing
+    assert myhome_scraper.parse_detail_page(page, listing._replace(listing_id='1')) is None
+
+
+def test_fills_only_blanks():
+    item = corpus_pages('daft')[0][1]['props']['pageProps']['listings'][0]
+    full = daft_scraper.parse_daft(item, daft_scraper.BASE_URL)
+    partial = full._replace(ber='', size_sqm=None, date_listed='', days_on_market=None, price='€1')
+
+    assert needs_details(partial) and not needs_details(full)
+    fields = gaps_filled(partial, full)
+    assert set(fields) == {'ber', 'size_sqm', 'date_listed'}
+    filled = apply_details(partial, fields)
+    assert filled == full._replace(price='€1', days_on_market=filled.days_on_market)
+    assert isinstance(filled.days_on_market, int)
+    assert gaps_filled(partial, None) == {}
+
+
+def test_cache(tmp_path):
+    item = corpus_pages('daft')[0][1]['props']['pageProps']['listings'][0]
+    listing = daft_scraper.parse_daft(item, daft_scraper.BASE_URL)
+    content_hash = listing_hash(as_dict(listing))
+
+    cache = DetailCache(str(tmp_path / 'cache.db'))
+    assert cache.get('daft', listing, content_hash) is None
+    cache.put('daft', listing, content_hash, {'ber': 'B2'})
+    assert cache.get('daft', listing, content_hash) == {'ber': 'B2'}
+    # A changed search entry means the page has to be looked at again
+    assert cache.get('daft', listing, 'another hash') is None
+
+    cache.ttl_days = -1
+    assert cache.get('daft', listing, content_hash) is None
+    assert cache.evict() == 1
+    cache.close()
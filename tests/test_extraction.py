@@ -0,0 +1,126 @@
+"""Golden-output and invariant checks for the two extractors over the offline corpus"""
+
+import json
+from datetime import date
+
+import pytest
+
+from build_corpus import CORPUS, golden_listing, parse_page
+from schema import FIELDS, Listing, as_dict
+from daft_scraper import decode_next_data
+from myhome_scraper import decode_ng_state
+from outputs import ListingWriter
+from columnar import encode, decode
+from conftest import SOURCES, corpus_pages
+
+
+def golden(source):
+    with open(CORPUS / f"golden/{source}.json", encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize('source', SOURCES)
+def test_matches_golden(source):
+    expected = golden(source)
+    pages = corpus_pages(source)
+    assert pages, f"no {source} corpus pages - run tests/build_corpus.py"
+    assert sorted(expected) == [name for name, _ in pages], \
+        "corpus and golden files are out of step - run tests/build_corpus.py --update-golden"
+
+    for name, data in pages:
+        listings, total_count, total_pages = parse_page(source, data)
+        assert (total_count, total_pages) == (expected[name]['total_count'], expected[name]['total_pages'])
+        actual = [golden_listing(l) for l in listings]
+        for got, want in zip(actual, expected[name]['listings']):
+            assert got == want, f"{name}: listing {want['listing_id']} changed"
+        assert len(actual) == len(expected[name]['listings']), f"{name}: listing count changed"
+
+
+def test_targeted_decode(corpus):
+    """Decoding only the listings/search keys parses the same as decoding the whole page"""
+    source, pages = corpus
+    decode = decode_next_data if source == 'daft' else decode_ng_state
+    for name, data in pages:
+        # Pad the page with keys the targeted decoder has to skip over
+        text = json.dumps({'filters': {'listings': 'not these'}, **data}, ensure_ascii=False)
+        assert parse_page(source, decode(text)) == parse_page(source, data), name
+
+
+def test_streamed_outputs_match(corpus, tmp_path):
+    """Writing a page at a time gives the same files as writing everything at once"""
+    source, pages = corpus
+    listings = [l for _, data in pages for l in parse_page(source, data)[0]]
+    rows = [as_dict(l) for l in listings]
+    paths = [str(tmp_path / name) for name in ('out.csv', 'out.json', 'out.col')]
+    with ListingWriter(*paths, '2025-01-01T00:00:00') as writer:
+        for _, data in pages:
+            writer.write(parse_page(source, data)[0])
+
+    with open(paths[1], encoding='utf-8') as f:
+        assert f.read() == json.dumps({'scraped_at': '2025-01-01T00:00:00', 'listings': rows},
+                                      indent=2, ensure_ascii=False)
+    with open(paths[2], 'rb') as f:
+        assert f.read() == encode(rows, '2025-01-01T00:00:00')
+    assert writer.count == len(rows)
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_columnar_round_trip(corpus):
+    """The columnar file decodes back to the listings - floats to float32 precision"""
+    source, pages = corpus
+    rows = [as_dict(l) for _, data in pages for l in parse_page(source, data)[0]]
+    header, decoded = decode(encode(rows, '2025-01-01T00:00:00'))
+    assert header['rows'] == len(rows) and len(decoded) == len(rows)
+    for row, back in zip(rows, decoded):
+        assert set(back) == set(row)
+        for field, value in row.items():
+            if isinstance(value, float):
+                assert back[field] == pytest.approx(value, rel=1e-6), field
+            elif value == '':
+                assert back[field] in ('', None), field
+            else:
+                assert back[field] == value or str(back[field]) == value, field
+
+
+def test_types(corpus):
+    source, pages = corpus
+    for name, data in pages:
+        listings, _, _ = parse_page(source, data)
+        assert listings, f"{name}: nothing extracted"
+        for l in listings:
+            assert isinstance(l, Listing) and l._fields == FIELDS
+            assert l.source == source
+            assert l.listing_id and l.url.startswith('http')
+            assert l.price_num is None or isinstance(l.price_num, int)
+            assert l.beds is None or isinstance(l.beds, int)
+            assert l.size_sqm is None or isinstance(l.size_sqm, float)
+            assert (l.latitude is None) == (l.longitude is None)
+            if l.latitude is not None:
+                assert 51 <= l.latitude <= 56 and -11 <= l.longitude <= -5
+            if l.date_listed:
+                date.fromisoformat(l.date_listed)
+                assert isinstance(l.days_on_market, int)
+
+
+def test_daft_edge_cases():
+    listings = [l for _, data in corpus_pages('daft') for l in parse_page('daft', data)[0]]
+    by_price = {l.price: l for l in listings}
+    assert by_price['Price on Application'].price_num is None
+    assert by_price['€1,275,000 to €1,350,000'].price_num == 1275000
+    assert any(l.latitude is None for l in listings)
+    # The listing with no ID is dropped, not written out with a blank one
+    assert len(listings) == sum(len(data['props']['pageProps']['listings']) for _, data in corpus_pages('daft')) - 1
+
+
+def test_myhome_edge_cases():
+    pages = corpus_pages('myhome')
+    listings = [l for _, data in pages for l in parse_page('myhome', data)[0]]
+    assert not any(l.property_type.lower() == 'apartment' for l in listings)
+    assert any(l.price == 'POA' and l.price_num is None for l in listings)
+    assert any(l.price_num == 1275000 for l in listings)
+
+    # The real sample: Location is (0, 0), so the BrochureMap position is used,
+    # and its 7-digit fractional seconds still parse
+    sample = next(l for l in listings if l.listing_id == '4898414')
+    assert (sample.latitude, sample.longitude) == pytest.approx((53.3235, -6.2631), abs=1e-4)
+    assert sample.date_listed == '2025-01-08'
@@ -0,0 +1,248 @@
+"""Lean browser navigation, and the HTTP backend against a stub server"""
+
+import zlib
+import gzip
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetch import (lean_navigation, HttpBackend, ScriptScanner, FetchError, ChallengeError,
+                   CHUNK_SIZE, values_at_keys)
+from daft_scraper import decode_next_data
+
+
+class Request:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class Route:
+    def __init__(self, request):
+        self.request = request
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = 'abort'
+
+    async def continue_(self):
+        self.outcome = 'continue'
+
+
+class Context:
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+
+def outcomes(requests):
+    context, blocked = Context(), []
+    asyncio.run(lean_navigation(context, ('daft.ie',), blocked.append))
+    routes = [Route(Request(url, kind)) for url, kind in requests]
+    for route in routes:
+        asyncio.run(context.handler(route))
+    return [route.outcome for route in routes], len(blocked)
+
+
+def test_lean_navigation_filter():
+    result, blocked = outcomes([
+        ('https://www.daft.ie/property-for-sale/dublin/houses', 'document'),
+        ('https://www.daft.ie/_next/static/chunks/main.js', 'script'),
+        ('https://media.daft.ie/photo.jpg', 'image'),
+        ('https://www.daft.ie/fonts/x.woff2', 'font'),
+        ('https://www.daft.ie/_next/static/css/app.css', 'stylesheet'),
+        ('https://www.googletagmanager.com/gtm.js', 'script'),
+        ('https://notdaft.ie/x.js', 'script'),
+        ('https://challenges.cloudflare.com/turnstile/v0/api.js', 'script'),
+    ])
+    assert result == ['continue', 'continue', 'abort', 'abort', 'abort', 'abort', 'abort', 'continue']
+    assert blocked == 5
+
+
+DATA = {'props': {'pageProps': {'listings': [{'listing': {'id': 1}}], 'paging': {'totalResults': 1}}}}
+SCRIPT = b'<script id="__NEXT_DATA__" type="application/json">' + json.dumps(DATA).encode() + b'</script>'
+# Padding that puts the opening tag across the first CHUNK_SIZE read
+PAGE = b'<html><head>' + b' ' * (CHUNK_SIZE - 30) + SCRIPT + b'</head><body></body></html>'
+CHALLENGE = b'<html><title>Just a moment...</title><div class="cf-chl"></div></html>'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, body, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('Cookie')))
+        cookie = self.headers.get('Cookie') or ''
+        if self.path == '/page':
+            self.send(200, PAGE)
+        elif self.path == '/gzip':
+            self.send(200, gzip.compress(PAGE), [('Content-Encoding', 'gzip')])
+        elif self.path == '/moved':
+            self.send(302, b'', [('Location', '/page?from=moved')])
+        elif self.path.startswith('/page?'):
+            self.send(200, PAGE)
+        elif self.path == '/login':
+            self.send(302, b'', [('Location', '/members'), ('Set-Cookie', 'session=abc; Path=/')])
+        elif self.path == '/members':
+            self.send(200, PAGE) if 'session=abc' in cookie else self.send(403, b'no session')
+        elif self.path == '/gone':
+            self.send(200, b'<html><h1>Something went wrong</h1></html>')
+        elif self.path == '/plain':
+            self.send(200, b'<html><body>nothing here</body></html>')
+        elif self.path == '/guarded':
+            self.send(200, PAGE) if 'cf_clearance=ok' in cookie else self.send(503, CHALLENGE)
+        elif self.path == '/corrupt':
+            self.send(200, b'not gzip at all' * 100, [('Content-Encoding', 'gzip')])
+        elif self.path == '/loop':
+            self.send(302, b'', [('Location', '/loop')])
+        else:
+            self.send(404, b'')
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def backend():
+    http = HttpBackend('test-agent', timeout=5, max_redirects=3)
+    yield http
+    http.close()
+
+
+def test_scanner_tag_split_across_chunks():
+    for size in (1, 7, 50):
+        scanner = ScriptScanner('__NEXT_DATA__')
+        chunks = [PAGE[i:i + size] for i in range(CHUNK_SIZE - 60, len(PAGE), size)]
+        assert not scanner.feed(PAGE[:CHUNK_SIZE - 60])
+        assert any(scanner.feed(c) for c in chunks)
+        assert json.loads(scanner.text) == DATA
+
+
+def test_fetch_over_keep_alive(server, backend):
+    httpd, base = server
+    stats = {}
+    assert backend.fetch_json(base + '/page', '__NEXT_DATA__', stats=stats) == DATA
+    assert backend.fetch_json(base + '/page', '__NEXT_DATA__') == DATA
+    assert stats['bytes'] == len(PAGE)
+    # Both requests went over the one pooled connection
+    assert len(backend.idle[('http', base.split('//')[1])]) == 1
+
+
+def test_gzip(server, backend):
+    httpd, base = server
+    stats = {}
+    assert backend.fetch_json(base + '/gzip', '__NEXT_DATA__', stats=stats) == DATA
+    assert stats['bytes'] == len(gzip.compress(PAGE)) < len(PAGE)
+
+
+def test_failed_read_closes_connection(server, backend, monkeypatch):
+    httpd, base = server
+    connections = []
+    request = backend._request
+
+    def tracked(url):
+        conn, response = request(url)
+        connections.append(conn)
+        return conn, response
+
+    monkeypatch.setattr(backend, '_request', tracked)
+    with pytest.raises(zlib.error):
+        backend.fetch_json(base + '/corrupt', '__NEXT_DATA__')
+    # Closed, not left open or handed back to the pool half-read
+    assert connections[0].sock is None
+    assert not backend.idle.get(('http', base.split('//')[1]))
+    assert backend.fetch_json(base + '/page', '__NEXT_DATA__') == DATA
+    assert connections[1] is not connections[0]
+
+
+def test_redirect_and_cookies(server, backend):
+    httpd, base = server
+    assert backend.fetch_json(base + '/moved', '__NEXT_DATA__') == DATA
+    assert [p for p, _ in httpd.requests] == ['/moved', '/page?from=moved']
+
+    # The cookie set on the redirect goes with the next request, and every one after it
+    assert backend.fetch_json(base + '/login', '__NEXT_DATA__') == DATA
+    assert backend.fetch_json(base + '/members', '__NEXT_DATA__') == DATA
+    assert httpd.requests[-1] == ('/members', 'session=abc')
+
+    with pytest.raises(FetchError, match='Too many redirects'):
+        backend.fetch_json(base + '/loop', '__NEXT_DATA__')
+
+
+def test_error_and_missing_script(server, backend):
+    httpd, base = server
+    with pytest.raises(FetchError, match='went wrong'):
+        backend.fetch_json(base + '/gone', '__NEXT_DATA__', error_markers=[b'went wrong'])
+    with pytest.raises(FetchError, match='No <script') as e:
+        backend.fetch_json(base + '/plain', '__NEXT_DATA__')
+    assert not isinstance(e.value, ChallengeError)
+
+
+def test_challenge_without_solver(server, backend):
+    httpd, base = server
+    with pytest.raises(ChallengeError):
+        backend.fetch_json(base + '/guarded', '__NEXT_DATA__')
+
+
+def test_challenge_solved_once(server):
+    httpd, base = server
+    calls = []
+
+    def solver(url, user_agent):
+        # What BrowserChallengeSolver hands back: Playwright's context.cookies()
+        calls.append((url, user_agent))
+        return [{'domain': '127.0.0.1', 'name': 'cf_clearance', 'value': 'ok', 'path': '/'}]
+
+    http = HttpBackend('test-agent', timeout=5, challenge_solver=solver)
+    try:
+        assert http.fetch_json(base + '/guarded', '__NEXT_DATA__') == DATA
+        assert http.fetch_json(base + '/guarded', '__NEXT_DATA__') == DATA
+    finally:
+        http.close()
+    assert calls == [(base + '/guarded', 'test-agent')]
+    assert [c for p, c in httpd.requests] == [None, 'cf_clearance=ok', 'cf_clearance=ok']
+
+    # A solver that doesn't get through gives up after one retry
+    http = HttpBackend('test-agent', timeout=5, challenge_solver=lambda url, ua: [])
+    try:
+        with pytest.raises(ChallengeError):
+            http.fetch_json(base + '/guarded', '__NEXT_DATA__')
+    finally:
+        http.close()
+
+
+def test_values_at_keys():
+    text = json.dumps({'a': {'paging': {'totalResults': 3}}, 'listings': [1, 2], 'x': '"listings": 5'})
+    assert list(values_at_keys(text, 'listings|paging')) == [('paging', {'totalResults': 3}), ('listings', [1, 2])]
+    assert list(values_at_keys(text.encode(), 'paging')) == [('paging', {'totalResults': 3})]
+
+
+def test_decode_next_data_ignores_empty_lists():
+    # An unrelated empty "listings" ahead of the real one mustn't be taken for the results
+    data = {'props': {'pageProps': {'filters': {'listings': []}, 'listings': [{'listing': {'id': 1}}],
+                                    'paging': {'totalResults': 1}}}}
+    assert decode_next_data(json.dumps(data))['props']['pageProps']['listings'] == [{'listing': {'id': 1}}]
+
+    # A page with no results is still read, through the full decode
+    empty = {'props': {'pageProps': {'listings': [], 'paging': {'totalResults': 0}}}}
+    assert decode_next_data(json.dumps(empty)) == empty
@@ -0,0 +1,80 @@
+"""Area resolution against the gazetteer, and the geo cache"""
+
+from geo import Gazetteer, GeoResolver, NameTrie, fallback_area, point_in_polygon
+
+SQUARE = [[53.30, -6.20], [53.30, -6.10], [53.20, -6.10], [53.20, -6.20]]
+GAZETTEER = {
+    'localities': {
+        'Stillorgan': {'lat': 53.29, 'lng': -6.20, 'outline': None},
+        'Clontarf': {'lat': 53.36, 'lng': -6.21, 'outline': None},
+        'Dun Laoghaire': {'lat': 53.29, 'lng': -6.13, 'outline': [[53.28, -6.14], [53.28, -6.12], [53.26, -6.12]]},
+        'Dublin 14': {'lat': 53.30, 'lng': -6.25, 'outline': None},
+        'Shankill': {'lat': 53.23, 'lng': -6.12, 'outline': SQUARE},
+    },
+    'routing_keys': {'K78': {'area': 'Lucan', 'lat': 53.35, 'lng': -6.45}},
+}
+
+
+def test_trie_longest_match():
+    trie = NameTrie([('dun', 'Dun'), ('dun laoghaire', 'Dun Laoghaire')])
+    assert trie.longest(['dun', 'laoghaire', 'harbour'], 0) == ('Dun Laoghaire', 2)
+    assert trie.longest(['dun', 'boyne'], 0) == ('Dun', 1)
+    assert trie.longest(['laoghaire'], 0) is None
+
+
+def test_point_in_polygon():
+    assert point_in_polygon(53.25, -6.15, SQUARE)
+    assert not point_in_polygon(53.35, -6.15, SQUARE)
+    assert not point_in_polygon(53.25, -6.25, SQUARE)
+
+
+def test_resolve_order():
+    gazetteer = Gazetteer(GAZETTEER)
+    # A locality named in the address beats the "Co. Dublin" second-to-last part
+    assert gazetteer.resolve('1 Main St, Stillorgan, Co Dublin, A94XN59', 53.28, -6.19) == \
+        ('Stillorgan', 53.28, -6.19, 'exact')
+    # Accents don't matter; a locality name on the street line or before a street word doesn't count
+    assert gazetteer.resolve('2 Park Rd, Dún Laoghaire, Co. Dublin', 0, 0)[0] == 'Dun Laoghaire'
+    assert gazetteer.resolve('3 Clontarf Road, Clontarf Road, Dublin 14', 0, 0) == \
+        ('Dublin 14', 53.30, -6.25, 'approx')
+    assert gazetteer.resolve('Clontarf, Dublin 3', 0, 0)[0] == 'Dublin 3'
+    # Then the Eircode routing key, then the smallest outline containing the point
+    assert gazetteer.resolve('4 The Green, Co. Dublin, K78 E2F4', 0, 0) == ('Lucan', 53.35, -6.45, 'approx')
+    assert gazetteer.resolve('5 The Green, Co. Dublin', 53.27, -6.125)[0] == 'Dun Laoghaire'
+    assert gazetteer.resolve('5 The Green, Co. Dublin', 53.25, -6.15)[0] == 'Shankill'
+    # And the old rule when nothing else knows
+    assert gazetteer.resolve('6 The Green, Somewhere, Co. Wicklow', 0, 0) == ('Somewhere', 0, 0, '')
+
+
+def test_fallback_area():
+    assert fallback_area('12 Northbrook Road, Ranelagh, Dublin 6') == 'Ranelagh'
+    assert fallback_area('Apt 4, Rathmines Dublin 6W, D6W AB12') == 'Rathmines'
+    assert fallback_area('Clontarf, Dublin 3, D03 XY12') == 'Dublin 3'
+    # Street lines and counties are passed over for the part before them...
+    assert fallback_area('1 Main St, Stillorgan, Co Dublin, A94XN59') == 'Stillorgan'
+    assert fallback_area('The Maples, 4 Brackenwood Avenue, Co. Dublin') == 'The Maples'
+    # ...and if nothing's left, it's just Dublin
+    assert fallback_area('230 Drumnigh Manor, Dublin') == 'Dublin'
+    assert fallback_area('55-71 Phoenix Park Avenue, Dublin 8') == 'Dublin'
+    assert fallback_area('Apartment 3, Clontarf Road, Co. Dublin') == 'Dublin'
+    assert fallback_area('Somewhere') == 'Dublin'
+
+
+def test_cache(tmp_path):
+    path = str(tmp_path / 'geo_cache.json')
+    resolver = GeoResolver(Gazetteer(GAZETTEER), path)
+    first = resolver.resolve('1 Main St, Stillorgan, Co Dublin', 0, 0)
+    resolver.resolve('6 The Green, Somewhere, Co. Wicklow', 0, 0)
+    assert resolver.hits == 0
+    resolver.save()
+
+    again = GeoResolver(Gazetteer(GAZETTEER), path)
+    assert again.resolve('1 Main St, Stillorgan, Co Dublin', 0, 0) == first
+    assert again.hits == 1
+    again.save()
+    # Only what the last run used is kept
+    assert len(GeoResolver(Gazetteer(GAZETTEER), path).cache) == 1
+
+    # A different gazetteer starts from scratch
+    changed = dict(GAZETTEER, routing_keys={})
+    assert GeoResolver(Gazetteer(changed), path).cache == {}
@@ -0,0 +1,153 @@
+"""Job spec expansion and the shared work queue across searches"""
+
+import asyncio
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+import daft_scraper
+import myhome_scraper
+import pacing
+from checkpoint import CheckpointJournal
+from jobs import shards
+from planner import BandPlanner, PAGE_SIZE
+from schema import make_listing
+from conftest import corpus_pages
+
+
+def test_shards():
+    jobs = {'daft': {'regions': ['dublin', 'Cork City'], 'property_types': ['houses', 'all']}}
+    searches = shards(jobs, 'daft')
+    assert [s.name for s in searches] == ['dublin-houses', 'dublin-all', 'cork-city-houses', 'cork-city-all']
+    assert searches[0].url == "https://www.daft.ie/property-for-sale/dublin/houses"
+    assert searches[3].url == "https://www.daft.ie/property-for-sale/cork-city"
+
+    with pytest.raises(ValueError):
+        shards({'daft': {'regions': ['dublin'], 'property_types': ['castles']}}, 'daft')
+    with pytest.raises(ValueError):
+        shards(jobs, 'myhome')
+
+
+def test_band_names_per_search():
+    search = shards({'daft': {'regions': ['dublin'], 'property_types': ['houses']}}, 'daft')[0]
+    planner = BandPlanner(search.url, [(None, 300000), (300000, None)], search=search.name)
+    assert [b.name for b in planner.bands] == ['dublin-houses/under_300k', 'dublin-houses/over_300k']
+    assert all(b.search == 'dublin-houses' for b in planner.split(planner.bands[1]))
+
+
+def test_searches_share_loaders(tmp_path, monkeypatch):
+    """Two tabs, three searches: the first tab to finish takes the third search"""
+    fast = {**pacing.SOURCE_DEFAULTS['myhome'], 'rate': 60000, 'max_rate': 60000}
+    monkeypatch.setitem(pacing._pacers, 'myhome', pacing.AdaptivePacer('myhome', **fast))
+    page = corpus_pages('myhome')[0][1]
+    listings, _, _ = myhome_scraper.parse_ng_state(page, 1)
+    searches = shards({'myhome': {'regions': ['dublin', 'wicklow', 'kildare'], 'property_types': ['houses']}},
+                      'myhome')
+    loaded = []
+
+    def loader(tab, delay):
+        async def load_page(url, page_num, search):
+            await asyncio.sleep(delay)
+            loaded.append((tab, search.name, page_num))
+            return listings[:2], 4, 2
+        return load_page
+
+    async def scrape():
+        journal = CheckpointJournal(str(tmp_path / 'checkpoint.jsonl'))
+        return [l async for l in myhome_scraper.scrape_shards([loader('fast', 0), loader('slow', 0.05)],
+                                                               searches, 0, journal)]
+
+    pages = asyncio.run(scrape())
+    assert len(pages) == 6
+    assert {(tab, name) for tab, name, _ in loaded} == {
+        ('fast', 'dublin-houses'), ('slow', 'wicklow-houses'), ('fast', 'kildare-houses')}
+
+
+async def collect(pages):
+    return [l async for l in pages]
+
+
+def test_first_page_retried_through_pacer(tmp_path, monkeypatch):
+    fast = {**pacing.SOURCE_DEFAULTS['myhome'], 'rate': 60000, 'max_rate': 60000,
+            'backoff_base': 0.001, 'backoff_max': 0.001}
+    pacer = pacing.AdaptivePacer('myhome', **fast)
+    monkeypatch.setitem(pacing._pacers, 'myhome', pacer)
+    listings, _, _ = myhome_scraper.parse_ng_state(corpus_pages('myhome')[0][1], 1)
+    search = shards({'myhome': {'regions': ['dublin'], 'property_types': ['houses']}}, 'myhome')[0]
+    urls = []
+
+    async def load_page(url, page_num, shard):
+        urls.append(url)
+        if len(urls) == 1:
+            raise TimeoutError("page 1 timed out")
+        return listings[:2], 4, 2
+
+    class Store:
+        def is_unchanged(self, source, listing):
+            return False
+
+    journal = CheckpointJournal(str(tmp_path / 'checkpoint.jsonl'))
+    pages = asyncio.run(collect(myhome_scraper.scrape_pages(load_page, search, 0, journal, {}, Store())))
+    assert len(pages) == 2
+    assert pacer.consecutive_failures == 0 and pacer.rate < 60000
+    assert urls == [search.url + '?sortBy=NewestFirst'] * 2 + [search.url + '?sortBy=NewestFirst&page=2']
+
+    # A first page that never loads skips the search rather than failing the run
+    async def broken(url, page_num, shard):
+        raise TimeoutError("down")
+    journal = CheckpointJournal(str(tmp_path / 'checkpoint2.jsonl'))
+    assert asyncio.run(collect(myhome_scraper.scrape_pages(broken, search, 0, journal, {}))) == []
+
+
+class StubDaft:
+    """One tab's fetcher over a fake market - answers by the URL's price band and page"""
+
+    def __init__(self, name, prices, fetched, delay):
+        self.name, self.prices, self.fetched, self.delay = name, prices, fetched, delay
+
+    async def fetch(self, url, band_name, first_page=False):
+        await asyncio.sleep(self.delay)
+        query = {k: int(v[0]) for k, v in parse_qs(urlsplit(url).query).items()}
+        page_num = query.get('page', 1)
+        self.fetched.append((self.name, band_name, page_num))
+        lo, hi = query.get('salePrice_from', 0), query.get('salePrice_to', float('inf'))
+        in_band = [p for p in self.prices if lo <= p < hi]
+        listings = [make_listing(listing_id=f"{band_name.split('/')[0]}-{p}", url=f"https://www.daft.ie/{p}",
+                                 price=f"€{p:,}", price_num=p)
+                    for p in in_band[(page_num - 1) * PAGE_SIZE:page_num * PAGE_SIZE]]
+        return listings, len(in_band), -(-len(in_band) // PAGE_SIZE)
+
+
+def test_daft_bands_share_fetchers(tmp_path, monkeypatch):
+    """Two tabs, two searches: every page once, and over-cap bands split on the shared queue"""
+    fast = {**pacing.SOURCE_DEFAULTS['daft'], 'rate': 60000, 'max_rate': 60000}
+    monkeypatch.setitem(pacing._pacers, 'daft', pacing.AdaptivePacer('daft', **fast))
+    monkeypatch.setattr(daft_scraper, 'BANDS_FILE', str(tmp_path / 'bands-{search}.json'))
+    # 500 under 300k, 1500 from 300k to 600k, 500 over - two rounds of splitting
+    prices = [200000 + 200 * i for i in range(2500)]
+    searches = shards({'daft': {'regions': ['dublin', 'wicklow'], 'property_types': ['houses']}}, 'daft')
+    fetched = []
+    fetchers = [StubDaft('fast', prices, fetched, 0), StubDaft('slow', prices, fetched, 0.002)]
+    journal = CheckpointJournal(str(tmp_path / 'checkpoint.jsonl'))
+
+    async def scrape():
+        return await collect(daft_scraper.run_workers(fetchers, searches, [(None, 300000), (300000, None)], 0,
+                                                      journal))
+
+    pages = asyncio.run(scrape())
+    counts = Counter((band, page) for _, band, page in fetched)
+    assert max(counts.values()) == 1
+    assert {tab for tab, _, _ in fetched} == {'fast', 'slow'}
+    for search in ('dublin-houses', 'wicklow-houses'):
+        assert {band for band, _ in counts if band.startswith(search)} == {
+            f"{search}/{name}" for name in
+            ('under_300k', 'over_300k', '300k_600k', 'over_600k', '300k_450k', '450k_600k')}
+        assert journal.splits >= {f"{search}/over_300k", f"{search}/300k_600k"}
+
+    # Split bands yield no page of their own; everything else is there exactly once
+    ids = [l.listing_id for page in pages for l in page]
+    assert len(ids) == len(set(ids)) == 2 * len(prices)
+    assert len(pages) == len(counts) - 4
+    assert all(journal.done(band, page) for band, page in counts
+               if band.rsplit('/', 1)[1] not in ('over_300k', '300k_600k'))
@@ -0,0 +1,126 @@
+"""Compact image URLs and the cached thumbnail stage"""
+
+import io
+import json
+import asyncio
+import threading
+from datetime import date, timedelta
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from build_corpus import parse_page
+from media import MediaTable
+from outputs import ListingWriter
+from thumbs import ThumbCache, Thumbnailer, read_photos, listing_thumbs
+from conftest import corpus_pages
+
+
+def corpus_listings(source):
+    return [l for _, data in corpus_pages(source) for l in parse_page(source, data)[0]]
+
+
+@pytest.mark.parametrize('source', ['daft', 'myhome'])
+def test_compact_urls_expand_back(tmp_path, source):
+    listings = corpus_listings(source)
+    urls = [l.image_url for l in listings]
+    media = MediaTable(str(tmp_path / 'media.json'))
+    compact = [media.compact(url) for url in urls]
+    assert [media.expand(value) for value in compact] == urls
+    assert sum(map(len, compact)) < sum(map(len, urls)) * (0.4 if source == 'daft' else 0.8)
+    assert len(media.templates) <= 3
+
+    # Written by the outputs, read back through a new table: the same values, nothing added
+    paths = [str(tmp_path / name) for name in ('out.csv', 'out.json', 'out.col')]
+    with ListingWriter(*paths, '2025-01-01T00:00:00', media=media) as writer:
+        writer.write(listings)
+    with open(paths[1], encoding='utf-8') as f:
+        assert [row['image_url'] for row in json.load(f)['listings']] == compact
+    again = MediaTable(str(tmp_path / 'media.json'))
+    assert [again.compact(url) for url in urls] == compact and again.added == 0
+
+
+def test_urls_that_dont_fit_stay_as_they_are(tmp_path):
+    media = MediaTable(str(tmp_path / 'media.json'))
+    for url in ('', 'not a url', '@0:already/compact'):
+        assert media.compact(url) == url
+    # Not an edit document: only the host is shared
+    url = 'https://media.daft.ie/bm90IGpzb24=?x=1'
+    assert media.compact(url) == '@0:bm90IGpzb24=?x=1' and media.expand('@0:bm90IGpzb24=?x=1') == url
+
+
+def stub_image_server(requests):
+    from PIL import Image
+    image = io.BytesIO()
+    Image.new('RGB', (720, 480), (200, 120, 40)).save(image, 'JPEG')
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            if self.path.startswith('/missing'):
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.end_headers()
+            self.wfile.write(image.getvalue())
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_thumbnails_against_a_stub_server(tmp_path):
+    pytest.importorskip('PIL')
+    requests = []
+    server = stub_image_server(requests)
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        listings = corpus_listings('daft')[:5]
+        media = MediaTable(str(tmp_path / 'daft_media.json'))
+        with ListingWriter(*(str(tmp_path / n) for n in ('daft.csv', 'daft.json', 'daft.col')), '',
+                           media=media) as writer:
+            writer.write(l._replace(image_url=f"{base}/photo/{i % 3}.jpg") for i, l in enumerate(listings))
+            writer.write([listings[0]._replace(listing_id='1', image_url=f"{base}/missing.jpg")])
+        photos = read_photos({'daft': (str(tmp_path / 'daft.csv'), str(tmp_path / 'daft_media.json'))})
+        assert photos[0] == (f"daft/{listings[0].listing_id}", f"{base}/photo/0.jpg")
+
+        def run():
+            cache = ThumbCache(tmp_path / 'thumbs')
+            thumbnailer = Thumbnailer(cache, concurrency=2)
+            found = asyncio.run(thumbnailer.run(photos))
+            cache.evict()
+            cache.save(found)
+            return thumbnailer, found
+
+        first, found = run()
+        assert (first.fetched, first.failed) == (3, 1)
+        assert len(found) == 5 and 'daft/1' not in found
+        # Three URLs, one photo: stored once
+        assert [p.suffix for p in (tmp_path / 'thumbs').iterdir() if p.name != 'index.json'] == ['.webp']
+        from PIL import Image
+        with Image.open(tmp_path / 'thumbs' / found[photos[0][0]]) as thumb:
+            assert (thumb.format, thumb.size) == ('WEBP', (240, 160))
+
+        requests.clear()
+        second, _ = run()
+        assert (second.fetched, second.cached) == (0, 3) and requests == ['/missing.jpg']
+        assert listing_thumbs(tmp_path / 'thumbs')[photos[0][0]] == f"thumbs/{found[photos[0][0]]}"
+    finally:
+        server.shutdown()
+
+
+def test_eviction(tmp_path):
+    cache = ThumbCache(tmp_path)
+    old = cache.put('http://x/old.jpg', b'old')
+    new = cache.put('http://x/new.jpg', b'new')
+    cache.images[next(k for k, e in cache.images.items() if e['file'] == old)]['used'] = \
+        (date.today() - timedelta(days=cache.keep_days + 1)).isoformat()
+    (tmp_path / 'stray.webp').write_bytes(b'')
+
+    assert cache.evict() == 2
+    assert sorted(p.name for p in tmp_path.glob('*.webp')) == [new]
+    assert cache.get('http://x/old.jpg') is None and cache.get('http://x/new.jpg') == new
@@ -0,0 +1,68 @@
+"""Run metrics: span percentiles, the run-to-run comparison and pruning old runs"""
+
+import metrics
+from metrics import RunMetrics, compare, latest_runs, percentile, prune, load
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 51
+    assert percentile(values, 0.95) == 96
+    assert percentile([7], 0.95) == 7
+    assert percentile([], 0.5) == 0.0
+
+
+def test_summary():
+    run = RunMetrics('daft')
+    for ms in range(1, 21):
+        run.record('fetch', ms / 1000, band='under_300k')
+    run.record('parse', 0.5)
+    run.page('under_300k', 20)
+    run.page('under_300k', 18)
+    run.retry('under_300k')
+    run.retry('under_300k', failed=True)
+    run.fetched('over_300k', {'bytes': 2048, 'decode': 0.25})
+
+    summary = run.summary()
+    assert summary['spans']['fetch'] == {'count': 20, 'total': 0.21, 'p50': 0.011, 'p95': 0.02, 'max': 0.02}
+    assert summary['spans']['parse']['p50'] == summary['spans']['parse']['p95'] == 0.5
+    assert summary['counters'] == {'bytes': 2048, 'failed_pages': 1, 'listings': 38, 'pages': 2, 'retries': 1}
+    assert summary['bands']['under_300k'] == {'pages': 2, 'listings': 38, 'bytes': 0, 'retries': 1,
+                                              'failures': 1, 'seconds': 0.21}
+    assert summary['bands']['over_300k']['bytes'] == 2048 and summary['bands']['over_300k']['seconds'] == 0.25
+
+
+def run_with(fetch_seconds, goto_seconds=None):
+    run = RunMetrics('daft')
+    for seconds in fetch_seconds:
+        run.record('fetch', seconds)
+    for seconds in goto_seconds or []:
+        run.record('goto', seconds)
+    return run.summary()
+
+
+def test_compare_flags_p95_regressions(capsys):
+    old = run_with([0.1] * 20, [1.0] * 20)
+    # fetch's p95 up 50%, goto's only 10%, and a span the old run didn't have
+    new = run_with([0.1] * 10 + [0.15] * 10, [1.1] * 20)
+    new['spans']['decode'] = {'count': 1, 'total': 0.1, 'p50': 0.1, 'p95': 0.1, 'max': 0.1}
+    assert compare(old, new) == ['fetch']
+    assert compare(old, new, threshold=0.05) == ['fetch', 'goto']
+    assert compare(old, old) == []
+    out = capsys.readouterr().out
+    assert '+50%' in out and 'new' in out
+
+
+def test_write_prunes_old_runs(tmp_path, monkeypatch):
+    for day in range(1, 12):
+        (tmp_path / f"daft-202501{day:02d}-030000.json").write_text('{}')
+    (tmp_path / "myhome-20250101-030000.json").write_text('{}')
+
+    path = RunMetrics('daft').write(directory=tmp_path)
+    kept = latest_runs('daft', tmp_path, n=100)
+    assert len(kept) == metrics.KEEP_RUNS and str(kept[-1]) == path
+    assert kept[0].name == f"daft-202501{12 - metrics.KEEP_RUNS + 1:02d}-030000.json"
+    assert load(path)['source'] == 'daft'
+    # Other sources are left alone
+    assert (tmp_path / "myhome-20250101-030000.json").exists()
+    assert prune('myhome', tmp_path, keep=1) == []
@@ -0,0 +1,97 @@
+"""Adaptive pacing: AIMD on the rate, capped exponential backoff, error classification"""
+
+import asyncio
+
+import pytest
+
+import pacing
+from fetch import FetchError, ChallengeError
+from pacing import AdaptivePacer, classify, INCREASE_PER_SUCCESS, DECREASE_FACTOR
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(pacing.time, 'monotonic', clock.monotonic)
+    # No jitter, so slots land exactly 60 / rate apart
+    monkeypatch.setattr(pacing.random, 'uniform', lambda a, b: 1.0)
+    return clock
+
+
+def pacer(**overrides):
+    return AdaptivePacer('daft', **{'rate': 30, 'min_rate': 6, 'max_rate': 40, 'backoff_base': 10,
+                                    'backoff_max': 120, **overrides})
+
+
+def test_classify():
+    assert classify(ChallengeError("Bot challenge on https://www.daft.ie - HTTP 429")) == 'challenge'
+    assert classify(FetchError("Got error page (rate limited) - HTTP 200")) == 'error_page'
+    assert classify(Exception("Rate limited - got error page")) == 'error_page'
+    assert classify(asyncio.TimeoutError()) == 'timeout'
+    assert classify(Exception("Navigation timed out after 30000ms")) == 'timeout'
+    assert classify(FetchError("No <script id=__NEXT_DATA__> in page - HTTP 200")) == 'error'
+    assert classify(ValueError("bad JSON")) == 'error'
+
+
+def test_additive_increase_up_to_max(clock):
+    p = pacer()
+    for _ in range(5):
+        p.success()
+    assert p.rate == 30 + 5 * INCREASE_PER_SUCCESS
+    for _ in range(50):
+        p.success()
+    assert p.rate == 40 and p.highest_rate == 40
+
+
+def test_multiplicative_decrease_down_to_min(clock):
+    p = pacer()
+    p.failure(ChallengeError("HTTP 429"))
+    assert p.rate == 30 * DECREASE_FACTOR
+    p.failure(TimeoutError("timed out"))
+    assert p.rate == 30 * DECREASE_FACTOR ** 2
+    for _ in range(5):
+        p.failure('error_page')
+    assert p.rate == 6 and p.lowest_rate == 6
+    assert p.failures == {'challenge': 1, 'timeout': 1, 'error_page': 5}
+
+
+def test_backoff_doubles_and_is_capped(clock):
+    p = pacer()
+    assert [p.failure('timeout') for _ in range(6)] == [10, 20, 40, 80, 120, 120]
+    # A success resets the streak, so the next failure starts from the base again
+    p.success()
+    assert p.consecutive_failures == 0
+    assert p.failure('timeout') == 10
+
+
+def test_failure_pauses_every_slot(clock):
+    p = pacer(rate=60)
+    assert p._reserve() == 0
+    assert p._reserve() == 1.0      # one second apart at 60/min
+    clock.now += 1.0
+    pause = p.failure('challenge')
+    # Nobody goes before the pause is over - and then at the cut rate
+    assert p._reserve() == pause
+    assert p._reserve() == pause + 60 / 30
+    clock.now += pause + 10
+    assert p._reserve() == 0
+
+
+def test_give_up_after(clock):
+    p = pacer(give_up_after=3)
+    for _ in range(2):
+        p.failure('timeout')
+    assert not p.should_give_up()
+    p.failure('timeout')
+    assert p.should_give_up()
+    p.success()
+    assert not p.should_give_up()
+    assert not pacer().should_give_up()
@@ -0,0 +1,102 @@
+"""Price band splitting, merging and the band URLs"""
+
+import json
+
+from jobs import with_query
+from planner import BandPlanner, MAX_RESULTS, MERGE_TARGET, MIN_BAND_WIDTH, SEED_PRICE, band_name
+
+BASE = "https://www.daft.ie/property-for-sale/dublin/houses"
+
+
+def listings_between(lo, hi, prices):
+    return sum(1 for p in prices if (lo is None or p >= lo) and (hi is None or p < hi))
+
+
+def plan(planner, prices):
+    """Run the planner the way the scraper does: split whatever is over the cap, record the rest"""
+    queue = list(planner.bands)
+    while queue:
+        band = queue.pop(0)
+        count = listings_between(band.lo, band.hi, prices)
+        if planner.needs_split(count, -(-count // 20)):
+            sub_bands = planner.split(band)
+            if sub_bands:
+                queue.extend(sub_bands)
+                continue
+        planner.record(band, count)
+    return planner.partition()
+
+
+def test_bisect():
+    planner = BandPlanner(BASE, [(300000, 500000)])
+    low, high = planner.split(planner.bands[0])
+    assert (low.lo, low.hi, high.lo, high.hi) == (300000, 400000, 400000, 500000)
+    assert low.name == '300k_400k'
+    assert planner.split(planner.bands[0]._replace(lo=300000, hi=300000 + MIN_BAND_WIDTH)) is None
+
+    # An open floor counts from 0
+    low, high = planner.split(planner.band(None, 300000))
+    assert (low.lo, low.hi, high.hi) == (None, 150000, 300000)
+
+
+def test_open_bands():
+    planner = BandPlanner(BASE, [(None, None)])
+    assert planner.bands[0].name == 'all' and planner.bands[0].url == BASE
+    low, high = planner.split(planner.bands[0])
+    assert (low.lo, low.hi, high.lo, high.hi) == (None, SEED_PRICE, SEED_PRICE, None)
+    assert band_name(high.lo, high.hi) == 'over_500k'
+
+    # Open top: the floor doubles
+    low, high = planner.split(high)
+    assert (low.lo, low.hi, high.lo, high.hi) == (SEED_PRICE, 2 * SEED_PRICE, 2 * SEED_PRICE, None)
+    low, high = planner.split(planner.band(0, None))
+    assert (low.hi, high.lo) == (MIN_BAND_WIDTH, MIN_BAND_WIDTH)
+
+
+def test_urls():
+    planner = BandPlanner(BASE, [(None, 300000), (300000, None)])
+    assert planner.bands[0].url == BASE + '?salePrice_to=300000'
+    assert planner.bands[1].url == BASE + '?salePrice_from=300000'
+    assert with_query(planner.bands[1].url, sort='publishDateDesc', page=3) == \
+        BASE + '?salePrice_from=300000&sort=publishDateDesc&page=3'
+    # Parameters already in the URL are replaced, not repeated
+    assert with_query(BASE + '?page=2', page=3) == BASE + '?page=3'
+    assert with_query(BASE, page=2) == BASE + '?page=2'
+
+
+def test_partition_covers_every_price(tmp_path):
+    # A crowded market with a spike at 450k: the open band has to be split several times,
+    # leaving small bands either side of the spike to merge
+    prices = [100000 + 250 * i for i in range(4000)] + [450000 + 25 * i for i in range(1200)] + \
+        [2000000 + 1000 * i for i in range(50)]
+    cache = str(tmp_path / 'bands.json')
+    planner = BandPlanner(BASE, [(None, None)], cache)
+    partition = plan(planner, prices)
+
+    assert planner.splits > 1
+    assert planner.covers_everything(partition)
+    assert sum(count for _, _, count in partition) == len(prices)
+    assert all(count <= MAX_RESULTS for _, _, count in partition)
+    # Merging only joins bands while they stay under the target
+    leaves = sorted(planner.counts.items(), key=lambda kv: -1 if kv[0][0] is None else kv[0][0])
+    assert len(partition) < len(leaves)
+    merged = [(lo, hi, count) for lo, hi, count in partition if (lo, hi) not in planner.counts]
+    assert merged and all(count <= MERGE_TARGET for _, _, count in merged)
+
+    planner.save()
+    with open(cache, encoding='utf-8') as f:
+        saved = json.load(f)['bands']
+    assert [(b['from'], b['to']) for b in saved] == [(lo, hi) for lo, hi, _ in partition]
+
+    # The next run starts from the cached partition and needs no splits
+    again = BandPlanner(BASE, [(None, None)], cache)
+    assert plan(again, prices) == partition and again.splits == 0
+
+
+def test_gap_keeps_the_old_cache(tmp_path):
+    cache = str(tmp_path / 'bands.json')
+    planner = BandPlanner(BASE, [(None, 300000), (300000, 500000), (500000, None)], cache)
+    planner.record(planner.bands[0], 100)
+    planner.record(planner.bands[2], 100)
+    assert not planner.covers_everything(planner.save())
+    assert not (tmp_path / 'bands.json').exists()
@@ -0,0 +1,31 @@
+"""Command line of the combined runner, as the workflow calls it"""
+
+import shlex
+from pathlib import Path
+
+import pytest
+
+import run_all
+
+WORKFLOW = Path(__file__).parent.parent / ".github/workflows/python-app.yml"
+
+
+def workflow_argv():
+    for line in WORKFLOW.read_text(encoding='utf-8').splitlines():
+        if 'scrapers/run_all.py' in line:
+            return shlex.split(line.split('scrapers/run_all.py', 1)[1])
+    raise AssertionError("the workflow doesn't run run_all.py")
+
+
+def test_workflow_command_parses():
+    args = run_all.parse_args(workflow_argv())
+    assert args.sources == list(run_all.SCRAPERS)
+    # Every flag is passed on to a scraper that accepts it
+    for module in run_all.SCRAPERS.values():
+        module.build_parser().parse_args(run_all.scraper_args(args))
+
+
+def test_sources():
+    assert run_all.parse_args(['myhome', '--resume']).sources == ['myhome']
+    with pytest.raises(SystemExit):
+        run_all.parse_args(['zoopla'])
@@ -0,0 +1,109 @@
+"""Content-hashed output shards and their manifest"""
+
+import csv
+import json
+
+import pytest
+
+from build_corpus import parse_page
+from outputs import ListingWriter, ShardedWriter, SHARD_FIELDS, price_shard
+from enrich import enrich, write_shards, MIN_SHARD_LISTINGS, SHARD_TARGET
+from schema import as_dict
+from conftest import corpus_pages
+
+
+def write(tmp_path, listings, shard_by='area', scraped_at='2025-01-01T00:00:00'):
+    shards = ShardedWriter(tmp_path / 'shards', str(tmp_path / 'manifest.json'), 'daft', shard_by, scraped_at)
+    paths = [str(tmp_path / name) for name in ('out.csv', 'out.json', 'out.col')]
+    with ListingWriter(*paths, scraped_at, shards=shards) as writer:
+        writer.write(listings)
+    with open(tmp_path / 'manifest.json', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_unchanged_shards_keep_their_files(tmp_path):
+    listings = [l for _, data in corpus_pages('daft') for l in parse_page('daft', data)[0]]
+    first = write(tmp_path, listings)
+    assert sum(s['count'] for s in first['shards']) == len(listings)
+    assert first['fields'] == list(SHARD_FIELDS) and 'days_on_market' not in first['fields']
+    for shard in first['shards']:
+        with open(tmp_path / shard['file'], newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == shard['count']
+        assert [r['listing_id'] for r in rows] == sorted(r['listing_id'] for r in rows)
+
+    # Another day, another scrape order: nothing in the shards changes
+    aged = [l._replace(days_on_market=(l.days_on_market or 0) + 7) for l in reversed(listings)]
+    second = write(tmp_path, aged, scraped_at='2025-01-08T00:00:00')
+    assert second['shards'] == first['shards']
+
+    # One re-priced listing changes only its own shard; the old file goes
+    changed = listings[0]
+    repriced = [l._replace(price_num=l.price_num + 5000) if l is changed else l for l in listings]
+    third = write(tmp_path, repriced)
+    moved = [(a['file'], b['file']) for a, b in zip(first['shards'], third['shards']) if a['file'] != b['file']]
+    assert len(moved) == 1
+    assert sorted(p.name for p in (tmp_path / 'shards').iterdir()) == \
+        sorted(s['file'].split('/')[1] for s in third['shards'])
+
+
+def test_price_shards(tmp_path):
+    assert [price_shard(p) for p in (None, 250000, 300000, 999999, 2000000)] == \
+        ['poa', 'under_300k', '300k_400k', '800k_1m', 'over_1.5m']
+    listings = [l for _, data in corpus_pages('myhome') for l in parse_page('myhome', data)[0]]
+    manifest = write(tmp_path, listings, shard_by='price')
+    for shard in manifest['shards']:
+        if shard['key'] != 'poa':
+            assert price_shard(shard['min_price']) == price_shard(shard['max_price']) == shard['key']
+
+    with pytest.raises(ValueError):
+        ShardedWriter(tmp_path, str(tmp_path / 'm.json'), 'daft', 'beds', '')
+
+
+def test_abort_leaves_nothing(tmp_path):
+    listings = parse_page('daft', corpus_pages('daft')[0][1])[0]
+    with pytest.raises(RuntimeError):
+        shards = ShardedWriter(tmp_path / 'shards', str(tmp_path / 'manifest.json'), 'daft', 'area', '')
+        with ListingWriter(*(str(tmp_path / n) for n in ('a.csv', 'a.json', 'a.col')), '', shards=shards) as w:
+            w.write(listings)
+            raise RuntimeError
+    assert not list((tmp_path / 'shards').iterdir())
+    assert not (tmp_path / 'manifest.json').exists()
+
+
+def test_leftovers_of_a_killed_run_are_removed(tmp_path):
+    (tmp_path / 'daft-dublin-8.csv.tmp').write_text('half a shard')
+    (tmp_path / 'myhome-dublin-8.csv.tmp').write_text('still being written')
+    ShardedWriter(tmp_path, str(tmp_path / 'manifest.json'), 'daft', 'area', '')
+    assert [p.name for p in tmp_path.iterdir()] == ['myhome-dublin-8.csv.tmp']
+
+
+def test_dashboard_shards(tmp_path):
+    rows = {source: [as_dict(l) for _, data in corpus_pages(source) for l in parse_page(source, data)[0]]
+            for source in ('daft', 'myhome')}
+    dataset, _ = enrich(rows)
+    manifest = write_shards(dataset, tmp_path / 'shards', str(tmp_path / 'manifest.json'))
+    with open(tmp_path / 'manifest.json', encoding='utf-8') as f:
+        assert json.load(f) == manifest
+    assert manifest['areas'] == dataset['areas'] and manifest['medianDays'] == dataset['medianDays']
+
+    seen = []
+    for shard in manifest['shards']:
+        with open(tmp_path / shard['file'], encoding='utf-8') as f:
+            listings = [dict(zip(manifest['fields'], row)) for row in json.load(f)]
+        assert len(listings) == shard['count']
+        assert {d['area'] for d in listings} == set(shard['areas'])
+        assert shard['sources'] == sorted({d['source'] for d in listings})
+        assert shard['preferred'] == any(d['inPreferredArea'] for d in listings)
+        assert shard['min_price'] == min(d['priceNum'] for d in listings)
+        if len(shard['areas']) > 1:
+            assert shard['count'] <= SHARD_TARGET
+            assert all(sum(d['area'] == a for d in listings) < MIN_SHARD_LISTINGS for a in shard['areas'])
+        seen += [(d['source'], d['listing_id']) for d in listings]
+    assert sorted(seen) == sorted((d['source'], d['listing_id']) for d in dataset['listings'])
+
+    # Shards from an older run go once they're no longer listed
+    (tmp_path / 'shards' / 'dashboard-gone.0123456789.json').write_text('[]')
+    write_shards(dataset, tmp_path / 'shards', str(tmp_path / 'manifest.json'))
+    assert sorted(p.name for p in (tmp_path / 'shards').iterdir()) == \
+        sorted(s['file'].split('/')[1] for s in manifest['shards'])
@@ -0,0 +1,131 @@
+"""Listing store: change detection across runs, removals and price history"""
+
+import json
+
+import pytest
+
+from schema import make_listing
+from store import ListingStore, RunRecorder, restore
+
+
+def listing(listing_id, price=450000, sale_agreed=False, **extra):
+    values = dict(listing_id=listing_id, source='daft', url=f"https://daft.ie/{listing_id}",
+                  address=f"{listing_id} Brackenwood Avenue, Dún Laoghaire", price=f"€{price:,}",
+                  price_num=price, beds=3, is_sale_agreed=sale_agreed, days_on_market=1)
+    values.update(extra)
+    return make_listing(**values)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ListingStore(str(tmp_path / "listings.db"))
+    yield store
+    store.close()
+
+
+def run(store, tmp_path, started, listings, full_run=True):
+    recorder = RunRecorder(store, 'daft', started, full_run, str(tmp_path / "changes.json"))
+    recorder.add(listings)
+    return recorder.finish()
+
+
+def ids(items):
+    return sorted(item['listing_id'] for item in items)
+
+
+def test_changes_between_runs(store, tmp_path):
+    first = run(store, tmp_path, '2025-01-01', [listing('1'), listing('2'), listing('3'), listing('4')])
+    assert ids(first['new']) == ['1', '2', '3', '4']
+    assert not first['price_changed'] and not first['sale_agreed'] and not first['removed']
+
+    second = run(store, tmp_path, '2025-01-08', [
+        listing('1', days_on_market=8),         # only the day count moved - not a change
+        listing('2', price=425000),
+        listing('3', sale_agreed=True),
+        listing('4', beds=4),
+        listing('5'),
+    ])
+    assert ids(second['new']) == ['5']
+    assert [(c['listing_id'], c['old_price'], c['new_price']) for c in second['price_changed']] == \
+        [('2', 450000, 425000)]
+    assert ids(second['sale_agreed']) == ['3']
+    assert ids(second['updated']) == ['2', '3', '4']
+    assert second['removed'] == []
+
+    assert store.price_history('daft', '2') == [('2025-01-01', '€450,000', 450000),
+                                               ('2025-01-08', '€425,000', 425000)]
+    assert store.price_history('daft', '1') == [('2025-01-01', '€450,000', 450000)]
+    # The deltas file is what finish() returned
+    with open(tmp_path / "changes.json", encoding='utf-8') as f:
+        written = json.load(f)
+    assert written['scraped_at'] == '2025-01-08' and ids(written['new']) == ['5']
+
+
+def test_relisted_after_removal(store, tmp_path):
+    run(store, tmp_path, '2025-01-01', [listing('1'), listing('2')])
+    removed = run(store, tmp_path, '2025-01-08', [listing('1')])
+    assert removed['removed'] == ['2']
+    assert store.active_count('daft') == 1
+    assert not store.is_unchanged('daft', listing('2'))
+
+    back = run(store, tmp_path, '2025-01-15', [listing('1'), listing('2', price=440000)])
+    # Not new - it keeps its history - but updated, with the price change recorded
+    assert back['new'] == []
+    assert ids(back['updated']) == ['2']
+    assert [c['listing_id'] for c in back['price_changed']] == ['2']
+    assert store.active_count('daft') == 2
+    assert [p[2] for p in store.price_history('daft', '2')] == [450000, 440000]
+
+
+def test_is_unchanged_ignores_blank_fields(store, tmp_path):
+    run(store, tmp_path, '2025-01-01', [listing('1', ber='B2', size_sqm=95)])
+    assert store.is_unchanged('daft', listing('1', ber='B2', size_sqm=95))
+    assert store.is_unchanged('daft', listing('1', ber='B2', size_sqm=95, days_on_market=9))
+    # Search results that leave out what the listing page filled in are still the same listing
+    assert store.is_unchanged('daft', listing('1'))
+    assert not store.is_unchanged('daft', listing('1', ber='C1'))
+    assert not store.is_unchanged('daft', listing('1', price=400000))
+    assert not store.is_unchanged('daft', listing('9'))
+
+
+def test_short_run_marks_no_removals(store, tmp_path):
+    run(store, tmp_path, '2025-01-01', [listing(str(i)) for i in range(10)])
+    # Half of the known listings is enough to trust the run...
+    assert len(run(store, tmp_path, '2025-01-08', [listing(str(i)) for i in range(5)])['removed']) == 5
+    # ...fewer means it probably died early
+    short = run(store, tmp_path, '2025-01-15', [listing('0'), listing('1')])
+    assert short['removed'] == []
+    assert store.active_count('daft') == 5
+    # An incremental run never marks removals
+    partial = run(store, tmp_path, '2025-01-22', [listing('0')], full_run=False)
+    assert partial['removed'] == [] and store.active_count('daft') == 5
+
+
+def test_run_ignores_repeats(store, tmp_path):
+    recorder = RunRecorder(store, 'daft', '2025-01-01', True, str(tmp_path / "changes.json"))
+    assert len(recorder.add([listing('1'), listing('2')])) == 2
+    # A listing bumped onto the next page shows up twice
+    assert [l.listing_id for l in recorder.add([listing('2'), listing('3')])] == ['3']
+    assert ids(recorder.finish()['new']) == ['1', '2', '3']
+
+
+def test_dump_and_restore(store, tmp_path):
+    run(store, tmp_path, '2025-01-01', [listing('1'), listing('2')])
+    run(store, tmp_path, '2025-01-08', [listing('1', price=425000)])
+    dump = str(tmp_path / "listings.sql")
+    store.dump(dump)
+
+    rebuilt_path = str(tmp_path / "rebuilt.db")
+    assert restore(dump, rebuilt_path)
+    # Never over an existing database
+    assert not restore(dump, rebuilt_path)
+    rebuilt = ListingStore(rebuilt_path)
+    try:
+        assert rebuilt.active_count('daft') == 1
+        assert rebuilt.price_history('daft', '1') == store.price_history('daft', '1')
+        assert rebuilt.is_unchanged('daft', listing('1', price=425000))
+        # Dumped again, it's the same text - a run that changes nothing changes no lines
+        rebuilt.dump(str(tmp_path / "again.sql"))
+        assert (tmp_path / "again.sql").read_text(encoding='utf-8') == (tmp_path / "listings.sql").read_text(encoding='utf-8')
+    finally:
+        rebuilt.close()
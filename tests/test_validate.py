@@ -0,0 +1,64 @@
+"""Post-scrape validation: quarantined rows, flagged outliers and the volume guard"""
+
+import json
+
+import pytest
+
+from build_corpus import parse_page
+from validate import Validator, VolumeDropError, problems
+from conftest import corpus_pages
+
+
+def corpus_listings(source):
+    return [l for _, data in corpus_pages(source) for l in parse_page(source, data)[0]]
+
+
+def test_bad_rows_are_quarantined(tmp_path):
+    good = corpus_listings('daft')[0]
+    assert problems(good) == []
+    bad = {
+        'a': good._replace(listing_id='a', property_type='Site', beds=4),
+        'b': good._replace(listing_id='b', size_sqm='120'),
+        'c': good._replace(listing_id='c', price_num=1275),
+        'd': good._replace(listing_id='d', beds=40),
+        'e': good._replace(listing_id='e', date_listed='2999-01-01'),
+    }
+    ranged = good._replace(listing_id='f', price='€1,275,000 to €1,350,000', price_num=1275000)
+
+    validator = Validator('daft', str(tmp_path / 'quarantine.json'))
+    kept = validator.check([good, *bad.values(), ranged])
+    assert kept == [good, ranged]
+    report = validator.finish()
+    assert [q['listing_id'] for q in report['quarantined']] == list(bad)
+    assert report['quarantined'][1]['reasons'] == ["size_sqm is str: '120'"]
+    assert report['flagged'][0]['listing_id'] == 'f'
+    with open(tmp_path / 'quarantine.json', encoding='utf-8') as f:
+        assert json.load(f) == report
+
+
+def test_price_outliers_per_area(tmp_path):
+    base = corpus_listings('daft')[0]._replace(address="1 Main Street, Lucan, Co. Dublin", size_sqm=100.0)
+    listings = [base._replace(listing_id=str(i), price_num=400000 + i * 5000) for i in range(20)]
+    listings.append(base._replace(listing_id='mansion', price_num=4000000))
+    listings.append(base._replace(listing_id='typo', price_num=40000, size_sqm=1000.0))
+
+    validator = Validator('daft', str(tmp_path / 'quarantine.json'))
+    assert len(validator.check(listings)) == 22
+    outliers = validator.outliers()
+    assert sorted(outliers) == ['mansion', 'typo']
+    assert [r.split()[0] for r in outliers['typo']] == ['price', 'price']
+    assert 'Lucan median' in outliers['mansion'][0]
+
+
+def test_volume_drop_guard(tmp_path):
+    listings = corpus_listings('myhome')
+    validator = Validator('myhome', str(tmp_path / 'quarantine.json'))
+    validator.check(listings[:50])
+
+    with pytest.raises(VolumeDropError):
+        validator.finish(previous_count=len(listings))
+    assert json.loads((tmp_path / 'quarantine.json').read_text())['volume_drop']
+    # Incremental runs only see the newest pages; --allow-drop accepts it
+    assert validator.finish(previous_count=len(listings), full_run=False)['volume_drop'] is None
+    assert validator.finish(previous_count=len(listings), allow_drop=True)['volume_drop']
+    assert validator.finish(previous_count=60)['volume_drop'] is None